@@ -0,0 +1,311 @@
+/*
+  mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+  Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version.
+
+  This program is distributed in the hope that it will be useful, but WITHOUT
+  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+  FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+  details.
+
+  You should have received a copy of the GNU General Public License along with
+  this program.  If not, see <http://www.gnu.org/licenses/>.
+*/
+
+/*
+  addrenc: batch P2PKH, P2SH-P2WPKH and Bech32 address encoding from serialized
+  public keys.  Self-contained: SHA256 and RIPEMD160 are implemented here, so no
+  additional libraries are required.  mmgen.protocol provides a pure-Python
+  fallback producing identical output.
+*/
+
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+#define MAX_VER_LEN  4
+#define ADDR_BUF_LEN 128
+
+/* SHA256 */
+
+static const uint32_t sha256_k[64] = {
+	0x428a2f98,0x71374491,0xb5c0fbcf,0xe9b5dba5,0x3956c25b,0x59f111f1,0x923f82a4,0xab1c5ed5,
+	0xd807aa98,0x12835b01,0x243185be,0x550c7dc3,0x72be5d74,0x80deb1fe,0x9bdc06a7,0xc19bf174,
+	0xe49b69c1,0xefbe4786,0x0fc19dc6,0x240ca1cc,0x2de92c6f,0x4a7484aa,0x5cb0a9dc,0x76f988da,
+	0x983e5152,0xa831c66d,0xb00327c8,0xbf597fc7,0xc6e00bf3,0xd5a79147,0x06ca6351,0x14292967,
+	0x27b70a85,0x2e1b2138,0x4d2c6dfc,0x53380d13,0x650a7354,0x766a0abb,0x81c2c92e,0x92722c85,
+	0xa2bfe8a1,0xa81a664b,0xc24b8b70,0xc76c51a3,0xd192e819,0xd6990624,0xf40e3585,0x106aa070,
+	0x19a4c116,0x1e376c08,0x2748774c,0x34b0bcb5,0x391c0cb3,0x4ed8aa4a,0x5b9cca4f,0x682e6ff3,
+	0x748f82ee,0x78a5636f,0x84c87814,0x8cc70208,0x90befffa,0xa4506ceb,0xbef9a3f7,0xc67178f2
+};
+
+#define ROTR(x,n) (((x) >> (n)) | ((x) << (32 - (n))))
+#define ROTL(x,n) (((x) << (n)) | ((x) >> (32 - (n))))
+
+static void sha256_block(uint32_t *h, const unsigned char *p) {
+	uint32_t w[64], a, b, c, d, e, f, g, hh, t1, t2;
+	int i;
+	for (i = 0; i < 16; i++)
+		w[i] = (uint32_t)p[i*4] << 24 | (uint32_t)p[i*4+1] << 16 | (uint32_t)p[i*4+2] << 8 | p[i*4+3];
+	for (i = 16; i < 64; i++)
+		w[i] = w[i-16] + (ROTR(w[i-15],7) ^ ROTR(w[i-15],18) ^ (w[i-15] >> 3))
+				+ w[i-7] + (ROTR(w[i-2],17) ^ ROTR(w[i-2],19) ^ (w[i-2] >> 10));
+	a = h[0]; b = h[1]; c = h[2]; d = h[3]; e = h[4]; f = h[5]; g = h[6]; hh = h[7];
+	for (i = 0; i < 64; i++) {
+		t1 = hh + (ROTR(e,6) ^ ROTR(e,11) ^ ROTR(e,25)) + ((e & f) ^ (~e & g)) + sha256_k[i] + w[i];
+		t2 = (ROTR(a,2) ^ ROTR(a,13) ^ ROTR(a,22)) + ((a & b) ^ (a & c) ^ (b & c));
+		hh = g; g = f; f = e; e = d + t1; d = c; c = b; b = a; a = t1 + t2;
+	}
+	h[0] += a; h[1] += b; h[2] += c; h[3] += d; h[4] += e; h[5] += f; h[6] += g; h[7] += hh;
+}
+
+static void sha256(const unsigned char *data, size_t len, unsigned char *out) {
+	uint32_t h[8] = {
+		0x6a09e667,0xbb67ae85,0x3c6ef372,0xa54ff53a,0x510e527f,0x9b05688c,0x1f83d9ab,0x5be0cd19 };
+	unsigned char buf[128];
+	size_t i, rem = len % 64, nblk = rem < 56 ? 1 : 2;
+	uint64_t bits = (uint64_t)len * 8;
+	for (i = 0; i + 64 <= len; i += 64) sha256_block(h, data + i);
+	memset(buf, 0, sizeof(buf));
+	memcpy(buf, data + i, rem);
+	buf[rem] = 0x80;
+	for (i = 0; i < 8; i++) buf[nblk*64 - 1 - i] = (unsigned char)(bits >> (8*i));
+	for (i = 0; i < nblk; i++) sha256_block(h, buf + i*64);
+	for (i = 0; i < 8; i++) {
+		out[i*4] = h[i] >> 24; out[i*4+1] = h[i] >> 16; out[i*4+2] = h[i] >> 8; out[i*4+3] = h[i];
+	}
+}
+
+/* RIPEMD160 */
+
+static const unsigned char rmd_r1[80] = {
+	0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15, 7,4,13,1,10,6,15,3,12,0,9,5,2,14,11,8,
+	3,10,14,4,9,15,8,1,2,7,0,6,13,11,5,12, 1,9,11,10,0,8,12,4,13,3,7,15,14,5,6,2,
+	4,0,5,9,7,12,2,10,14,1,3,8,11,6,15,13 };
+static const unsigned char rmd_r2[80] = {
+	5,14,7,0,9,2,11,4,13,6,15,8,1,10,3,12, 6,11,3,7,0,13,5,10,14,15,8,12,4,9,1,2,
+	15,5,1,3,7,14,6,9,11,8,12,2,10,0,4,13, 8,6,4,1,3,11,15,0,5,12,2,13,9,7,10,14,
+	12,15,10,4,1,5,8,7,6,2,13,14,0,3,9,11 };
+static const unsigned char rmd_s1[80] = {
+	11,14,15,12,5,8,7,9,11,13,14,15,6,7,9,8, 7,6,8,13,11,9,7,15,7,12,15,9,11,7,13,12,
+	11,13,6,7,14,9,13,15,14,8,13,6,5,12,7,5, 11,12,14,15,14,15,9,8,9,14,5,6,8,6,5,12,
+	9,15,5,11,6,8,13,12,5,12,13,14,11,8,5,6 };
+static const unsigned char rmd_s2[80] = {
+	8,9,9,11,13,15,15,5,7,7,8,11,14,14,12,6, 9,13,15,7,12,8,9,11,7,7,12,7,6,15,13,11,
+	9,7,15,11,8,6,6,14,12,13,5,14,13,13,7,5, 15,5,8,11,14,14,6,14,6,9,12,9,12,5,15,8,
+	8,5,12,9,12,5,14,6,8,13,6,5,15,13,11,11 };
+static const uint32_t rmd_k1[5] = { 0x00000000,0x5a827999,0x6ed9eba1,0x8f1bbcdc,0xa953fd4e };
+static const uint32_t rmd_k2[5] = { 0x50a28be6,0x5c4dd124,0x6d703ef3,0x7a6d76e9,0x00000000 };
+
+static uint32_t rmd_f(int j, uint32_t x, uint32_t y, uint32_t z) {
+	switch (j / 16) {
+		case 0:  return x ^ y ^ z;
+		case 1:  return (x & y) | (~x & z);
+		case 2:  return (x | ~y) ^ z;
+		case 3:  return (x & z) | (y & ~z);
+		default: return x ^ (y | ~z);
+	}
+}
+
+static void ripemd160_block(uint32_t *h, const unsigned char *p) {
+	uint32_t x[16], a1, b1, c1, d1, e1, a2, b2, c2, d2, e2, t;
+	int j;
+	for (j = 0; j < 16; j++)
+		x[j] = p[j*4] | (uint32_t)p[j*4+1] << 8 | (uint32_t)p[j*4+2] << 16 | (uint32_t)p[j*4+3] << 24;
+	a1 = a2 = h[0]; b1 = b2 = h[1]; c1 = c2 = h[2]; d1 = d2 = h[3]; e1 = e2 = h[4];
+	for (j = 0; j < 80; j++) {
+		t = ROTL(a1 + rmd_f(j,b1,c1,d1) + x[rmd_r1[j]] + rmd_k1[j/16], rmd_s1[j]) + e1;
+		a1 = e1; e1 = d1; d1 = ROTL(c1,10); c1 = b1; b1 = t;
+		t = ROTL(a2 + rmd_f(79-j,b2,c2,d2) + x[rmd_r2[j]] + rmd_k2[j/16], rmd_s2[j]) + e2;
+		a2 = e2; e2 = d2; d2 = ROTL(c2,10); c2 = b2; b2 = t;
+	}
+	t = h[1] + c1 + d2; h[1] = h[2] + d1 + e2; h[2] = h[3] + e1 + a2;
+	h[3] = h[4] + a1 + b2; h[4] = h[0] + b1 + c2; h[0] = t;
+}
+
+static void ripemd160(const unsigned char *data, size_t len, unsigned char *out) {
+	uint32_t h[5] = { 0x67452301,0xefcdab89,0x98badcfe,0x10325476,0xc3d2e1f0 };
+	unsigned char buf[128];
+	size_t i, rem = len % 64, nblk = rem < 56 ? 1 : 2;
+	uint64_t bits = (uint64_t)len * 8;
+	for (i = 0; i + 64 <= len; i += 64) ripemd160_block(h, data + i);
+	memset(buf, 0, sizeof(buf));
+	memcpy(buf, data + i, rem);
+	buf[rem] = 0x80;
+	for (i = 0; i < 8; i++) buf[(nblk-1)*64 + 56 + i] = (unsigned char)(bits >> (8*i));
+	for (i = 0; i < nblk; i++) ripemd160_block(h, buf + i*64);
+	for (i = 0; i < 5; i++) {
+		out[i*4] = h[i]; out[i*4+1] = h[i] >> 8; out[i*4+2] = h[i] >> 16; out[i*4+3] = h[i] >> 24;
+	}
+}
+
+static void hash160(const unsigned char *data, size_t len, unsigned char *out) {
+	unsigned char tmp[32];
+	sha256(data, len, tmp);
+	ripemd160(tmp, 32, out);
+}
+
+/* Base58Check */
+
+static const char b58_digits[] = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz";
+
+/* Encode version bytes + 20-byte hash with 4-byte checksum; out must hold ADDR_BUF_LEN bytes */
+static void b58chk_encode(const unsigned char *ver, size_t vlen, const unsigned char *hash, char *out) {
+	unsigned char data[MAX_VER_LEN + 20 + 4], chk[32], digits[64];
+	size_t len = vlen + 20, i, j, zeroes = 0, ndigits = 0;
+	memcpy(data, ver, vlen);
+	memcpy(data + vlen, hash, 20);
+	sha256(data, len, chk);
+	sha256(chk, 32, chk);
+	memcpy(data + len, chk, 4);
+	len += 4;
+	while (zeroes < len && data[zeroes] == 0) zeroes++;
+	for (i = zeroes; i < len; i++) {
+		unsigned int carry = data[i];
+		for (j = 0; j < ndigits; j++) {
+			carry += (unsigned int)digits[j] << 8;
+			digits[j] = carry % 58;
+			carry /= 58;
+		}
+		while (carry) { digits[ndigits++] = carry % 58; carry /= 58; }
+	}
+	for (i = 0; i < zeroes; i++) *out++ = '1';
+	for (i = 0; i < ndigits; i++) *out++ = b58_digits[digits[ndigits-1-i]];
+	*out = '\0';
+}
+
+/* Bech32 (BIP173) */
+
+static const char bech32_charset[] = "qpzry9x8gf2tvdw0s3jn54khce6mua7l";
+
+static uint32_t bech32_polymod_step(uint32_t chk) {
+	uint8_t b = chk >> 25;
+	return ((chk & 0x1ffffff) << 5) ^
+		(-((b >> 0) & 1) & 0x3b6a57b2UL) ^ (-((b >> 1) & 1) & 0x26508e6dUL) ^
+		(-((b >> 2) & 1) & 0x1ea119faUL) ^ (-((b >> 3) & 1) & 0x3d4233ddUL) ^
+		(-((b >> 4) & 1) & 0x2a1462b3UL);
+}
+
+/* hrp length is checked by caller; out must hold ADDR_BUF_LEN bytes */
+static void bech32_encode(const char *hrp, unsigned int witver, const unsigned char *prog, char *out) {
+	unsigned char data[1 + 32];
+	uint32_t chk = 1, acc = 0;
+	size_t i, hlen = strlen(hrp), dlen = 0;
+	int bits = 0;
+	data[dlen++] = witver;
+	for (i = 0; i < 20; i++) { /* convertbits(8,5), with padding */
+		acc = (acc << 8) | prog[i];
+		bits += 8;
+		while (bits >= 5) { bits -= 5; data[dlen++] = (acc >> bits) & 31; }
+	}
+	if (bits) data[dlen++] = (acc << (5 - bits)) & 31;
+	for (i = 0; i < hlen; i++) chk = bech32_polymod_step(chk) ^ ((unsigned char)hrp[i] >> 5);
+	chk = bech32_polymod_step(chk);
+	for (i = 0; i < hlen; i++) { chk = bech32_polymod_step(chk) ^ (hrp[i] & 0x1f); *out++ = hrp[i]; }
+	*out++ = '1';
+	for (i = 0; i < dlen; i++) { chk = bech32_polymod_step(chk) ^ data[i]; *out++ = bech32_charset[data[i]]; }
+	for (i = 0; i < 6; i++) chk = bech32_polymod_step(chk);
+	chk ^= 1;
+	for (i = 0; i < 6; i++) *out++ = bech32_charset[(chk >> ((5 - i) * 5)) & 31];
+	*out = '\0';
+}
+
+/* Batch driver */
+
+enum { FMT_P2PKH, FMT_SEGWIT, FMT_BECH32 };
+
+static void encode_one(int fmt, const unsigned char *pub, size_t publen,
+		const unsigned char *ver, size_t vlen, const char *hrp, unsigned int witver, char *out) {
+	unsigned char h[20], script[22];
+	hash160(pub, publen, h);
+	switch (fmt) {
+		case FMT_P2PKH:
+			b58chk_encode(ver, vlen, h, out);
+			break;
+		case FMT_SEGWIT: /* P2SH-P2WPKH: redeem script is OP_0 <20-byte keyhash> */
+			script[0] = witver;
+			script[1] = 0x14;
+			memcpy(script + 2, h, 20);
+			hash160(script, 22, h);
+			b58chk_encode(ver, vlen, h, out);
+			break;
+		case FMT_BECH32:
+			bech32_encode(hrp, witver, h, out);
+			break;
+	}
+}
+
+static PyObject * pubs2addrs(PyObject *self, PyObject *args) {
+	const unsigned char *pubs, *ver;
+	const int plen, vlen;
+	const char *fmt_str, *hrp;
+	unsigned int publen, witver;
+	int fmt;
+	if (!PyArg_ParseTuple(args, "t#Ist#sI", &pubs, &plen, &publen, &fmt_str, &ver, &vlen, &hrp, &witver))
+		return NULL;
+	if      (!strcmp(fmt_str, "p2pkh"))  fmt = FMT_P2PKH;
+	else if (!strcmp(fmt_str, "segwit")) fmt = FMT_SEGWIT;
+	else if (!strcmp(fmt_str, "bech32")) fmt = FMT_BECH32;
+	else {
+		PyErr_SetString(PyExc_ValueError, "Address format must be 'p2pkh', 'segwit' or 'bech32'");
+		return NULL;
+	}
+	if ((publen != 33 && publen != 65) || plen % publen) {
+		PyErr_SetString(PyExc_ValueError, "Public key data length not a multiple of 33 or 65 bytes");
+		return NULL;
+	}
+	if (fmt != FMT_P2PKH && publen != 33) {
+		PyErr_SetString(PyExc_ValueError, "Uncompressed public keys incompatible with Segwit");
+		return NULL;
+	}
+	if (fmt != FMT_BECH32 && (vlen < 1 || vlen > MAX_VER_LEN)) {
+		PyErr_SetString(PyExc_ValueError, "Invalid version number length");
+		return NULL;
+	}
+	if (fmt == FMT_BECH32 && (strlen(hrp) < 1 || strlen(hrp) > ADDR_BUF_LEN - 42 || witver > 16)) {
+		PyErr_SetString(PyExc_ValueError, "Invalid Bech32 human-readable part or witness version");
+		return NULL;
+	}
+	size_t n = plen / publen, i;
+	char *buf = PyMem_Malloc(n * ADDR_BUF_LEN + 1);
+	if (buf == NULL) return PyErr_NoMemory();
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0; i < n; i++)
+		encode_one(fmt, pubs + i*publen, publen, ver, vlen, hrp, witver, buf + i*ADDR_BUF_LEN);
+	Py_END_ALLOW_THREADS
+	PyObject *ret = PyList_New(n);
+	for (i = 0; ret != NULL && i < n; i++) {
+		PyObject *s = PyString_FromString(buf + i*ADDR_BUF_LEN);
+		if (s == NULL) { Py_DECREF(ret); ret = NULL; break; }
+		PyList_SET_ITEM(ret, i, s);
+	}
+	PyMem_Free(buf);
+	return ret;
+}
+
+static PyObject * py_hash160(PyObject *self, PyObject *args) {
+	const unsigned char *data;
+	const int len;
+	unsigned char out[20];
+	if (!PyArg_ParseTuple(args, "t#", &data, &len))
+		return NULL;
+	hash160(data, len, out);
+	return Py_BuildValue("s#", out, 20);
+}
+
+static PyMethodDef addrencMethods[] = {
+	{"pubs2addrs", pubs2addrs, METH_VARARGS,
+		"Encode concatenated serialized pubkeys as P2PKH, P2SH-P2WPKH or Bech32 addresses"},
+	{"hash160", py_hash160, METH_VARARGS, "Return RIPEMD160(SHA256(data))"},
+	{NULL, NULL, 0, NULL} /* Sentinel */
+};
+
+PyMODINIT_FUNC initaddrenc(void) {
+	PyObject *m;
+	m = Py_InitModule("addrenc", addrencMethods);
+	if (m == NULL) return;
+}
@@ -22,6 +22,7 @@ addr.py:  Address generation/display routines for the MMGen suite
 """
 
 from hashlib import sha256,sha512
+from array import array
 from binascii import hexlify,unhexlify
 from mmgen.common import *
 from mmgen.obj import *
@@ -52,12 +53,19 @@ class AddrGenerator(MMGenObject):
 		me.desc = gen_methods
 		return me
 
+	def to_addrs(self,pubhexes):
+		return [self.to_addr(p) for p in pubhexes]
+
 class AddrGeneratorP2PKH(AddrGenerator):
 	def to_addr(self,pubhex):
 		from mmgen.protocol import hash160
 		assert type(pubhex) == PubKey
 		return CoinAddr(g.proto.pubhash2addr(hash160(pubhex),p2sh=False))
 
+	def to_addrs(self,pubhexes):
+		assert all(type(p) == PubKey for p in pubhexes)
+		return map(CoinAddr,g.proto.pubkeys2addrs(map(unhexlify,pubhexes),'p2pkh'))
+
 	def to_segwit_redeem_script(self,pubhex):
 		raise NotImplementedError,'Segwit redeem script not supported by this address type'
 
@@ -66,6 +74,10 @@ class AddrGeneratorSegwit(AddrGenerator):
 		assert pubhex.compressed,'Uncompressed public keys incompatible with Segwit'
 		return CoinAddr(g.proto.pubhex2segwitaddr(pubhex))
 
+	def to_addrs(self,pubhexes):
+		assert all(p.compressed for p in pubhexes),'Uncompressed public keys incompatible with Segwit'
+		return map(CoinAddr,g.proto.pubkeys2addrs(map(unhexlify,pubhexes),'segwit'))
+
 	def to_segwit_redeem_script(self,pubhex):
 		assert pubhex.compressed,'Uncompressed public keys incompatible with Segwit'
 		return HexStr(g.proto.pubhex2redeem_script(pubhex))
@@ -76,6 +88,10 @@ class AddrGeneratorBech32(AddrGenerator):
 		from mmgen.protocol import hash160
 		return CoinAddr(g.proto.pubhash2bech32addr(hash160(pubhex)))
 
+	def to_addrs(self,pubhexes):
+		assert all(p.compressed for p in pubhexes),'Uncompressed public keys incompatible with Segwit'
+		return map(CoinAddr,g.proto.pubkeys2addrs(map(unhexlify,pubhexes),'bech32'))
+
 	def to_segwit_redeem_script(self,pubhex):
 		raise NotImplementedError,'Segwit redeem script not supported by this address type'
 
@@ -208,10 +224,13 @@ class KeyGenerator(MMGenObject):
 		else:
 			raise ValueError,'{}: invalid pubkey_type argument'.format(pubkey_type)
 
+	def to_pubhex_batch(self,privkeys):
+		return [self.to_pubhex(k) for k in privkeys]
+
 	@classmethod
 	def test_for_secp256k1(self,silent=False):
 		try:
-			from mmgen.secp256k1 import priv2pub
+			from mmgen.secp256k1 import priv2pub,priv2pub_batch
 			assert priv2pub(('deadbeef'*8).decode('hex'),1)
 			return True
 		except:
@@ -260,12 +279,77 @@ class KeyGeneratorSecp256k1(KeyGenerator):
 		from mmgen.secp256k1 import priv2pub
 		return PubKey(hexlify(priv2pub(unhexlify(privhex),int(privhex.compressed))),compressed=privhex.compressed)
 
+	def to_pubhex_batch(self,privkeys):
+		if not privkeys: return []
+		compressed = privkeys[0].compressed
+		assert all(type(k) == PrivKey and k.compressed == compressed for k in privkeys)
+		from mmgen.secp256k1 import priv2pub_batch
+		d = priv2pub_batch(''.join(map(unhexlify,privkeys)),int(compressed))
+		n = (65,33)[compressed]
+		return [PubKey(hexlify(d[i:i+n]),compressed=compressed) for i in range(0,len(d),n)]
+
 class KeyGeneratorDummy(KeyGenerator):
 	desc = 'mmgen-dummy'
 	def to_pubhex(self,privhex):
 		assert type(privhex) == PrivKey
 		return PubKey(str(privhex),compressed=privhex.compressed)
 
+_worker_gens = {}
+def _get_worker_gens(mmtype):
+	if mmtype not in _worker_gens: # generators are reused for the life of the process
+		at = MMGenAddrType(mmtype)
+		_worker_gens[mmtype] = at,KeyGenerator(at,silent=True),AddrGenerator(at)
+	return _worker_gens[mmtype]
+
+def _gen_addr_data(args):
+	"""
+	Process pool worker for AddrList.generate().  Results are returned as plain
+	strings, in the order of the secret keys passed in
+	"""
+	mmtype,secs,gen_viewkey,gen_wallet_passwd = args
+	at,kg,ag = _get_worker_gens(mmtype)
+	secs = [PrivKey(s,compressed=at.compressed,pubkey_type=at.pubkey_type) for s in secs]
+	return [tuple(a and str(a) for a in d) for d in gen_addr_data(kg,ag,secs,gen_viewkey,gen_wallet_passwd)]
+
+def _addrs_from_wifs(args):
+	"""
+	Process pool worker for AddrList.addrs_from_keys().  Addresses are returned as
+	plain strings, in the order of the keys passed in
+	"""
+	mmtype,wifs = args
+	at,kg,ag = _get_worker_gens(mmtype)
+	return [str(a) for a in addrs_from_secs(kg,ag,[PrivKey(wif=w) for w in wifs])]
+
+def _pool_imap(func,args,jobs):
+	"""
+	Generate the results of func() for each item of 'args' in order, using a pool of
+	'jobs' processes.  The pool is terminated if the generator is closed early.
+	"""
+	from multiprocessing import Pool
+	pool,done = Pool(jobs),False
+	try:
+		for res in pool.imap(func,args): yield res
+		done = True
+	finally:
+		if done: pool.close()
+		else:    pool.terminate()
+		pool.join()
+
+def addrs_from_secs(kg,ag,secs):
+	"return the addresses for a block of PrivKeys, in order"
+	if len(set(k.compressed for k in secs)) == 1:
+		return ag.to_addrs(kg.to_pubhex_batch(secs))
+	return [ag.to_addr(kg.to_pubhex(k)) for k in secs] # mixed keys from a flat key list
+
+def gen_addr_data(kg,ag,secs,gen_viewkey,gen_wallet_passwd):
+	"return (addr,viewkey,wallet_passwd) tuples for a block of PrivKeys, in order"
+	pubhexes = kg.to_pubhex_batch(secs)
+	return [(
+		addr,
+		ag.to_viewkey(pubhex) if gen_viewkey else None,
+		ag.to_wallet_passwd(sec) if gen_wallet_passwd else None
+		) for sec,pubhex,addr in zip(secs,pubhexes,ag.to_addrs(pubhexes))]
+
 class AddrListEntry(MMGenListItem):
 	addr    = MMGenListItemAttr('addr','CoinAddr')
 	idx     = MMGenListItemAttr('idx','AddrIdx') # not present in flat addrlists
@@ -280,33 +364,150 @@ class PasswordListEntry(MMGenListItem):
 	label  = MMGenListItemAttr('label','TwComment',reassign_ok=True)
 	sec    = MMGenListItemAttr('sec',PrivKey,typeconv=False)
 
+class AddrListEntryView(object):
+	"""
+	An entry of an AddrListColumns object.  Attributes are read from and written
+	to the columns, with writes checked and converted as for the entry type
+	"""
+	__slots__ = ('cols','n')
+
+	def __init__(self,cols,n):
+		object.__setattr__(self,'cols',cols)
+		object.__setattr__(self,'n',n)
+
+	def __getattr__(self,name):
+		return self.cols.get_val(name,self.n)
+
+	def __setattr__(self,name,value):
+		self.cols.set_val(name,self.n,value)
+
+	def pformat(self,lvl=0):
+		return self.cols.to_entry(self.n).pformat(lvl=lvl)
+
+class AddrListColumns(MMGenObject):
+	"""
+	Compact storage for large address lists.  Each attribute of the entry type
+	is kept in its own column (the index as an integer array), and entries are
+	returned as views on demand.  Values passed to add_row() must already have
+	been validated by the caller, normally in bulk at generation or parse time
+	"""
+	def __init__(self,entry_type):
+		self.entry_type = entry_type
+		self.attrs = [k for k,v in entry_type.__dict__.items() if isinstance(v,MMGenImmutableAttr)]
+		self.cols = dict((k,[]) for k in self.attrs)
+		self.cols['idx'] = array('i') # 0 == no index
+
+	def __len__(self):
+		return len(self.cols['idx'])
+
+	def __iter__(self):
+		for n in xrange(len(self)):
+			yield AddrListEntryView(self,n)
+
+	def __getitem__(self,n):
+		if type(n) == slice:
+			return [AddrListEntryView(self,i) for i in xrange(*n.indices(len(self)))]
+		if n < 0: n += len(self)
+		if not 0 <= n < len(self):
+			raise IndexError,'AddrListColumns index out of range'
+		return AddrListEntryView(self,n)
+
+	def get_val(self,name,n):
+		try: col = self.cols[name]
+		except: raise AttributeError,"'{}': no such attribute in class {}".format(name,self.entry_type)
+		if name == 'idx':
+			return int.__new__(AddrIdx,col[n]) if col[n] else None
+		return col[n]
+
+	def set_val(self,name,n,value):
+		try: d = self.entry_type.__dict__[name]
+		except: raise AttributeError,"'{}': no such attribute in class {}".format(name,self.entry_type)
+		if self.get_val(name,n) != None and not getattr(d,'reassign_ok',False):
+			m = "Attribute '{}' of {} instance cannot be reassigned"
+			raise AttributeError(m.format(name,self.entry_type))
+		value = d.conv(value,self.entry_type)
+		self.cols[name][n] = value if name != 'idx' else value or 0
+
+	def add_row(self,**kwargs):
+		for k in self.attrs:
+			v = kwargs.get(k)
+			self.cols[k].append(v if k != 'idx' else v or 0)
+
+	def append(self,e):
+		self.add_row(**dict((k,getattr(e,k)) for k in self.attrs))
+
+	def pop(self,n=-1):
+		e = self.to_entry(n)
+		for k in self.attrs: self.cols[k].pop(n)
+		return e
+
+	def to_entry(self,n):
+		"return the entry at position 'n' as a standalone entry object"
+		e = self.entry_type()
+		for k in self.attrs:
+			v = self.get_val(k,n)
+			if v != None: e.__dict__[k] = v
+		return e
+
+class AddrListAccumulator(MMGenObject):
+	"""
+	Checksum and index range data for an address list, accumulated from entries
+	passed to add() one at a time as the list is generated or parsed
+	"""
+	def __init__(self,addrlist,chksum=True):
+		self.rec_f = addrlist.chksum_rec_f
+		self.ea = addrlist.al_id.mmtype.extra_attrs # add viewkey and passwd to the mix, if present
+		self.h = sha256() if chksum else None
+		self.recs,self.h_empty = [],True # records not yet hashed
+		self.ranges = []
+		self.n = 0
+
+	@classmethod
+	def get(cls,addrlist,chksum=False):
+		"return the list's accumulator if it covers the list's data, else a new one fed from the data"
+		acc = getattr(addrlist,'acc',None)
+		if not acc or acc.n != len(addrlist.data) or (chksum and not acc.h):
+			acc = cls(addrlist,chksum=chksum)
+			for e in addrlist.data: acc.add(e)
+		return acc
+
+	def add(self,e):
+		i = e.idx
+		if self.h: # the checksummed data is the entries' records, joined by spaces
+			self.recs.append(' '.join(self.rec_f(e) + tuple(getattr(e,a) for a in self.ea if getattr(e,a))))
+			if len(self.recs) == 1000: self.flush()
+		self.n += 1
+		r = self.ranges
+		if r and i == r[-1][1] + 1:
+			r[-1][1] = i
+		else:
+			r.append([i,i])
+
+	def flush(self):
+		if self.recs:
+			self.h.update(' '.join(self.recs) if self.h_empty else ' '+' '.join(self.recs))
+			self.recs,self.h_empty = [],False
+
+	def chksum(self): # same as make_chksum_N(data,nchars=16,sep=True)
+		self.flush()
+		s = sha256(self.h.digest()).hexdigest().upper()
+		return ' '.join([s[i*4:i*4+4] for i in range(4)])
+
+	def idx_str(self):
+		return u','.join([unicode(a) if a == b else u'{}-{}'.format(a,b) for a,b in self.ranges])
+
 class AddrListChksum(str,Hilite):
 	color = 'pink'
 	trunc_ok = False
 
 	def __new__(cls,addrlist):
-		ea = addrlist.al_id.mmtype.extra_attrs # add viewkey and passwd to the mix, if present
-		lines = [' '.join(
-					addrlist.chksum_rec_f(e) +
-					tuple(getattr(e,a) for a in ea if getattr(e,a))
-				) for e in addrlist.data]
-		return str.__new__(cls,make_chksum_N(' '.join(lines), nchars=16, sep=True))
+		return str.__new__(cls,AddrListAccumulator.get(addrlist,chksum=True).chksum())
 
 class AddrListIDStr(unicode,Hilite):
 	color = 'green'
 	trunc_ok = False
 	def __new__(cls,addrlist,fmt_str=None):
-		idxs = [e.idx for e in addrlist.data]
-		prev = idxs[0]
-		ret = prev,
-		for i in idxs[1:]:
-			if i == prev + 1:
-				if i == idxs[-1]: ret += '-', i
-			else:
-				if prev != ret[-1]: ret += '-', prev
-				ret += ',', i
-			prev = i
-		s = ''.join(map(unicode,ret))
+		s = AddrListAccumulator.get(addrlist).idx_str()
 
 		if fmt_str:
 			ret = fmt_str.format(s)
@@ -318,6 +519,71 @@ class AddrListIDStr(unicode,Hilite):
 
 		return unicode.__new__(cls,ret)
 
+class AddrChainCache(MMGenObject):
+	"""
+	Encrypted on-disk store of sha512 seed chain checkpoints, keyed by Seed ID and
+	scramble key.  The encryption key is derived from the scrambled seed, so a cache
+	is useless without the seed it was made from.
+	"""
+	desc = 'address chain cache'
+	subdir = 'addr_chain_cache'
+	ext = 'mmchain'
+	chk_len = 8
+	rec_len = 4 + 64 # round number + chain state
+
+	def __init__(self,sid,scramble_key,seed):
+		self.seed = seed
+		self.interval = g.addr_chain_cache_interval
+		if self.interval < 1:
+			die(1,"'{}': invalid value for 'addr_chain_cache_interval' (must be > 0)".format(self.interval))
+		fn = '{}-{}.{}'.format(sid,make_chksum_8(u'{}:{}'.format(sid,scramble_key or '')),self.ext)
+		self.fn = os.path.join(g.data_dir,self.subdir,fn)
+		self.modified = False
+		self.checkpoints = self.load()
+
+	def make_key(self,salt):
+		return sha256(salt+self.seed).digest()
+
+	def load(self):
+		if not os.path.exists(self.fn): return {}
+		from mmgen.crypto import decrypt_data
+		import struct
+		vmsg(u"Loading {} '{}'".format(self.desc,self.fn))
+		d = get_data_from_file(self.fn,self.desc,binary=True,silent=True)
+		data = decrypt_data(d[g.salt_len:],self.make_key(d[:g.salt_len]),desc=self.desc)
+		chk,recs = data[:self.chk_len],data[self.chk_len:]
+		if len(recs) % self.rec_len or sha256(recs).digest()[:self.chk_len] != chk:
+			vmsg('failed')
+			msg(u"WARNING: {} '{}' is invalid for this seed, ignoring".format(self.desc,self.fn))
+			return {}
+		vmsg('OK')
+		return dict((struct.unpack('>I',recs[i:i+4])[0],recs[i+4:i+self.rec_len])
+						for i in range(0,len(recs),self.rec_len))
+
+	def get(self,idx):
+		"return the nearest checkpoint preceding round 'idx', or (0,None)"
+		n = max([k for k in self.checkpoints if k < idx] or [0])
+		return n,self.checkpoints.get(n)
+
+	def add(self,num,state):
+		if num % self.interval == 0 and num not in self.checkpoints:
+			self.checkpoints[num] = state
+			self.modified = True
+
+	def save(self):
+		if not self.modified: return
+		from mmgen.crypto import encrypt_data,get_random
+		import struct
+		recs = ''.join(struct.pack('>I',k)+self.checkpoints[k] for k in sorted(self.checkpoints))
+		salt = get_random(g.salt_len)
+		enc = encrypt_data(sha256(recs).digest()[:self.chk_len]+recs,self.make_key(salt),desc=self.desc,verify=False)
+		check_or_create_dir(os.path.dirname(self.fn))
+		with open(self.fn,'wb') as f:
+			f.write(salt+enc)
+		os.chmod(self.fn,0600)
+		vmsg(u"{} written to '{}'".format(capfirst(self.desc),self.fn))
+		self.modified = False
+
 class AddrList(MMGenObject): # Address info for a single seed ID
 	msgs = {
 	'file_header': """
@@ -349,12 +615,25 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 	has_keys = False
 	ext      = 'addrs'
 	scramble_hash_rounds = 10  # not too many rounds, so hand decoding can still be feasible
+	pubkey_batch_size = 100
 	chksum_rec_f = lambda foo,e: (str(e.idx), e.addr)
+	do_chksum = True
+	acc = None # AddrListAccumulator, fed as the list is generated or parsed
+
+	@property
+	def data(self):
+		return self._data
+
+	@data.setter
+	def data(self,val):
+		self._data = val
+		self.invalidate_indexes()
 
 	def __init__(self,addrfile='',al_id='',adata=[],seed='',addr_idxs='',src='',
 					addrlist='',keylist='',mmtype=None,do_chksum=True,chksum_only=False):
 
 		self.update_msgs()
+		self.do_chksum = do_chksum
 		mmtype = mmtype or g.proto.dfl_mmtype
 		assert mmtype in MMGenAddrType.mmtypes,'{}: mmtype not in {}'.format(mmtype,repr(MMGenAddrType.mmtypes))
 
@@ -406,64 +685,154 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 	def generate(self,seed,addrnums):
 		assert type(addrnums) is AddrIdxList
 
+		sid = seed.sid
 		seed = seed.get_data()
 		seed = self.scramble_seed(seed)
 		dmsg_sc('seed',seed[:8].encode('hex'))
 
+		cache = AddrChainCache(sid,self.scramble_key,seed) if g.addr_chain_cache else None
+
 		compressed = self.al_id.mmtype.compressed
 		pubkey_type = self.al_id.mmtype.pubkey_type
 
 		gen_wallet_passwd = type(self) == KeyAddrList and 'wallet_passwd' in self.al_id.mmtype.extra_attrs
 		gen_viewkey       = type(self) == KeyAddrList and 'viewkey' in self.al_id.mmtype.extra_attrs
 
-		if self.gen_addrs:
+		jobs = self.get_jobs(len(addrnums)) if self.gen_addrs else 1
+
+		if self.gen_addrs and jobs == 1:
 			kg = KeyGenerator(self.al_id.mmtype)
 			ag = AddrGenerator(self.al_id.mmtype)
 
-		t_addrs,num,pos,out = len(addrnums),0,0,AddrListList()
-		le = self.entry_type
+		t_addrs,num,pos,out,blk = len(addrnums),0,0,AddrListColumns(self.entry_type),[]
+		acc = self.new_acc()
 
 		while pos != t_addrs:
+			# jump to the nearest checkpoint if the next round wanted is more than an interval away
+			if cache and addrnums[pos] - num > cache.interval:
+				n,state = cache.get(addrnums[pos])
+				if n > num:
+					dmsg('Resuming seed chain from cached round {}'.format(n))
+					num,seed = n,state
+
 			seed = sha512(seed).digest()
 			num += 1 # round
+			if cache: cache.add(num,seed)
 
 			if num != addrnums[pos]: continue
 
 			pos += 1
 
 			if not g.debug:
-				qmsg_r('\rGenerating {} #{} ({} of {})'.format(self.gen_desc,num,pos,t_addrs))
-
-			e = le(idx=num)
+				qmsg_r('\rGenerating {} #{} ({} of {})'.format(
+					(self.gen_desc,'secret key')[jobs>1],num,pos,t_addrs))
 
 			# Secret key is double sha256 of seed hash round /num/
-			e.sec = PrivKey(sha256(sha256(seed).digest()).digest(),compressed=compressed,pubkey_type=pubkey_type)
+			out.add_row(idx=addrnums[pos-1],
+				sec=PrivKey(sha256(sha256(seed).digest()).digest(),compressed=compressed,pubkey_type=pubkey_type))
+			e = out[-1]
 
-			if self.gen_addrs:
-				pubhex = kg.to_pubhex(e.sec)
-				e.addr = ag.to_addr(pubhex)
-				if gen_viewkey:
-					e.viewkey = ag.to_viewkey(pubhex)
-				if gen_wallet_passwd:
-					e.wallet_passwd = ag.to_wallet_passwd(e.sec)
+			if self.gen_addrs and jobs == 1: # pubkeys are generated a block at a time
+				blk.append(e)
+				if len(blk) == self.pubkey_batch_size or pos == t_addrs:
+					self.set_addr_data(blk,gen_addr_data(kg,ag,[b.sec for b in blk],gen_viewkey,gen_wallet_passwd))
+					for b in blk: acc.add(b)
+					blk = []
 
 			if type(self) == PasswordList:
 				e.passwd = unicode(self.make_passwd(e.sec)) # TODO - own type
 				dmsg('Key {:>03}: {}'.format(pos,e.passwd))
 
-			out.append(e)
-			if g.debug_addrlist: Msg('generate():\n{}'.format(e.pformat()))
+			if not self.gen_addrs: acc.add(e)
+
+		if cache: cache.save()
+
+		if jobs > 1:
+			self.gen_addrs_parallel(out,jobs,gen_viewkey,gen_wallet_passwd)
+
+		if g.debug_addrlist:
+			for e in out: Msg('generate():\n{}'.format(e.pformat()))
 
 		qmsg('\r{}: {} {}{} generated{}'.format(
 				self.al_id.hl(),t_addrs,self.gen_desc,suf(t_addrs,self.gen_desc_pl),' '*15))
 		return out
 
+	def gen_addrs_parallel(self,out,jobs,gen_viewkey,gen_wallet_passwd):
+		"""
+		Derive public keys and addresses for the entries in 'out' in a process
+		pool.  imap() preserves chunk order, so entries and checksum are the same
+		as for serial generation
+		"""
+		chunk_size = max(1,min(1000,len(out) / (jobs*4)))
+		chunks = [out[i:i+chunk_size] for i in range(0,len(out),chunk_size)]
+		args = [(str(self.al_id.mmtype),[unhexlify(e.sec.orig_hex) for e in c],gen_viewkey,gen_wallet_passwd)
+					for c in chunks]
+		pos = 0
+		for c,res in zip(chunks,_pool_imap(_gen_addr_data,args,jobs)):
+			self.set_addr_data(c,res)
+			for e in c: self.acc.add(e)
+			pos += len(c)
+			if not g.debug:
+				qmsg_r('\rGenerating {}{} ({} of {}, {} jobs)'.format(
+					self.gen_desc,self.gen_desc_pl,pos,len(out),jobs))
+
+	def get_jobs(self,nkeys):
+		jobs = (opt.jobs or 1) if nkeys > 1 else 1
+		if jobs > 1 and g.platform == 'win':
+			msg('Multiprocess key generation not supported on Windows platform, using one job')
+			jobs = 1
+		return jobs
+
+	def addrs_from_keys(self,entries,mmtype,desc,check=False):
+		"""
+		Derive addresses from the secret keys of 'entries', in opt.jobs processes.
+		Set the entries' addresses or, with 'check', compare them with the derived
+		ones, stopping at and returning the first entry that doesn't match
+		"""
+		jobs = self.get_jobs(len(entries))
+		chunk_size = max(1,min(1000,len(entries) / (jobs*4))) if jobs > 1 else self.pubkey_batch_size
+		chunks = [entries[i:i+chunk_size] for i in range(0,len(entries),chunk_size)]
+		if jobs > 1:
+			res = _pool_imap(_addrs_from_wifs,[(str(mmtype),[e.sec.wif for e in c]) for c in chunks],jobs)
+		else:
+			kg,ag = KeyGenerator(mmtype),AddrGenerator(mmtype)
+			res = (addrs_from_secs(kg,ag,[e.sec for e in c]) for c in chunks)
+		msg_f = (qmsg_r,msg_r)[check]
+		jobs_str = ', {} jobs'.format(jobs) if jobs > 1 else ''
+		pos,start = 0,time.time()
+		try:
+			for c in chunks:
+				for e,addr in zip(c,next(res)):
+					if not check:
+						e.addr = addr
+					elif e.addr != addr:
+						msg('')
+						return e
+				pos += len(c)
+				msg_f('\r{} {}/{} ({:.0f} keys/s{})'.format(
+					desc,pos,len(entries),pos / max(time.time()-start,0.001),jobs_str))
+		finally:
+			res.close()
+		self.invalidate_indexes()
+
+	def new_acc(self):
+		self.acc = AddrListAccumulator(self,chksum=self.do_chksum and type(self) != KeyList)
+		return self.acc
+
+	def set_addr_data(self,entries,data):
+		for e,(addr,viewkey,wallet_passwd) in zip(entries,data):
+			e.addr = addr
+			if viewkey: e.viewkey = viewkey
+			if wallet_passwd: e.wallet_passwd = wallet_passwd
+		self.invalidate_indexes()
+
 	def check_format(self,addr): return True # format is checked when added to list entry object
 
 	def scramble_seed(self,seed):
 		is_btcfork = g.proto.base_coin == 'BTC'
 		if is_btcfork and self.al_id.mmtype == 'L' and not g.proto.is_testnet():
 			dmsg_sc('str','(none)')
+			self.scramble_key = None
 			return seed
 		if g.proto.base_coin == 'ETH':
 			scramble_key = g.coin.lower()
@@ -473,18 +842,25 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 		if g.proto.is_testnet():
 			scramble_key += ':testnet'
 		dmsg_sc('str',scramble_key)
+		self.scramble_key = scramble_key
 		return scramble_seed(seed,scramble_key,self.scramble_hash_rounds)
 
+	# If format() hasn't been called, the file data is generated as it's encrypted or written
 	def encrypt(self,desc='new key list'):
-		from mmgen.crypto import mmgen_encrypt
-		self.fmt_data = mmgen_encrypt(self.fmt_data.encode('utf8'),desc,'')
+		if self.fmt_data:
+			from mmgen.crypto import mmgen_encrypt
+			self.fmt_data = mmgen_encrypt(self.fmt_data.encode('utf8'),desc,'')
+		else:
+			from mmgen.crypto import mmgen_encrypt_stream
+			self.fmt_data = mmgen_encrypt_stream(self.format_chunks,desc,'')
 		self.ext += '.'+g.mmenc_ext
 
 	def write_to_file(self,ask_tty=True,ask_write_default_yes=False,binary=False,desc=None):
 		tn = ('','.testnet')[g.proto.is_testnet()]
 		fn = u'{}{x}{}.{}'.format(self.id_str,tn,self.ext,x=u'-α' if g.debug_utf8 else '')
 		ask_tty = self.has_keys and not opt.quiet
-		write_data_to_file(fn,self.fmt_data,desc or self.file_desc,ask_tty=ask_tty,binary=binary)
+		data = self.fmt_data or self.format_chunks()
+		write_data_to_file(fn,data,desc or self.file_desc,ask_tty=ask_tty,binary=binary)
 
 	def idxs(self):
 		return [e.idx for e in self.data]
@@ -501,48 +877,65 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 	def comments(self):
 		return [e.label for e in self.data]
 
+	# idx->entry and addr->entry indexes of self.data, built on first use.  An index is
+	# rebuilt when self.data is replaced or changes length, or after invalidate_indexes().
+	# Staleness is detected by length only, so code that changes the idx or addr of an
+	# entry in place, or replaces entries without changing the list length, must call
+	# invalidate_indexes().
+	# For a duplicate key, the idx index holds the first entry, as did the linear search
+	# in entry(), and the addr index the last, as did the loops in make_reverse_dict()
+	# and add_wifs().
+	index_first_wins = ('idx',)
+
+	def invalidate_indexes(self):
+		self.indexes = {}
+
+	def get_index(self,attr):
+		ret = self.indexes.get(attr)
+		if ret is None or ret[0] != len(self.data):
+			data = reversed(self.data) if attr in self.index_first_wins else self.data
+			d = dict((getattr(e,attr),e) for e in data)
+			ret = self.indexes[attr] = (len(self.data),d)
+		return ret[1]
+
 	def entry(self,idx):
-		for e in self.data:
-			if idx == e.idx: return e
+		return self.get_index('idx').get(idx)
 
 	def coinaddr(self,idx):
-		for e in self.data:
-			if idx == e.idx: return e.addr
+		e = self.entry(idx)
+		if e: return e.addr
 
 	def comment(self,idx):
-		for e in self.data:
-			if idx == e.idx: return e.label
+		e = self.entry(idx)
+		if e: return e.label
 
 	def set_comment(self,idx,comment):
-		for e in self.data:
-			if idx == e.idx:
-				e.label = comment
+		e = self.entry(idx)
+		if e: e.label = comment
 
 	def make_reverse_dict(self,coinaddrs):
-		d,b = MMGenDict(),coinaddrs
-		for e in self.data:
-			try:
-				d[b[b.index(e.addr)]] = MMGenID('{}:{}'.format(self.al_id,e.idx)),e.label
-			except: pass
+		d,ai = MMGenDict(),self.get_index('addr')
+		for a in coinaddrs:
+			e = ai.get(a)
+			if e and a: d[a] = MMGenID('{}:{}'.format(self.al_id,e.idx)),e.label
 		return d
 
 	def remove_dup_keys(self,cmplist):
 		assert self.has_keys
-		pop_list = []
-		for n,d in enumerate(self.data):
-			for e in cmplist.data:
-				if e.sec.wif == d.sec.wif:
-					pop_list.append(n)
+		wifs = set(e.sec.wif for e in cmplist.data)
+		pop_list = [n for n,d in enumerate(self.data) if d.sec.wif in wifs]
 		for n in reversed(pop_list): self.data.pop(n)
 		if pop_list:
-			vmsg(self.msgs['removed_dup_keys'].format(len(pop_list),suf(removed,'s')))
+			self.invalidate_indexes()
+			vmsg(self.msgs['removed_dup_keys'].format(len(pop_list),suf(pop_list,'s')))
 
 	def add_wifs(self,key_list):
 		if not key_list: return
+		ai = key_list.get_index('addr')
 		for d in self.data:
-			for e in key_list.data:
-				if e.addr and e.sec and e.addr == d.addr:
-					d.sec = e.sec
+			e = d.addr and ai.get(d.addr)
+			if e and e.sec:
+				d.sec = e.sec
 
 	def list_missing(self,key):
 		return [d.addr for d in self.data if not getattr(d,key)]
@@ -550,22 +943,36 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 	def generate_addrs_from_keys(self):
 		# assume that the first listed mmtype is valid for flat key list
 		t = MMGenAddrType(g.proto.mmtypes[0])
-		kg = KeyGenerator(t.pubkey_type)
-		ag = AddrGenerator(t.gen_method)
-		d = self.data
-		for n,e in enumerate(d,1):
-			qmsg_r('\rGenerating addresses from keylist: {}/{}'.format(n,len(d)))
-			e.addr = ag.to_addr(kg.to_pubhex(e.sec))
-			if g.debug_addrlist: Msg('generate_addrs_from_keys():\n{}'.format(e.pformat()))
-		qmsg('\rGenerated addresses from keylist: {}/{} '.format(n,len(d)))
+		self.addrs_from_keys(self.data,t,'Generating addresses from keylist:')
+		if g.debug_addrlist:
+			for e in self.data: Msg('generate_addrs_from_keys():\n{}'.format(e.pformat()))
+		qmsg('\rGenerated addresses from keylist: {}/{}{}'.format(len(self.data),len(self.data),' '*24))
 
 	def format(self,enable_comments=False):
-
-		out = [self.msgs['file_header']+'\n']
+		self.fmt_data = u''.join(self.format_lines(enable_comments))
+
+	def format_chunks(self,enable_comments=False,chunk_size=65536):
+		"generate the UTF-8 encoded file data in chunks of at least 'chunk_size' bytes"
+		out,n = [],0
+		for l in self.format_lines(enable_comments):
+			l = l.encode('utf8')
+			out.append(l)
+			n += len(l)
+			if n >= chunk_size:
+				yield ''.join(out)
+				out,n = [],0
+		if out: yield ''.join(out)
+
+	def format_lines(self,enable_comments=False):
+		"generate the lines of the address file"
+
+		def fmt(l): return l.rstrip()+'\n'
+
+		yield fmt(self.msgs['file_header'])
 		if self.chksum:
-			out.append(u'# {} data checksum for {}: {}'.format(
+			yield fmt(u'# {} data checksum for {}: {}'.format(
 						capfirst(self.data_desc),self.id_str,self.chksum))
-			out.append('# Record this value to a secure location.\n')
+			yield fmt('# Record this value to a secure location.')
 
 		if type(self) == PasswordList:
 			lbl = u'{} {} {}:{}'.format(self.al_id.sid,self.pw_id_str,self.pw_fmt,self.pw_len)
@@ -578,67 +985,68 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 			lbl = self.al_id.sid + ('',' ')[bool(lbl_p2)] + lbl_p2
 
 		dmsg_sc('lbl',lbl[9:])
-		out.append(u'{} {{'.format(lbl))
+		yield fmt(u'{} {{'.format(lbl))
 
 		fs = u'  {:<%s}  {:<34}{}' % len(str(self.data[-1].idx))
 		for e in self.data:
 			c = ' '+e.label if enable_comments and e.label else ''
 			if type(self) == KeyList:
-				out.append(fs.format(e.idx,'{} {}'.format(self.al_id.mmtype.wif_label,e.sec.wif),c))
+				yield fmt(fs.format(e.idx,'{} {}'.format(self.al_id.mmtype.wif_label,e.sec.wif),c))
 			elif type(self) == PasswordList:
-				out.append(fs.format(e.idx,e.passwd,c))
+				yield fmt(fs.format(e.idx,e.passwd,c))
 			else: # First line with idx
-				out.append(fs.format(e.idx,e.addr,c))
+				yield fmt(fs.format(e.idx,e.addr,c))
 				if self.has_keys:
-					if opt.b16: out.append(fs.format('', 'orig_hex: '+e.sec.orig_hex,c))
-					out.append(fs.format('','{} {}'.format(self.al_id.mmtype.wif_label,e.sec.wif),c))
+					if opt.b16: yield fmt(fs.format('', 'orig_hex: '+e.sec.orig_hex,c))
+					yield fmt(fs.format('','{} {}'.format(self.al_id.mmtype.wif_label,e.sec.wif),c))
 					for k in ('viewkey','wallet_passwd'):
 						v = getattr(e,k)
-						if v: out.append(fs.format('','{}: {}'.format(k,v),c))
+						if v: yield fmt(fs.format('','{}: {}'.format(k,v),c))
 
-		out.append('}')
-		self.fmt_data = '\n'.join([l.rstrip() for l in out]) + '\n'
+		yield '}\n'
 
-	def parse_file_body(self,lines):
+	def parse_file_body(self,lines): # 'lines' may be any iterable
 
-		ret = AddrListList()
+		ret = AddrListColumns(self.entry_type)
+		acc = self.new_acc()
 		le = self.entry_type
+		conv = lambda k,v: le.__dict__[k].conv(v,le)
+		lines = iter(lines)
 
-		def get_line():
-			ret = lines.pop(0).split(None,2)
-			if ret[0] == 'orig_hex:': # hacky
-				return lines.pop(0).split(None,2)
-			return ret
+		def get_line(eof_ok=False):
+			for l in lines:
+				ret = l.split(None,2)
+				if ret[0] != 'orig_hex:': # hacky
+					return ret
+			if not eof_ok:
+				raise ValueError,'unexpected end of {} data'.format(self.data_desc)
 
-		while lines:
-			d = get_line()
+		while True:
+			d = get_line(eof_ok=True)
+			if d == None: break
 
 			assert is_mmgen_idx(d[0]),"'{}': invalid address num. in line: '{}'".format(d[0],' '.join(d))
 			assert self.check_format(d[1]),"'{}': invalid {}".format(d[1],self.data_desc)
 
 			if len(d) != 3: d.append('')
-			a = le(**{'idx':int(d[0]),self.main_attr:d[1],'label':d[2]})
+			a = {'idx':AddrIdx(d[0],on_fail='raise'),self.main_attr:conv(self.main_attr,d[1]),'label':conv('label',d[2])}
 
 			if self.has_keys: # order: wif,(orig_hex),viewkey,wallet_passwd
 				d = get_line()
 				assert d[0] == self.al_id.mmtype.wif_label,"Invalid line in file: '{}'".format(' '.join(d))
-				a.sec = PrivKey(wif=d[1])
+				a['sec'] = PrivKey(wif=d[1])
 				for k,dtype in (('viewkey',ViewKey),('wallet_passwd',WalletPassword)):
 					if k in self.al_id.mmtype.extra_attrs:
 						d = get_line()
 						assert d[0] == k+':',"Invalid line in file: '{}'".format(' '.join(d))
-						setattr(a,k,dtype(d[1]))
+						a[k] = conv(k,dtype(d[1]))
 
-			ret.append(a)
+			ret.add_row(**a)
+			acc.add(ret[-1])
 
 		if self.has_keys and keypress_confirm('Check key-to-address validity?'):
-			kg = KeyGenerator(self.al_id.mmtype)
-			ag = AddrGenerator(self.al_id.mmtype)
-			llen = len(ret)
-			for n,e in enumerate(ret):
-				msg_r('\rVerifying keys {}/{}'.format(n+1,llen))
-				assert e.addr == ag.to_addr(kg.to_pubhex(e.sec)),(
-					"Key doesn't match address!\n  {}\n  {}".format(e.sec.wif,e.addr))
+			e = self.addrs_from_keys(ret,self.al_id.mmtype,'Verifying keys',check=True)
+			assert not e,"Key doesn't match address!\n  {}\n  {}".format(e and e.sec.wif,e and e.addr)
 			msg(' - done')
 
 		return ret
@@ -676,14 +1084,23 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 			m = '{} address file format, but base coin is {}!'
 			assert base_coin == g.proto.base_coin, m.format(base_coin,g.proto.base_coin)
 
-		lines = get_lines_from_file(fn,self.data_desc+' data',trim_comments=True)
+		# the file is read and parsed line by line, so the body is parsed before the last line is checked
+		lines = get_lines_from_file_iter(fn,self.data_desc+' data',trim_comments=True)
+		body_end = []
+
+		def get_body():
+			for l in lines:
+				if l == '}':
+					body_end.append(l)
+					return
+				yield l
 
 		try:
-			assert len(lines) >= 3,  'Too few lines in address file ({})'.format(len(lines))
-			ls = lines[0].split()
-			assert 1 < len(ls) < 5,  "Invalid first line for {} file: '{}'".format(self.gen_desc,lines[0])
+			first_line = next(lines,None)
+			assert first_line != None, 'Too few lines in address file (0)'
+			ls = first_line.split()
+			assert 1 < len(ls) < 5,  "Invalid first line for {} file: '{}'".format(self.gen_desc,first_line)
 			assert ls.pop() == '{',  "'{}': invalid first line".format(ls)
-			assert lines[-1] == '}', "'{}': invalid last line".format(lines[-1])
 			sid = ls.pop(0)
 			assert is_mmgen_seed_id(sid),"'{}': invalid Seed ID".format(ls[0])
 
@@ -701,12 +1118,15 @@ Removed {{}} duplicate WIF key{{}} from keylist (also in {pnm} key-address file
 				base_coin,mmtype = 'BTC',MMGenAddrType('L')
 				check_coin_mismatch(base_coin)
 			else:
-				raise ValueError,u"'{}': Invalid first line for {} file '{}'".format(lines[0],self.gen_desc,fn)
+				raise ValueError,u"'{}': Invalid first line for {} file '{}'".format(first_line,self.gen_desc,fn)
 
 			self.al_id = AddrListID(SeedID(sid=sid),mmtype)
 
-			data = self.parse_file_body(lines[1:-1])
-			assert issubclass(type(data),list),'Invalid file body data'
+			data = self.parse_file_body(get_body())
+			assert type(data) == AddrListColumns,'Invalid file body data'
+			assert len(data),'Too few lines in address file ({})'.format(len(body_end)+1)
+			extra = next(lines,None)
+			assert body_end and extra == None, "'{}': invalid last line".format(extra or '(none)')
 		except Exception as e:
 			m = u'Invalid address list file ({})'.format(e.message)
 			if exit_on_error: die(3,m)
@@ -862,6 +1282,7 @@ Record this checksum: it will be used to verify the password file in the future
 		# unrelated set of passwords to be generated: this is what we want.
 		# NB: In original implementation, pw_id_str was 'baseN', not 'bN'
 		scramble_key = '{}:{}:{}'.format(self.pw_fmt,self.pw_len,self.pw_id_str.encode('utf8'))
+		self.scramble_key = scramble_key
 		from mmgen.crypto import scramble_seed
 		return scramble_seed(seed,scramble_key,self.scramble_hash_rounds)
 
@@ -904,7 +1325,11 @@ re-import your addresses.
 	@classmethod
 	def get_tw_data(cls):
 		vmsg('Getting address data from tracking wallet')
-		if 'label_api' in g.rpch.caps:
+		from mmgen.tw import TwCache
+		tc = TwCache.get()
+		if tc:
+			accts,alists = tc.label_data()
+		elif 'label_api' in g.rpch.caps:
 			accts = g.rpch.listlabels()
 			alists = [a.keys() for a in g.rpch.getaddressesbylabel([[k] for k in accts],batch=True)]
 		else:
@@ -28,6 +28,12 @@ from mmgen.tw import TrackingWallet,TwAddrList,TwUnspentOutputs
 from mmgen.addr import AddrData
 from mmgen.altcoins.eth.contract import Token
 
+def get_eth_balances(addrs):
+	"fetch the balances of 'addrs' with a single batch RPC request"
+	fs = [g.rpch.defer('eth_getBalance','0x'+addr) for addr in addrs]
+	g.rpch.flush()
+	return [ETHAmt(int(f.result(),16),'wei') for f in fs]
+
 class EthereumTrackingWallet(TrackingWallet):
 
 	desc = 'Ethereum tracking wallet'
@@ -193,23 +199,24 @@ Actions:         [q]uit view, [p]rint to file, pager [v]iew, [w]ide view,
 		'a':'s_amt','d':'s_addr','r':'d_reverse','M':'s_twmmid',
 		'm':'d_mmid','e':'d_redraw',
 		'q':'a_quit','p':'a_print','v':'a_view','w':'a_view_wide',
-		'l':'a_lbl_add','R':'a_addr_remove' }
+		'l':'a_lbl_add','R':'a_addr_remove','n':'d_page_next','P':'d_page_prev' }
 
 	def do_sort(self,key=None,reverse=False):
 		if key == 'txid': return
 		super(EthereumTwUnspentOutputs,self).do_sort(key=key,reverse=reverse)
 
-	def get_addr_bal(self,addr):
-		return ETHAmt(int(g.rpch.eth_getBalance('0x'+addr),16),'wei')
+	def get_addr_bals(self,addrs):
+		return get_eth_balances(addrs)
 
 	def get_unspent_rpc(self):
 		rpc_init()
-		return map(lambda d: {
+		data = TrackingWallet().sorted_list()
+		return map(lambda d,bal: {
 				'account': TwLabel(d['mmid']+' '+d['comment'],on_fail='raise'),
 				'address': d['addr'],
-				'amount': self.get_addr_bal(d['addr']),
+				'amount': bal,
 				'confirmations': 0, # TODO
-				}, TrackingWallet().sorted_list())
+				}, data, self.get_addr_bals([d['addr'] for d in data]))
 
 class EthereumTokenTwUnspentOutputs(EthereumTwUnspentOutputs):
 
@@ -219,13 +226,13 @@ class EthereumTokenTwUnspentOutputs(EthereumTwUnspentOutputs):
 
 	def get_display_precision(self): return 10 # truncate precision for narrow display
 
-	def get_addr_bal(self,addr):
-		return Token(g.token).balance(addr)
+	def get_addr_bals(self,addrs):
+		return g.rpch.run_concurrent(Token(g.token).balance,[(addr,) for addr in addrs])
 
 	def get_unspent_data(self):
 		super(type(self),self).get_unspent_data()
-		for e in self.unspent:
-			e.amt2 = ETHAmt(int(g.rpch.eth_getBalance('0x'+e.addr),16),'wei')
+		for e,bal in zip(self.unspent,get_eth_balances([e.addr for e in self.unspent])):
+			e.amt2 = bal
 
 class EthereumTwAddrList(TwAddrList):
 
@@ -238,28 +245,30 @@ class EthereumTwAddrList(TwAddrList):
 		self.total = g.proto.coin_amt('0')
 
 		from mmgen.obj import CoinAddr
+		data = []
 		for mmid,d in tw.items():
 #			if d['confirmations'] < minconf: continue # cannot get confirmations for eth account
 			label = TwLabel(mmid+' '+d['comment'],on_fail='raise')
 			if usr_addr_list and (label.mmid not in usr_addr_list): continue
-			bal = self.get_addr_balance(d['addr'])
+			data.append((label,d))
+
+		for (label,d),bal in zip(data,self.get_addr_balances([d['addr'] for label,d in data])):
 			if bal == 0 and not showempty:
 				if not label.comment: continue
 				if not all_labels: continue
-			self[label.mmid] = {'amt': g.proto.coin_amt('0'), 'lbl':  label }
+			self[label.mmid] = {'amt': g.proto.coin_amt('0'), 'lbl':  label, 'confs': None }
 			if showbtcaddrs:
 				self[label.mmid]['addr'] = CoinAddr(d['addr'])
-			self[label.mmid]['lbl'].mmid.confs = None
 			self[label.mmid]['amt'] += bal
 			self.total += bal
 
-	def get_addr_balance(self,addr):
-		return ETHAmt(int(g.rpch.eth_getBalance('0x'+addr),16),'wei')
+	def get_addr_balances(self,addrs):
+		return get_eth_balances(addrs)
 
 class EthereumTokenTwAddrList(EthereumTwAddrList):
 
-	def get_addr_balance(self,addr):
-		return self.token.balance(addr)
+	def get_addr_balances(self,addrs):
+		return g.rpch.run_concurrent(self.token.balance,[(addr,) for addr in addrs])
 
 from mmgen.tw import TwGetBalance
 class EthereumTwGetBalance(TwGetBalance):
@@ -268,7 +277,8 @@ class EthereumTwGetBalance(TwGetBalance):
 
 	def create_data(self):
 		data = TrackingWallet().mmid_ordered_dict()
-		for d in data:
+		bals = self.get_addr_balances([data[d]['addr'] for d in data])
+		for d,amt in zip(data,bals):
 			if d.type == 'mmgen':
 				key = d.obj.sid
 				if key not in self.data:
@@ -277,18 +287,16 @@ class EthereumTwGetBalance(TwGetBalance):
 				key = 'Non-MMGen'
 
 			conf_level = 2 # TODO
-			amt = self.get_addr_balance(data[d]['addr'])
-
 			self.data['TOTAL'][conf_level] += amt
 			self.data[key][conf_level] += amt
 
-	def get_addr_balance(self,addr):
-		return ETHAmt(int(g.rpch.eth_getBalance('0x'+addr),16),'wei')
+	def get_addr_balances(self,addrs):
+		return get_eth_balances(addrs)
 
 class EthereumTokenTwGetBalance(EthereumTwGetBalance):
 
-	def get_addr_balance(self,addr):
-		return Token(g.token).balance(addr)
+	def get_addr_balances(self,addrs):
+		return g.rpch.run_concurrent(Token(g.token).balance,[(addr,) for addr in addrs])
 
 class EthereumAddrData(AddrData):
 
@@ -185,6 +185,9 @@ class EthereumMMGenTX(MMGenTX):
 				else:
 					return [int(reply)]
 
+	def select_unspent_auto(self,unspent):
+		die(1,'Automatic input selection not supported for {}'.format(g.coin))
+
 	# coin-specific fee routines:
 	def get_relay_fee(self): return ETHAmt(0) # TODO
 
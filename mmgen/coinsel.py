@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+coinsel.py: Automatic selection of transaction inputs
+"""
+
+# All amounts are integers in the coin's smallest unit.  The 'effective value' of
+# an unspent output is its amount less the fee for spending it at the target fee
+# rate.  Outputs with an effective value of zero or less cost more to spend than
+# they contribute and are never selected (except by 'privacy', see below).
+
+methods = ('bnb','largest','oldest','privacy')
+
+bnb_max_tries = 100000
+
+def select_bnb(ev,target,cost_of_change,max_tries=bnb_max_tries):
+	"""
+	Branch and bound search for a set of outputs whose effective values sum to
+	within [target,target+cost_of_change], i.e. for which creating a change
+	output would cost more than dropping the excess to the fee.  Returns the
+	indexes of the set with the least excess found in 'max_tries' steps, or None.
+	See Murch, 'An Evaluation of Coin Selection Strategies' (2016).
+	"""
+	order = sorted(range(len(ev)),key=lambda i: ev[i],reverse=True)
+	vals = [ev[i] for i in order]
+	avail = sum(vals)   # sum of the values not yet included or excluded
+	if avail < target: return None
+	upper = target + cost_of_change
+	sel,cur = [],0      # sel: inclusion flags for vals[:len(sel)]
+	best,best_waste = None,None
+	for i in xrange(max_tries):
+		if cur + avail < target or cur > upper:
+			backtrack = True
+		elif cur >= target:
+			if best_waste == None or cur - target < best_waste:
+				best,best_waste = [order[j] for j,s in enumerate(sel) if s],cur - target
+				if not best_waste: break
+			backtrack = True
+		else:
+			backtrack = False
+		if backtrack: # undo trailing exclusions, then exclude the last inclusion
+			while sel and not sel[-1]:
+				sel.pop()
+				avail += vals[len(sel)]
+			if not sel: break
+			sel[-1] = False
+			cur -= vals[len(sel)-1]
+		else:
+			v = vals[len(sel)]
+			avail -= v
+			# including a value equal to one just excluded would repeat a subtree already searched
+			if sel and not sel[-1] and v == vals[len(sel)-1]:
+				sel.append(False)
+			else:
+				sel.append(True)
+				cur += v
+	return best
+
+def accumulate(ev,order,target):
+	tot,ret = 0,[]
+	for i in order:
+		ret.append(i)
+		tot += ev[i]
+		if tot >= target: return ret
+	return None
+
+def select_largest(ev,target):
+	return accumulate(ev,sorted(range(len(ev)),key=lambda i: ev[i],reverse=True),target)
+
+def select_oldest(ev,target,confs):
+	return accumulate(ev,sorted(range(len(ev)),key=lambda i: (confs[i],ev[i]),reverse=True),target)
+
+def select_privacy(ev,target,addrs):
+	"""
+	Spend whole addresses, so that no address is left partly spent: the smallest
+	address covering the target if there is one, else the largest addresses first.
+	All outputs of a selected address are spent, whatever their effective value.
+	"""
+	groups = {}
+	for i,a in enumerate(addrs):
+		groups.setdefault(a,[]).append(i)
+	totals = dict((a,sum(ev[i] for i in g)) for a,g in groups.items())
+	covering = [a for a in groups if totals[a] >= target]
+	if covering:
+		return groups[min(covering,key=lambda a: totals[a])]
+	ret = []
+	for a in sorted((a for a in groups if totals[a] > 0),key=lambda a: totals[a],reverse=True):
+		ret += groups[a]
+		target -= totals[a]
+		if target <= 0: return ret
+	return None
+
+def select_coins(method,ev,target,target_chg,cost_of_change,confs=None,addrs=None):
+	"""
+	'ev': effective values of the unspent outputs
+	'target': send amount plus fee for the transaction without inputs or change output
+	'target_chg': same, with change output
+	'cost_of_change': fee for the change output plus that for spending it later
+	Returns (indexes of the selected outputs, changeless), or (None,False) if
+	funds are insufficient
+	"""
+	assert method in methods,"'{}': unrecognized input selection method".format(method)
+	if method == 'privacy':
+		return select_privacy(ev,target_chg,addrs),False
+
+	# indexes into 'ev' of outputs that are worth spending
+	pos = [i for i in range(len(ev)) if ev[i] > 0]
+	pev = [ev[i] for i in pos]
+
+	if method == 'bnb':
+		ret = select_bnb(pev,target,cost_of_change)
+		if ret:
+			return [pos[i] for i in ret],True
+		# fall back to the smallest single output covering the target, or else largest first
+		covering = [i for i in range(len(pev)) if pev[i] >= target_chg]
+		ret = [min(covering,key=lambda i: pev[i])] if covering else select_largest(pev,target_chg)
+	elif method == 'largest':
+		ret = select_largest(pev,target_chg)
+	elif method == 'oldest':
+		ret = select_oldest(pev,target_chg,[confs[i] for i in pos])
+
+	return ([pos[i] for i in ret] if ret else None),False
+
+def plan_consolidation(ev,weights,max_weight,min_batch_ev):
+	"""
+	Group the outputs worth spending into batches whose input weights total no
+	more than 'max_weight', smallest outputs first.  Batches whose effective
+	values total less than 'min_batch_ev' (i.e. that can't pay for the rest of
+	the transaction) are dropped.  Returns a list of lists of indexes into 'ev'.
+	"""
+	ret,cur,cur_w,cur_ev = [],[],0,0
+	for i in sorted((i for i in range(len(ev)) if ev[i] > 0),key=lambda i: ev[i]):
+		if cur and cur_w + weights[i] > max_weight:
+			ret.append((cur,cur_ev))
+			cur,cur_w,cur_ev = [],0,0
+		cur.append(i)
+		cur_w += weights[i]
+		cur_ev += ev[i]
+	if cur: ret.append((cur,cur_ev))
+	return [b for b,bev in ret if bev >= min_batch_ev]
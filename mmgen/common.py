@@ -79,6 +79,16 @@ addresses of the form <seed ID>:<index>.
 
 To send the value of all inputs (minus TX fee) to a single output, specify
 one address with no amount on the command line.
+
+INPUT SELECTION: With '--select', inputs are chosen automatically to cover the
+send amount plus the fee at the current fee rate.  Outputs costing more in fees
+to spend than their value are skipped.  Methods:
+
+  bnb     - Search for a set of inputs needing no change output, else use the
+            smallest single input that suffices, else the largest inputs
+  largest - Largest inputs first
+  oldest  - Inputs with the most confirmations first
+  privacy - Spend whole addresses only, preferring the smallest one sufficing
 """.format(g=g,pnm=g.proj_name,pnu=g.proto.name.capitalize()),
 		'fee': """
 FEE SPECIFICATION: Transaction fees, both on the command line and at the
@@ -22,6 +22,7 @@ crypto.py:  Cryptographic and related routines for the MMGen suite
 
 from binascii import hexlify
 from hashlib import sha256
+from itertools import chain
 
 from mmgen.common import *
 
@@ -213,6 +214,89 @@ def mmgen_decrypt(data,desc='data',hash_preset=''):
 		msg('Incorrect passphrase or hash preset')
 		return False
 
+def _aesctr(key,iv):
+	from Crypto.Cipher import AES
+	from Crypto.Util import Counter
+	return AES.new(key,AES.MODE_CTR,counter=Counter.new(g.aesctr_iv_len*8,initial_value=iv))
+
+def _split_stream(chunks,n):
+	"return the first 'n' bytes of a chunk iterator, and an iterator over the rest"
+	buf = ''
+	for c in chunks:
+		buf += c
+		if len(buf) >= n: break
+	return buf[:n],chain([buf[n:]],chunks)
+
+def mmgen_encrypt_stream(data_f,desc='data',hash_preset=''):
+	"""
+	Like mmgen_encrypt(), but for data returned in chunks by data_f().  The data
+	is generated twice, first to hash it and then to encrypt it, so it's never
+	held in memory.  Prompts for the passphrase and returns a generator
+	"""
+	salt  = get_random(_salt_len)
+	iv    = get_random(g.aesctr_iv_len)
+	nonce = get_random(_nonce_len)
+	hp    = hash_preset or get_hash_preset_from_user('3',desc)
+	m     = ('user-requested','default')[hp=='3']
+	vmsg('Encrypting {}'.format(desc))
+	qmsg("Using {} hash preset of '{}'".format(m,hp))
+	passwd = get_new_passphrase(desc,{})
+	key    = make_key(passwd,salt,hp)
+	iv_num = int(hexlify(iv),16)
+
+	def gen():
+		h = sha256(nonce)
+		for d in data_f(): h.update(d)
+		c,v = _aesctr(key,iv_num),_aesctr(key,iv_num) # v: test decryption, as in encrypt_data()
+		yield salt+iv
+		for d in chain([h.digest()+nonce],data_f()):
+			enc_d = c.encrypt(d)
+			if v.decrypt(enc_d) != d:
+				die(2,"ERROR.\nDecrypted {s} doesn't match original {s}".format(s=desc))
+			yield enc_d
+
+	return gen()
+
+def mmgen_decrypt_stream(data_f,desc='data',hash_preset=''):
+	"""
+	Like mmgen_decrypt(), but for encrypted data returned in chunks by data_f().
+	The data is decrypted twice, first to check the passphrase and then for
+	output.  Returns a generator, or False if the check fails
+	"""
+	hdr,enc_d = _split_stream(data_f(),_salt_len+g.aesctr_iv_len)
+	salt,iv = hdr[:_salt_len],hdr[_salt_len:]
+	vmsg('Preparing to decrypt {}'.format(desc))
+	hp = hash_preset or get_hash_preset_from_user('3',desc)
+	m  = ('user-requested','default')[hp=='3']
+	qmsg("Using {} hash preset of '{}'".format(m,hp))
+	passwd = get_mmgen_passphrase(desc)
+	key    = make_key(passwd,salt,hp)
+	iv_num = int(hexlify(iv),16)
+
+	vmsg_r('Decrypting {} with key...'.format(desc))
+	c = _aesctr(key,iv_num)
+	chk,dec_d = _split_stream((c.decrypt(d) for d in enc_d),_sha256_len)
+	h = sha256()
+	for d in dec_d: h.update(d)
+	if chk != h.digest():
+		msg('Incorrect passphrase or hash preset')
+		return False
+	vmsg('OK')
+
+	def gen():
+		c = _aesctr(key,iv_num)
+		enc_d = _split_stream(data_f(),len(hdr))[1]
+		for d in _split_stream((c.decrypt(d) for d in enc_d),_sha256_len+_nonce_len)[1]:
+			if d: yield d
+
+	return gen()
+
+def mmgen_decrypt_stream_retry(data_f,desc='data'):
+	while True:
+		ret = mmgen_decrypt_stream(data_f,desc)
+		if ret: return ret
+		msg('Trying again...')
+
 def mmgen_decrypt_retry(d,desc='data'):
 	while True:
 		d_dec = mmgen_decrypt(d,desc)
@@ -51,6 +51,7 @@ class g(object):
 	max_int   = 0xffffffff
 	stdin_tty = bool(sys.stdin.isatty() or os.getenv('MMGEN_TEST_SUITE'))
 	http_timeout = 60
+	rpc_pool_size = 4 # max idle keep-alive connections kept per RPC connection object
 
 	# Variables - these might be altered at runtime:
 
@@ -61,6 +62,11 @@ class g(object):
 	tx_fee_adj   = 1.0
 	tx_confs     = 3
 	seed_len     = 256
+	jobs         = 1
+
+	addr_chain_cache          = False
+	addr_chain_cache_interval = 10000
+	tw_cache                  = False
 
 	# Constant vars - some of these might be overriden in opts.py, but they don't change thereafter
 
@@ -135,8 +141,11 @@ class g(object):
 		'daemon_data_dir','force_256_color','regtest',
 		'btc_max_tx_fee','ltc_max_tx_fee','bch_max_tx_fee','eth_max_tx_fee',
 		'eth_mainnet_chain_name','eth_testnet_chain_name',
-		'max_tx_file_size'
+		'addr_chain_cache','addr_chain_cache_interval','rpc_pool_size',
+		'tw_cache','max_tx_file_size'
 	)
+	# accepted in the config file, but ignored:
+	cfg_file_opts_deprecated = ('max_tx_file_size',)
 	env_opts = (
 		'MMGEN_BOGUS_WALLET_DATA',
 		'MMGEN_DEBUG_ALL',
@@ -152,16 +161,17 @@ class g(object):
 		'MMGEN_NO_LICENSE',
 		'MMGEN_RPC_HOST',
 		'MMGEN_TESTNET',
-		'MMGEN_REGTEST'
+		'MMGEN_REGTEST',
+		'MMGEN_ADDR_CHAIN_CACHE',
+		'MMGEN_TW_CACHE'
 	)
 
 	min_screen_width = 80
 	minconf = 1
-	max_tx_file_size = 100000
 
 	# Global var sets user opt:
 	global_sets_opt = ['minconf','seed_len','hash_preset','usr_randchars','debug',
-						'quiet','tx_confs','tx_fee_adj','key_generator']
+						'quiet','tx_confs','tx_fee_adj','key_generator','jobs']
 
 	passwd_max_tries = 5
 
@@ -36,9 +36,17 @@ def launch(what):
 		what = 'wallet'
 	if what == 'keygen': what = 'addrgen'
 
+	def run_main(name):
+		# Load the main program module with imp.load_module() rather than importing it,
+		# so that it doesn't run with the import lock held and the threads it starts can
+		# import.  As with an import, the cached bytecode is used if it's up to date.
+		import imp,mmgen
+		f,path,desc = imp.find_module(name,mmgen.__path__)
+		with f: imp.load_module('mmgen.' + name,f,path,desc)
+
 	try: import termios
 	except: # Windows
-		__import__('mmgen.main_' + what)
+		run_main('main_' + what)
 	else:
 		import os,atexit
 		if sys.stdin.isatty():
@@ -46,7 +54,7 @@ def launch(what):
 			old = termios.tcgetattr(fd)
 			def at_exit(): termios.tcsetattr(fd, termios.TCSADRAIN, old)
 			atexit.register(at_exit)
-		try: __import__('mmgen.main_' + what)
+		try: run_main('main_' + what)
 		except KeyboardInterrupt:
 			sys.stderr.write('\nUser interrupt\n')
 		except EOFError:
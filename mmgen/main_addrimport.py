@@ -134,7 +134,7 @@ if opt.rescan: import threading
 
 fs = u'Importing {} address{} from {}{}'
 bm =' (batch mode)' if opt.batch else ''
-msg(fs.format(len(al.data),suf(al.data,'es'),infile,bm))
+msg(fs.format(len(al.data),suf(len(al.data),'es'),infile,bm))
 
 if not al.data[0].addr.is_for_chain(g.chain):
 	die(2,'Address{} not compatible with {} chain!'.format((' list','')[bool(opt.address)],g.chain))
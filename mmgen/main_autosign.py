@@ -102,7 +102,7 @@ cmd_args = opts.init(opts_data,add_opts=['mmgen_keys_from_file','in_fmt'])
 
 import mmgen.tx
 import mmgen.altcoins.eth.tx
-from mmgen.txsign import txsign
+from mmgen.txsign import txsign,generate_kals_for_txs,check_unused_sids,saved_seeds
 from mmgen.protocol import CoinProtocol,init_coin
 
 if opt.stealth_led: opt.led = True
@@ -160,46 +160,72 @@ def do_umount():
 		msg('Unmounting '+mountpoint)
 		subprocess.call(['umount',mountpoint])
 
-def sign_tx_file(txfile):
-	try:
-		g.testnet = False
-		g.coin = 'BTC'
-		tmp_tx = mmgen.tx.MMGenTX(txfile,metadata_only=True)
-		init_coin(tmp_tx.coin)
-
-		if tmp_tx.chain != 'mainnet':
-			if tmp_tx.chain == 'testnet' or (
-				hasattr(g.proto,'chain_name') and tmp_tx.chain != g.proto.chain_name):
-				g.testnet = True
-				init_coin(tmp_tx.coin)
-
-		if hasattr(g.proto,'chain_name'):
-			m = 'Chains do not match! tx file: {}, proto: {}'
-			assert tmp_tx.chain == g.proto.chain_name,m.format(tmp_tx.chain,g.proto.chain_name)
-
-		g.chain = tmp_tx.chain
-		g.token = tmp_tx.dcoin
-		g.dcoin = tmp_tx.dcoin or g.coin
+def init_tx_coin(tmp_tx):
+	"set the coin and chain from a transaction's metadata"
+	g.testnet = False
+	g.coin = 'BTC'
+	init_coin(tmp_tx.coin)
+
+	if tmp_tx.chain != 'mainnet':
+		if tmp_tx.chain == 'testnet' or (
+			hasattr(g.proto,'chain_name') and tmp_tx.chain != g.proto.chain_name):
+			g.testnet = True
+			init_coin(tmp_tx.coin)
+
+	if hasattr(g.proto,'chain_name'):
+		m = 'Chains do not match! tx file: {}, proto: {}'
+		assert tmp_tx.chain == g.proto.chain_name,m.format(tmp_tx.chain,g.proto.chain_name)
+
+	g.chain = tmp_tx.chain
+	g.token = tmp_tx.dcoin
+	g.dcoin = tmp_tx.dcoin or g.coin
+
+	reload(sys.modules['mmgen.tx'])
+	if g.proto.base_coin == 'ETH':
+		reload(sys.modules['mmgen.altcoins.eth.tx'])
+
+	if g.proto.sign_mode == 'daemon':
+		rpc_init(reinit=True)
+	return True
+
+def sign_tx_files(txfiles):
+	"""
+	Sign transaction files for the same coin, chain and token as a batch: the coin
+	is initialized once, and the keys for all transactions are derived at once.
+	A file that can't be read or signed fails on its own.  Returns the number of
+	transactions that failed to sign
+	"""
+	def try_call(func,*args):
+		try:
+			return func(*args)
+		except Exception as e:
+			msg(u'An error occurred: {}'.format(e.message))
+		except:
+			pass
 
-		reload(sys.modules['mmgen.tx'])
-		if g.proto.base_coin == 'ETH':
-			reload(sys.modules['mmgen.altcoins.eth.tx'])
+	if not try_call(lambda: init_tx_coin(mmgen.tx.MMGenTX(txfiles[0],metadata_only=True))):
+		return len(txfiles)
 
-		tx = mmgen.tx.MMGenTX(txfile)
+	txs = [tx for tx in (try_call(mmgen.tx.MMGenTX,f) for f in txfiles) if tx]
+	fails = len(txfiles) - len(txs)
 
-		if g.proto.sign_mode == 'daemon':
-			rpc_init(reinit=True)
+	# if the batch fails, the keys are derived for each transaction by txsign()
+	kals = try_call(generate_kals_for_txs,txs,wfs,saved_seeds)
 
-		if txsign(tx,wfs,None,None):
-			tx.write_to_file(ask_write=False)
-			return True
-		else:
-			return False
-	except Exception as e:
-		msg(u'An error occurred: {}'.format(e.message))
-		return False
-	except:
-		return False
+	for tx in txs:
+		try:
+			if txsign(tx,wfs,None,None,kals=kals):
+				tx.write_to_file(ask_write=False)
+			else:
+				fails += 1
+		except Exception as e:
+			msg(u'An error occurred: {}'.format(e.message))
+			fails += 1
+		except:
+			fails += 1
+		qmsg('')
+	check_unused_sids(txs)
+	return fails
 
 def sign():
 	dirlist  = os.listdir(tx_dir)
@@ -208,12 +234,28 @@ def sign():
 	unsigned = [os.path.join(tx_dir,f) for f in raw if f[:-6] not in signed]
 
 	if unsigned:
-		fails = 0
+		# group the files by coin, chain and token, preserving order
+		groups,fails = [],0
 		for txfile in unsigned:
-			ret = sign_tx_file(txfile)
-			if not ret:
+			try:
+				g.coin = 'BTC'
+				t = mmgen.tx.MMGenTX(txfile,metadata_only=True)
+				k = (t.coin,t.chain,t.dcoin)
+			except Exception as e:
+				msg(u'An error occurred: {}'.format(e.message))
+				fails += 1
+				continue
+			except:
 				fails += 1
-			qmsg('')
+				continue
+			for gk,files in groups:
+				if gk == k:
+					files.append(txfile)
+					break
+			else:
+				groups.append((k,[txfile]))
+		for k,files in groups:
+			fails += sign_tx_files(files)
 		time.sleep(0.3)
 		n_ok = len(unsigned) - fails
 		msg('{} transaction{} signed'.format(n_ok,suf(n_ok)))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+mmgen-consolidate: Consolidate the unspent outputs in an MMGen tracking wallet
+"""
+
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': """Consolidate the unspent outputs in a {pnm} tracking wallet into a
+                series of transactions""".format(pnm=g.proj_name),
+	'usage':'[opts] <{pnm} address>'.format(pnm=g.proj_name),
+	'options': """
+-h, --help            Print this help message
+--, --longhelp        Print help message for long options (common options)
+-a, --tx-fee-adj=  f  Adjust transaction fee by factor 'f' (see below)
+-c, --comment-file=f  Source the transactions' comment from file 'f'
+-C, --tx-confs=    c  Desired number of confirmations (default: {g.tx_confs})
+-d, --outdir=      d  Specify an alternate directory 'd' for output
+-f, --tx-fee=      f  Transaction fee rate, as {fu} (an integer
+                      followed by {fl}).  If omitted, the fee rate will
+                      be calculated using network fee estimation.
+-m, --minconf=     n  Minimum number of confirmations required to spend
+                      outputs (default: 1)
+-M, --max-vsize=   n  Maximum vsize of each transaction (default: {mv})
+-n, --max-txs=     n  Create at most 'n' transactions
+-q, --quiet           Suppress warnings; overwrite files without prompting
+-r, --rbf             Make transactions BIP 125 replaceable (replace-by-fee)
+-v, --verbose         Produce more verbose output
+-V, --vsize-adj=   f  Adjust transactions' estimated vsize by factor 'f'
+-y, --yes             Answer 'yes' to prompts, suppress non-essential output
+""",
+	'options_fmt_args': lambda: dict(
+							g=g,
+							mv=g.proto.max_std_vsize,
+							fu=help_notes('rel_fee_desc'),
+							fl=help_notes('fee_spec_letters') ),
+	'notes': lambda: """
+
+All unspent outputs in the tracking wallet are spent to the single {pnm} address
+given on the command line, smallest outputs first, in as many transactions as
+required.  Outputs that would cost more in fees to spend than their value are
+skipped, as is any group of outputs too small to pay for the rest of its
+transaction.  Transactions are made no larger than the maximum standard size,
+nor than the size at which the fee would exceed {c}'s maximum transaction fee
+of {mf} {c}.
+
+The resulting transaction files may be signed in one batch with '{pnl}-txsign'
+or '{pnl}-autosign'.
+
+Network-estimated fees will be multiplied by the value of '--tx-fee-adj',
+if specified.
+""".format(pnm=g.proj_name,pnl=g.proj_name.lower(),c=g.coin,mf=g.proto.max_tx_fee)
+}
+
+cmd_args = opts.init(opts_data)
+
+if g.proto.base_coin == 'ETH':
+	die(1,'Consolidation not supported for {}'.format(g.coin))
+
+if len(cmd_args) != 1:
+	die(1,'This command requires exactly one {} address as argument'.format(g.proj_name))
+
+rpc_init()
+
+do_license_msg()
+
+from mmgen.tx import MMGenConsolidateTX
+from mmgen.tw import TwUnspentOutputs
+tw = TwUnspentOutputs(minconf=opt.minconf)
+
+txs,skipped = MMGenConsolidateTX().plan(cmd_args[0],tw.unspent,
+				max_vsize=int(opt.max_vsize or 0),max_txs=int(opt.max_txs or 0) or None)
+
+if not txs:
+	die(2,'No outputs worth consolidating at this fee rate ({} unspent output{} skipped)'.format(
+		len(skipped),suf(skipped,'s')))
+
+fs = '{:>4} {:>7} {:>7} {:>13} {:>17}'
+msg(fs.format('TX','Inputs','Vsize','Fee','Amount'))
+for n,tx in enumerate(txs,1):
+	msg(fs.format(n,len(tx.inputs),tx.estimate_size(),tx.fee,tx.send_amt))
+msg('{} transaction{} spending {} unspent output{} ({} skipped), total fee {} {}'.format(
+	len(txs),suf(txs,'s'),
+	sum(len(tx.inputs) for tx in txs),suf(len(tw.unspent)-len(skipped),'s'),
+	len(skipped),
+	g.proto.coin_amt(sum(tx.fee for tx in txs)).hl(),g.coin))
+
+if not (opt.yes or keypress_confirm('Write transaction{}?'.format(suf(txs,'s')),default_yes=True)):
+	die(1,'Exiting at user request')
+
+for tx in txs:
+	tx.write_to_file(ask_write=False,ask_overwrite=not opt.yes,ask_write_default_yes=False)
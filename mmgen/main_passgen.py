@@ -136,8 +136,6 @@ ss = SeedSource(sf)
 
 al = PasswordList(seed=ss.seed,pw_idxs=pw_idxs,pw_id_str=pw_id_str,pw_len=pw_len,pw_fmt=pw_fmt)
 
-al.format()
-
 if keypress_confirm('Encrypt password list?'):
 	al.encrypt(desc='password list')
 	al.write_to_file(binary=True,desc='encrypted password list')
@@ -50,6 +50,8 @@ opts_data = lambda: {
                       outputs (default: 1)
 -q, --quiet           Suppress warnings; overwrite files without prompting
 -r, --rbf             Make transaction BIP 125 replaceable (replace-by-fee)
+-S, --select=      m  Select inputs automatically using method 'm', without
+                      displaying the unspent outputs (see INPUT SELECTION)
 -v, --verbose         Produce more verbose output
 -V, --vsize-adj=   f  Adjust transaction's estimated vsize by factor 'f'
 -y, --yes             Answer 'yes' to prompts, suppress non-essential output
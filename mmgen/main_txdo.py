@@ -52,6 +52,8 @@ opts_data = lambda: {
 -l, --seed-len=      l Specify wallet seed length of 'l' bits. This option
                        is required only for brainwallet and incognito inputs
                        with non-standard (< {g.seed_len}-bit) seed lengths.
+-j, --jobs=          n Derive or verify addresses for keys read from files in
+                       'n' parallel processes (default: {g.jobs})
 -k, --keys-from-file=f Provide additional keys for non-{pnm} addresses
 -K, --key-generator= m Use method 'm' for public key generation
                        Options: {kgs}
@@ -70,6 +72,8 @@ opts_data = lambda: {
 -P, --passwd-file=   f Get {pnm} wallet passphrase from file 'f'
 -r, --rbf              Make transaction BIP 125 (replace-by-fee) replaceable
 -q, --quiet            Suppress warnings; overwrite files without prompting
+-S, --select=        m Select inputs automatically using method 'm', without
+                       displaying the unspent outputs (see INPUT SELECTION)
 -v, --verbose          Produce more verbose output
 -V, --vsize-adj=     f Adjust transaction's estimated vsize by factor 'f'
 -y, --yes              Answer 'yes' to prompts, suppress non-essential output
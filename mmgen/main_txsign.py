@@ -45,6 +45,8 @@ opts_data = lambda: {
 -p, --hash-preset=p   Use the scrypt hash parameters defined by preset 'p'
                       for password hashing (default: '{g.hash_preset}')
 -z, --show-hash-presets Show information on available hash presets
+-j, --jobs=        n  Derive or verify addresses for keys read from files in
+                      'n' parallel processes (default: {g.jobs})
 -k, --keys-from-file=f Provide additional keys for non-{pnm} addresses
 -K, --key-generator=m Use method 'm' for public key generation
                       Options: {kgs} (default: {kg})
@@ -90,7 +92,7 @@ kal        = get_keyaddrlist(opt)
 kl         = get_keylist(opt)
 if kl and kal: kl.remove_dup_keys(kal)
 
-tx_num_str,bad_tx_count = '',0
+tx_num_str,txs = '',[]
 for tx_num,tx_file in enumerate(tx_files,1):
 	if len(tx_files) > 1:
 		msg('\nTransaction #{} of {}:'.format(tx_num,len(tx_files)))
@@ -111,7 +113,16 @@ for tx_num,tx_file in enumerate(tx_files,1):
 	if not opt.yes:
 		tx.view_with_prompt('View data for transaction{}?'.format(tx_num_str))
 
-	if txsign(tx,seed_files,kl,kal,tx_num_str):
+	txs.append((tx_num_str,tx))
+
+# Derive the keys for all transactions at once, then sign them
+kals = generate_kals_for_txs([tx for n,tx in txs],seed_files,saved_seeds,keyaddr_list=kal)
+
+bad_tx_count = 0
+for tx_num_str,tx in txs:
+	if len(tx_files) > 1:
+		msg('\nSigning transaction{}:'.format(tx_num_str))
+	if txsign(tx,seed_files,kl,kal,tx_num_str,kals=kals):
 		if not opt.yes:
 			tx.add_comment() # edits an existing comment
 		tx.write_to_file(ask_write=not opt.yes,ask_write_default_yes=True,add_desc=tx_num_str)
@@ -119,5 +130,7 @@ for tx_num,tx_file in enumerate(tx_files,1):
 		ymsg('Transaction could not be signed')
 		bad_tx_count += 1
 
+if txs: check_unused_sids([tx for n,tx in txs])
+
 if bad_tx_count:
 	ydie(2,'{} transaction{} could not be signed'.format(bad_tx_count,suf(bad_tx_count)))
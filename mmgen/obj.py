@@ -132,6 +132,56 @@ class InitErrors(object):
 			if m: msg(m)
 			return None                       # TODO: here too?
 
+class ObjCache(object):
+	"""
+	Bounded cache of validated instances of immutable string classes, keyed on
+	class, coin protocol and input string.  Instances converted from the same
+	string, or to the same string, are shared, so they're made read-only when
+	added (see InternedObj).  The cache is emptied when full.
+	"""
+	max_size = 65536
+
+	def __init__(self):
+		self.data = {}
+		self.hits = self.misses = 0
+
+	def get(self,cls,s):
+		from mmgen.globalvars import g
+		try:
+			ret = self.data[(cls,g.proto,s)]
+		except (KeyError,TypeError): # TypeError: unhashable input, which will fail conversion
+			self.misses += 1
+			return None
+		self.hits += 1
+		return ret
+
+	def add(self,cls,s,obj):
+		from mmgen.globalvars import g
+		if len(self.data) >= self.max_size:
+			self.data.clear()
+		obj = self.data.setdefault((cls,g.proto,obj),obj)
+		self.data[(cls,g.proto,s)] = obj
+		object.__setattr__(obj,'_interned',True)
+		return obj
+
+	def stats(self):
+		n = self.hits + self.misses
+		return 'Object cache: {} lookups, {} hits ({:.1f}%), {} entries'.format(
+			n,self.hits,(100.0 * self.hits / n if n else 0),len(self.data))
+
+obj_cache = ObjCache()
+
+class InternedObj(object):
+	"""
+	Base for classes whose instances are shared via obj_cache.  Attributes may be
+	set only during construction: per-use data must be stored outside the instance.
+	"""
+	def __setattr__(self,name,value):
+		if getattr(self,'_interned',False):
+			m = "'{}': cannot set attribute of shared {} instance"
+			raise AttributeError(m.format(name,type(self).__name__))
+		return object.__setattr__(self,name,value)
+
 class Hilite(object):
 
 	color = 'red'
@@ -207,14 +257,16 @@ class MMGenImmutableAttr(object): # Descriptor
 		if not self.set_attr_ok(instance):
 			m = "Attribute '{}' of {} instance cannot be reassigned"
 			raise AttributeError(m.format(self.name,type(instance)))
+		instance.__dict__[self.name] = self.conv(value,type(instance))
+
+	def conv(self,value,owner):
 		if self.typeconv:   # convert type
-			instance.__dict__[self.name] = \
-				globals()[self.dtype](value,on_fail='raise') if type(self.dtype) == str else self.dtype(value)
+			return globals()[self.dtype](value,on_fail='raise') if type(self.dtype) == str else self.dtype(value)
 		else:               # check type
 			if type(value) != self.dtype:
 				m = "Attribute '{}' of {} instance must of type {}"
-				raise TypeError(m.format(self.name,type(instance),self.dtype))
-			instance.__dict__[self.name] = value
+				raise TypeError(m.format(self.name,owner,self.dtype))
+			return value
 
 	def __delete__(self,instance):
 		m = "Atribute '{}' of {} instance cannot be deleted"
@@ -399,13 +451,15 @@ class LTCAmt(BTCAmt): max_amt = 84000000
 
 from mmgen.altcoins.eth.obj import ETHAmt,ETHNonce
 
-class CoinAddr(str,Hilite,InitErrors,MMGenObject):
+class CoinAddr(str,Hilite,InitErrors,InternedObj,MMGenObject):
 	color = 'cyan'
 	hex_width = 40
 	width = 1
 	trunc_ok = False
 	def __new__(cls,s,on_fail='die'):
 		if type(s) == cls: return s
+		me = obj_cache.get(cls,s)
+		if me is not None: return me
 		cls.arg_chk(cls,on_fail)
 		from mmgen.globalvars import g
 		try:
@@ -415,7 +469,7 @@ class CoinAddr(str,Hilite,InitErrors,MMGenObject):
 			assert va,'failed verification'
 			me.addr_fmt = va['format']
 			me.hex = va['hex']
-			return me
+			return obj_cache.add(cls,s,me)
 		except Exception as e:
 			m = "{!r}: value cannot be converted to {} address ({})"
 			return cls.init_fail(m.format(s,g.proto.__name__,e.message),on_fail)
@@ -489,11 +543,13 @@ class SeedID(str,Hilite,InitErrors):
 			m = "{!r}: value cannot be converted to SeedID ({})"
 			return cls.init_fail(m.format(seed or sid,e.message),on_fail)
 
-class MMGenID(str,Hilite,InitErrors,MMGenObject):
+class MMGenID(str,Hilite,InitErrors,InternedObj,MMGenObject):
 	color = 'orange'
 	width = 0
 	trunc_ok = False
 	def __new__(cls,s,on_fail='die'):
+		me = obj_cache.get(cls,s)
+		if me is not None: return me
 		cls.arg_chk(cls,on_fail)
 		from mmgen.globalvars import g
 		try:
@@ -507,17 +563,19 @@ class MMGenID(str,Hilite,InitErrors,MMGenObject):
 			assert t in g.proto.mmtypes,'{}: invalid address type for {}'.format(t,g.proto.__name__)
 			me.al_id = str.__new__(AddrListID,me.sid+':'+me.mmtype) # checks already done
 			me.sort_key = '{}:{}:{:0{w}}'.format(me.sid,me.mmtype,me.idx,w=me.idx.max_digits)
-			return me
+			return obj_cache.add(cls,s,me)
 		except Exception as e:
 			m = "{}\n{!r}: value cannot be converted to MMGenID"
 			return cls.init_fail(m.format(e.message,s),on_fail)
 
-class TwMMGenID(str,Hilite,InitErrors,MMGenObject):
+class TwMMGenID(str,Hilite,InitErrors,InternedObj,MMGenObject):
 	color = 'orange'
 	width = 0
 	trunc_ok = False
 	def __new__(cls,s,on_fail='die'):
 		if type(s) == cls: return s
+		me = obj_cache.get(cls,s)
+		if me is not None: return me
 		cls.arg_chk(cls,on_fail)
 		ret = None
 		try:
@@ -539,12 +597,14 @@ class TwMMGenID(str,Hilite,InitErrors,MMGenObject):
 		me.obj = ret
 		me.sort_key = sort_key
 		me.type = idtype
-		return me
+		return obj_cache.add(cls,s,me)
 
 # contains TwMMGenID,TwComment.  Not for display
-class TwLabel(unicode,InitErrors,MMGenObject):
+class TwLabel(unicode,InitErrors,InternedObj,MMGenObject):
 	def __new__(cls,s,on_fail='die'):
 		if type(s) == cls: return s
+		me = obj_cache.get(cls,s)
+		if me is not None: return me
 		cls.arg_chk(cls,on_fail)
 		try:
 			ss = s.split(None,1)
@@ -553,7 +613,7 @@ class TwLabel(unicode,InitErrors,MMGenObject):
 			me = unicode.__new__(cls,u'{}{}'.format(mmid,u' {}'.format(comment) if comment else ''))
 			me.mmid = mmid
 			me.comment = comment
-			return me
+			return obj_cache.add(cls,s,me)
 		except Exception as e:
 			m = u"{}\n{!r}: value cannot be converted to TwLabel"
 			return cls.init_fail(m.format(e.message,s),on_fail)
@@ -141,7 +141,7 @@ def get_data_from_cfg_file():
 	return data['cfg']
 
 def override_from_cfg_file(cfg_data):
-	from mmgen.util import die,strip_comments,set_for_type
+	from mmgen.util import die,msg,strip_comments,set_for_type
 	import re
 	from mmgen.protocol import CoinProtocol
 	for n,l in enumerate(cfg_data.splitlines(),1): # DOS-safe
@@ -150,7 +150,9 @@ def override_from_cfg_file(cfg_data):
 		m = re.match(r'(\w+)\s+(\S+)$',l)
 		if not m: die(2,"Parse error in file '{}', line {}".format(g.cfg_file,n))
 		name,val = m.groups()
-		if name in g.cfg_file_opts:
+		if name in g.cfg_file_opts_deprecated:
+			msg("Warning: '{}': option is no longer used, ignoring ('{}', line {})".format(name,g.cfg_file,n))
+		elif name in g.cfg_file_opts:
 			pfx,cfg_var = name.split('_',1)
 			if pfx in CoinProtocol.coins:
 				tn = False
@@ -329,6 +331,10 @@ def init(opts_f,add_opts=[],opt_filter=None):
 
 	if g.debug and g.prog_name != 'test.py':
 		opt.verbose,opt.quiet = True,None
+	if g.debug:
+		import atexit
+		from mmgen.obj import obj_cache
+		atexit.register(lambda: Msg(obj_cache.stats()))
 	if g.debug_opts: opt_postproc_debug()
 
 	# We don't need this data anymore
@@ -496,6 +502,15 @@ def check_opts(usr_opts):       # Returns false if any check fails
 		elif key == 'vsize_adj':
 			if not opt_is_float(val,desc): return False
 			ymsg('Adjusting transaction vsize by a factor of {:1.2f}'.format(float(val)))
+		elif key in ('jobs','max_vsize','max_txs'):
+			if not opt_is_int(val,desc): return False
+			if not opt_compares(int(val),'>',0,desc): return False
+		elif key == 'select':
+			from mmgen.coinsel import methods
+			if not opt_is_in_list(val,methods,desc): return False
+			if 'inputs' in usr_opts:
+				msg('--select and --inputs are mutually exclusive')
+				return False
 		elif key == 'key_generator':
 			if not opt_compares(val,'<=',len(g.key_generators),desc): return False
 			if not opt_compares(val,'>',0,desc): return False
@@ -21,7 +21,7 @@ protocol.py: Coin protocol functions, classes and methods
 """
 
 import sys,os,hashlib
-from binascii import unhexlify
+from binascii import hexlify,unhexlify
 from mmgen.util import msg,pmsg,ymsg,Msg,pdie,ydie
 from mmgen.obj import MMGenObject,BTCAmt,LTCAmt,BCHAmt,B2XAmt,ETHAmt
 from mmgen.globalvars import g
@@ -48,8 +48,14 @@ def _numtob58(num):
 			n /= 58
 	return ''.join(b58enc(num))[::-1]
 
+_b58d = dict((ch,n) for n,ch in enumerate(_b58a))
+
 def _b58tonum(b58str):
-	return sum(_b58a.index(ch) * 58**n for n,ch in enumerate(b58str[::-1]))
+	num = 0
+	for ch in b58str:
+		try: num = num*58 + _b58d[ch]
+		except KeyError: raise ValueError,'_b58tonum(): {!r}: invalid base58 character'.format(ch)
+	return num
 
 def _b58chk_encode(hexstr):
 	return _numtob58(int(hexstr+hash256(hexstr)[:8],16))
@@ -75,6 +81,8 @@ class BitcoinProtocol(MMGenObject):
 	secs_per_block  = 600
 	coin_amt        = BTCAmt
 	max_tx_fee      = BTCAmt('0.003')
+	max_std_vsize   = 100000 # MAX_STANDARD_TX_WEIGHT / 4, per Bitcoin Core's policy.h
+	dust_limit      = 546    # in the coin's smallest unit: Bitcoin Core's dust threshold for P2PKH
 	daemon_data_dir = os.path.join(os.getenv('APPDATA'),'Bitcoin') if g.platform == 'win' \
 						else os.path.join(g.home_dir,'.bitcoin')
 	daemon_data_subdir = ''
@@ -92,7 +100,7 @@ class BitcoinProtocol(MMGenObject):
 	witness_vernum_hex = '00'
 	witness_vernum     = int(witness_vernum_hex,16)
 	bech32_hrp         = 'bc'
-	sign_mode          = 'daemon'
+	sign_mode          = 'standalone' # see txsigner.py
 	secp256k1_ge       = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
 
 	@classmethod
@@ -206,6 +214,24 @@ class BitcoinProtocol(MMGenObject):
 		d = map(ord,pubhash.decode('hex'))
 		return bech32.bech32_encode(cls.bech32_hrp,[cls.witness_vernum]+bech32.convertbits(d,8,5))
 
+	# Batch conversion of serialized pubkeys (raw bytes) to 'p2pkh', 'segwit' or 'bech32'
+	# addresses.  Uses the compiled addrenc module if available, else the methods above.
+	@classmethod
+	def pubkeys2addrs(cls,pubkeys,addr_fmt):
+		if not pubkeys: return []
+		try:
+			from mmgen.addrenc import pubs2addrs
+		except ImportError:
+			f = {   'p2pkh':  lambda h: cls.pubhash2addr(hash160(h),p2sh=False),
+					'segwit': cls.pubhex2segwitaddr,
+					'bech32': lambda h: cls.pubhash2bech32addr(hash160(h)) }[addr_fmt]
+			return [f(hexlify(k)) for k in pubkeys]
+		publen = len(pubkeys[0])
+		assert all(len(k) == publen for k in pubkeys),'pubkeys must all be of the same length'
+		ver = unhexlify(cls.addr_ver_num[('p2pkh','p2sh')[addr_fmt=='segwit']][0]) if addr_fmt != 'bech32' else ''
+		hrp = cls.bech32_hrp if addr_fmt == 'bech32' else ''
+		return pubs2addrs(''.join(pubkeys),publen,addr_fmt,ver,hrp,cls.witness_vernum)
+
 class BitcoinTestnetProtocol(BitcoinProtocol):
 	addr_ver_num         = { 'p2pkh': ('6f',('m','n')), 'p2sh':  ('c4','2') }
 	wif_ver_num          = { 'std': 'ef' }
@@ -273,6 +299,7 @@ class LitecoinProtocol(BitcoinProtocol):
 	rpc_port       = 9332
 	coin_amt       = LTCAmt
 	max_tx_fee     = LTCAmt('0.3')
+	dust_limit     = 54600 # P2PKH dust threshold at a relay fee of 0.001 LTC/kB
 	base_coin      = 'LTC'
 	forks          = []
 	bech32_hrp     = 'ltc'
@@ -375,7 +402,7 @@ class ZcashProtocol(BitcoinProtocolAddrgen):
 	def pubhash2addr(cls,pubkey_hash,p2sh):
 		hl = len(pubkey_hash)
 		if hl == 40:
-			return super(cls,cls).pubhash2addr(pubkey_hash,p2sh)
+			return super(ZcashProtocol,cls).pubhash2addr(pubkey_hash,p2sh)
 		elif hl == 128:
 			raise NotImplementedError,'Zcash z-addresses have no pubkey hash'
 		else:
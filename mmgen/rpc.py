@@ -20,7 +20,7 @@
 rpc.py:  Cryptocoin RPC library for the MMGen suite
 """
 
-import httplib,base64,json
+import httplib,socket,base64,json,threading
 
 from mmgen.common import *
 from decimal import Decimal
@@ -28,6 +28,82 @@ from decimal import Decimal
 def dmsg_rpc(s):
 	if g.debug_rpc: msg(s)
 
+class RPCFuture(object):
+	"""
+	Result of a call queued with CoinDaemonRPCConnection.defer().  result() flushes
+	the queue if necessary and returns the call's result or handles its error
+	according to 'on_fail', as with request()
+	"""
+	def __init__(self,rpc,cmd,on_fail):
+		self.rpc = rpc
+		self.cmd = cmd
+		self.on_fail = on_fail
+		self.done = False
+
+	def set_result(self,ret):
+		self.ret = ret
+		self.done = True
+
+	def result(self):
+		if not self.done:
+			self.rpc.flush()
+		if rpc_error(self.ret) and self.on_fail == 'raise':
+			raise RPCFailure,rpc_errmsg(self.ret)
+		return self.ret
+
+class RPCReplyStream(object):
+	"""
+	Incremental parser for a JSON reply read from file-like object 'fp'.  Only the
+	unparsed part of the current chunk is kept in memory.
+	"""
+	ws = u' \t\n\r'
+
+	def __init__(self,fp,chunk_size=65536):
+		import codecs
+		self.fp = fp
+		self.chunk_size = chunk_size
+		self.decoder = json.JSONDecoder(parse_float=Decimal)
+		self.udec = codecs.getincrementaldecoder('utf8')()
+		self.buf,self.pos,self.eof = u'',0,False
+
+	def fill(self): # returns False at end of input
+		if self.eof: return False
+		data = self.fp.read(self.chunk_size)
+		self.eof = not data
+		self.buf = self.buf[self.pos:] + self.udec.decode(data,final=self.eof)
+		self.pos = 0
+		return not self.eof
+
+	def peek(self): # skip whitespace and return next char, or None at end of input
+		while True:
+			while self.pos < len(self.buf) and self.buf[self.pos] in self.ws:
+				self.pos += 1
+			if self.pos < len(self.buf): return self.buf[self.pos]
+			if not self.fill(): return None
+
+	def expect(self,chars):
+		ch = self.peek()
+		if ch == None or ch not in chars:
+			raise ValueError,'expected one of {!r}, got {!r}'.format(chars,ch)
+		self.pos += 1
+		return ch
+
+	def value(self):
+		self.peek()
+		while True:
+			try:
+				val,end = self.decoder.raw_decode(self.buf,self.pos)
+				# a number at the end of a chunk may be incomplete, so accept the value only
+				# if it's followed by a delimiter
+				e = end
+				while e < len(self.buf) and self.buf[e] in self.ws: e += 1
+				if self.eof or (e < len(self.buf) and self.buf[e] in u',:]}'):
+					self.pos = end
+					return val
+			except ValueError:
+				if self.eof: raise
+			self.fill()
+
 class CoinDaemonRPCConnection(object):
 
 	auth = True
@@ -38,11 +114,19 @@ class CoinDaemonRPCConnection(object):
 		dmsg_rpc('=== {}.__init__() debug ==='.format(type(self).__name__))
 		dmsg_rpc(self.db_fs.format(h=host,p=port,u=user,pw=passwd,c=auth_cookie))
 
-		import socket
+		self.host = host
+		self.port = port
+		self.pool = []
+		self.pool_lock = threading.Lock()
+		self.deferred = []
+
+		# the connection opened for the connectivity test becomes the first pooled one
 		try:
-			socket.create_connection((host,port),timeout=3).close()
+			hc = self.new_conn(3)
+			hc.connect()
 		except:
 			die(1,'Unable to connect to {}:{}'.format(host,port))
+		self.put_conn(hc)
 
 		if not self.auth:
 			pass
@@ -64,26 +148,106 @@ class CoinDaemonRPCConnection(object):
 					dn=g.proto.daemon_name,
 					pnm=g.proj_name))
 
-		self.host = host
-		self.port = port
-
 		for method in self.rpcmethods:
 			exec '{c}.{m} = lambda self,*args,**kwargs: self.request("{m}",*args,**kwargs)'.format(
 						c=type(self).__name__,m=method)
 
+	# Connection pool: up to g.rpc_pool_size idle HTTP/1.1 keep-alive connections
+	# are kept for reuse.  get_conn() returns a (connection,reused) tuple.
+	def new_conn(self,timeout):
+		return httplib.HTTPConnection(self.host,self.port,False,timeout)
+
+	def get_conn(self,timeout):
+		with self.pool_lock:
+			hc = self.pool.pop() if self.pool else None
+		if hc:
+			hc.timeout = timeout
+			if hc.sock: hc.sock.settimeout(timeout)
+			return hc,True
+		return self.new_conn(timeout),False
+
+	def put_conn(self,hc):
+		with self.pool_lock:
+			if len(self.pool) < g.rpc_pool_size:
+				self.pool.append(hc)
+				return
+		hc.close()
+
+	def close(self):
+		with self.pool_lock:
+			for hc in self.pool: hc.close()
+			self.pool = []
+
+	# Deferred calls: defer() queues a call and returns an RPCFuture.  flush() sends
+	# all queued calls to the server as a single JSON-RPC batch request.
+	def defer(self,cmd,*args,**kwargs):
+		f = RPCFuture(self,cmd,kwargs['on_fail'] if 'on_fail' in kwargs else 'raise')
+		self.deferred.append((cmd,args,f))
+		return f
+
+	def flush(self,timeout=None):
+		q,self.deferred = self.deferred,[]
+		if not q: return
+		dmsg_rpc('=== flush(): sending {} deferred call{} ==='.format(len(q),suf(q,'s')))
+		ret = self.request(None,[(cmd,args) for cmd,args,f in q],
+							batch=True,batch_errors=True,on_fail='silent',timeout=timeout)
+		for n,(cmd,args,f) in enumerate(q):
+			f.set_result(ret if rpc_error(ret) else ret[n])
+
+	# Concurrent mode: the RPC calls made by 'func' run in parallel on pooled connections
+	def run_concurrent(self,func,args_list,limit=None):
+		"""
+		Call func(*args) for each element of 'args_list' from up to 'limit' threads
+		(default: g.rpc_pool_size) and return the results in order.  If a call raises
+		an exception, calls not yet started are abandoned and the exception re-raised
+		"""
+		import Queue
+		args_list = list(args_list)
+		limit = min(limit or g.rpc_pool_size,len(args_list))
+		if limit < 2:
+			return [func(*args) for args in args_list]
+
+		jobs = Queue.Queue()
+		for job in enumerate(args_list): jobs.put(job)
+		ret,errors = [None] * len(args_list),[]
+
+		def worker():
+			while not errors:
+				try: n,args = jobs.get_nowait()
+				except Queue.Empty: return
+				try: ret[n] = func(*args)
+				except: errors.append(sys.exc_info())
+
+		threads = [threading.Thread(target=worker) for i in range(limit)]
+		for t in threads:
+			t.daemon = True
+			t.start()
+		for t in threads:
+			while t.is_alive(): t.join(0.1) # allow KeyboardInterrupt
+
+		if errors:
+			raise errors[0][0],errors[0][1],errors[0][2]
+		return ret
+
 	# Normal mode: call with arg list unrolled, exactly as with cli
 	# Batch mode:  call with list of arg lists as first argument
+	#              If cmd is None, each list element is a (cmd,args) tuple instead
 	# kwargs are for local use and are not passed to server
+	# With batch_errors=True, errors for individual batch elements are returned
+	#   in place of their results instead of failing the whole batch
+	# With stream=True (non-batch calls returning an array), returns a generator yielding
+	#   the array elements as they're parsed.  Errors in the reply raise RPCFailure.
 
 	# By default, raises RPCFailure exception with an error msg on all errors and exceptions
 	# on_fail is one of 'raise' (default), 'return' or 'silent'
 	# With on_fail='return', returns 'rpcfail',(resp_object,(die_args))
 	def request(self,cmd,*args,**kwargs):
 
-		if os.getenv('MMGEN_RPC_FAIL_ON_COMMAND') == cmd:
+		if cmd and os.getenv('MMGEN_RPC_FAIL_ON_COMMAND') == cmd:
 			cmd = 'badcommand_' + cmd
 
-		cf = { 'timeout':g.http_timeout, 'batch':False, 'on_fail':'raise' }
+		cf = {  'timeout':g.http_timeout, 'batch':False, 'on_fail':'raise', 'batch_errors':False,
+				'stream':False }
 
 		if cf['on_fail'] not in ('raise','return','silent'):
 			raise ValueError, "request(): {}: illegal value for 'on_fail'".format(cf['on_fail'])
@@ -91,10 +255,9 @@ class CoinDaemonRPCConnection(object):
 		for k in cf:
 			if k in kwargs and kwargs[k]: cf[k] = kwargs[k]
 
-		hc = httplib.HTTPConnection(self.host, self.port, False, cf['timeout'])
-
 		if cf['batch']:
-			p = [{'method':cmd,'params':r,'id':n,'jsonrpc':'2.0'} for n,r in enumerate(args[0],1)]
+			calls = args[0] if cmd == None else [(cmd,r) for r in args[0]]
+			p = [{'method':c,'params':r,'id':n,'jsonrpc':'2.0'} for n,(c,r) in enumerate(calls,1)]
 		else:
 			p = {'method':cmd,'params':args,'id':1,'jsonrpc':'2.0'}
 
@@ -123,25 +286,57 @@ class CoinDaemonRPCConnection(object):
 			dmsg_rpc(fs.format(self.auth_str,'',as_enc))
 			http_hdr.update({ 'Host':self.host, 'Authorization':'Basic {}'.format(as_enc) })
 
-		try:
-			hc.request('POST','/',json.dumps(p,cls=MyJSONEncoder),http_hdr)
-		except Exception as e:
-			m = '{}\nUnable to connect to {} at {}:{}'
-			return do_fail(None,2,m.format(e.message,g.proto.daemon_name,self.host,self.port))
+		data = json.dumps(p,cls=MyJSONEncoder)
+		hc,reused = self.get_conn(cf['timeout'])
 
-		try:
-			r = hc.getresponse() # returns HTTPResponse instance
-		except Exception:
-			m = 'Unable to connect to {} at {}:{} (but port is bound?)'
-			return do_fail(None,2,m.format(g.proto.daemon_name,self.host,self.port))
+		# A pooled connection may have been closed or reset by the server since its last
+		# use.  In that case the request is retried once on a new connection.
+		while True:
+			try:
+				hc.request('POST','/',data,http_hdr)
+			except Exception as e:
+				hc.close()
+				if reused:
+					dmsg_rpc('    Pooled connection reset, reconnecting')
+					hc,reused = self.new_conn(cf['timeout']),False
+					continue
+				m = '{}\nUnable to connect to {} at {}:{}'
+				return do_fail(None,2,m.format(e.message,g.proto.daemon_name,self.host,self.port))
+
+			try:
+				r = hc.getresponse() # returns HTTPResponse instance
+			except Exception as e:
+				hc.close()
+				# closed or reset without a reply (timeouts aren't retried)
+				if reused and isinstance(e,(socket.error,httplib.HTTPException)) \
+						and not isinstance(e,socket.timeout):
+					dmsg_rpc('    Pooled connection closed by server ({}), reconnecting'.format(e))
+					hc,reused = self.new_conn(cf['timeout']),False
+					continue
+				m = 'Unable to connect to {} at {}:{} (but port is bound?)'
+				return do_fail(None,2,m.format(g.proto.daemon_name,self.host,self.port))
+
+			break
 
 		dmsg_rpc('    RPC GETRESPONSE data ==> {}\n'.format(r.__dict__))
 
+		if cf['stream'] and not cf['batch'] and r.status == 200:
+			return self.stream_result(r,hc)
+
+		try:
+			r_data = r.read()
+		except Exception as e:
+			hc.close()
+			return do_fail(r,2,'Error reading reply: {}'.format(e))
+
+		if r.will_close: hc.close()
+		else:            self.put_conn(hc)
+
 		if r.status != 200:
 			if cf['on_fail'] not in ('silent','raise'):
 				msg_r(yellow('{} RPC Error: '.format(g.proto.daemon_name.capitalize())))
 				msg(red('{} {}'.format(r.status,r.reason)))
-			e1 = r.read()
+			e1 = r_data
 			try:
 				e3 = json.loads(e1)['error']
 				e2 = '{} (code {})'.format(e3['message'],e3['code'])
@@ -149,7 +344,7 @@ class CoinDaemonRPCConnection(object):
 				e2 = str(e1)
 			return do_fail(r,1,e2)
 
-		r2 = r.read().decode('utf8')
+		r2 = r_data.decode('utf8')
 
 		dmsg_rpc(u'    RPC REPLY data ==> {}\n'.format(r2))
 
@@ -159,10 +354,19 @@ class CoinDaemonRPCConnection(object):
 		r3 = json.loads(r2,parse_float=Decimal)
 		ret = []
 
+		if cf['batch']:
+			if type(r3) != list: # server returns a single error object if whole batch is rejected
+				return do_fail(r,1,'{} returned an error: {}'.format(
+					g.proto.daemon_name.capitalize(),r3.get('error')))
+			r3.sort(key=lambda resp: resp.get('id')) # batch replies may arrive in any order
+
 		for resp in r3 if cf['batch'] else [r3]:
 			if 'error' in resp and resp['error'] != None:
-				return do_fail(r,1,'{} returned an error: {}'.format(
-					g.proto.daemon_name.capitalize(),resp['error']))
+				m = '{} returned an error: {}'.format(g.proto.daemon_name.capitalize(),resp['error'])
+				if cf['batch_errors']:
+					ret.append(('rpcfail',(r,1,m)))
+					continue
+				return do_fail(r,1,m)
 			elif 'result' not in resp:
 				return do_fail(r,1, 'Missing JSON-RPC result\n' + repr(resps))
 			else:
@@ -170,6 +374,40 @@ class CoinDaemonRPCConnection(object):
 
 		return ret if cf['batch'] else ret[0]
 
+	def stream_result(self,r,hc):
+		s = RPCReplyStream(r)
+		done,have_result = False,False
+		dname = g.proto.daemon_name.capitalize()
+		try:
+			s.expect('{')
+			while s.peek() != '}':
+				key = s.value()
+				s.expect(':')
+				if key == 'result' and s.peek() == '[':
+					have_result = True
+					s.expect('[')
+					if s.peek() == ']':
+						s.expect(']')
+					else:
+						while True:
+							yield s.value()
+							if s.expect(',]') == ']': break
+				else:
+					val = s.value()
+					if key == 'error' and val != None:
+						raise RPCFailure,'{} returned an error: {}'.format(dname,val)
+					elif key == 'result' and val != None:
+						raise RPCFailure,'{}: streamed JSON-RPC result is not an array'.format(dname)
+				if s.expect(',}') == '}': break
+			if not have_result:
+				raise RPCFailure,'Missing JSON-RPC result'
+			done = True
+		except ValueError as e:
+			raise RPCFailure,'Error parsing {} reply: {}'.format(dname,e.message)
+		finally: # a partly read connection can't be reused
+			if done and not r.will_close: self.put_conn(hc)
+			else: hc.close()
+
 	rpcmethods = (
 		'backupwallet',
 		'createrawtransaction',
@@ -196,6 +434,7 @@ class CoinDaemonRPCConnection(object):
 		'importaddress',
 		'listaccounts',
 		'listlabels',
+		'listsinceblock',
 		'listunspent',
 		'setlabel',
 		'sendrawtransaction',
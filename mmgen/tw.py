@@ -20,6 +20,8 @@
 tw: Tracking wallet methods for the MMGen suite
 """
 
+import json
+from decimal import Decimal
 from mmgen.common import *
 from mmgen.obj import *
 from mmgen.tx import is_mmgen_id
@@ -48,13 +50,17 @@ Actions: [q]uit view, [p]rint to file, pager [v]iew, [w]ide view, add [l]abel:
 	key_mappings = {
 		't':'s_txid','a':'s_amt','d':'s_addr','A':'s_age','r':'d_reverse','M':'s_twmmid',
 		'D':'d_days','g':'d_group','m':'d_mmid','e':'d_redraw',
-		'q':'a_quit','p':'a_print','v':'a_view','w':'a_view_wide','l':'a_lbl_add' }
+		'q':'a_quit','p':'a_print','v':'a_view','w':'a_view_wide','l':'a_lbl_add',
+		'n':'d_page_next','P':'d_page_prev' }
 	col_adj = 38
 
-	class MMGenTwOutputList(list,MMGenObject): pass
+	class MMGenTwOutputList(list,MMGenObject):
+		def __init__(self,*args):
+			list.__init__(self,*args)
+			self.fmt_rows = {} # formatted display rows for this ordering, keyed by display options
 
 	class MMGenTwUnspentOutput(MMGenListItem):
-	#	attrs = 'txid','vout','amt','label','twmmid','addr','confs','scriptPubKey','days','skip'
+	#	attrs = 'txid','vout','amt','label','twmmid','addr','confs','scriptPubKey','days'
 		txid     = MMGenListItemAttr('txid','CoinTxID')
 		vout     = MMGenListItemAttr('vout',int,typeconv=False)
 		amt      = MMGenImmutableAttr('amt',g.proto.coin_amt.__name__)
@@ -65,7 +71,6 @@ Actions: [q]uit view, [p]rint to file, pager [v]iew, [w]ide view, add [l]abel:
 		confs    = MMGenImmutableAttr('confs',int,typeconv=False)
 		scriptPubKey = MMGenImmutableAttr('scriptPubKey','HexStr')
 		days    = MMGenListItemAttr('days',int,typeconv=False)
-		skip    = MMGenListItemAttr('skip',str,typeconv=False,reassign_ok=True)
 
 	wmsg = {
 	'no_spendable_outputs': """
@@ -79,14 +84,19 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 		self.fmt_display  = ''
 		self.fmt_print    = ''
 		self.cols         = None
+		self.rows         = None
 		self.reverse      = False
 		self.group        = False
 		self.show_days    = True
 		self.show_mmid    = True
 		self.minconf      = minconf
+		self.data_widths  = None
+		self.orders       = {} # sorted lists of outputs, keyed by (sort_key,reverse)
+		self.page_start   = 0
+		self.page_rows    = None
 		self.get_unspent_data()
 		self.sort_key     = 'age'
-		self.do_sort()
+		self.set_order(self.sort_key,self.reverse)
 		self.total        = self.get_total_coin()
 		self.disp_prec    = self.get_display_precision()
 
@@ -97,7 +107,7 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 		return sum(i.amt for i in self.unspent)
 
 	def get_unspent_rpc(self):
-		return g.rpch.listunspent(self.minconf)
+		return tw_listunspent(self.minconf)
 
 	def get_unspent_data(self):
 		if g.bogus_wallet_data: # for debugging purposes only
@@ -107,11 +117,12 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 #		write_data_to_file('bogus_unspent.json', repr(us), 'bogus unspent data')
 #		sys.exit(0)
 
-		if not us_rpc: die(0,self.wmsg['no_spendable_outputs'])
 		confs_per_day = 60*60*24 / g.proto.secs_per_block
-		tr_rpc = []
+		attrs = set(dir(self.MMGenTwUnspentOutput))
+		tr_rpc,n_rpc = [],0
 		lbl_id = ('account','label')['label_api' in g.rpch.caps]
-		for o in us_rpc:
+		for o in us_rpc: # may be a generator, so build output objects as we go
+			n_rpc += 1
 			if not lbl_id in o: continue          # coinbase outputs have no account field
 			l = TwLabel(o[lbl_id],on_fail='silent')
 			if l:
@@ -123,11 +134,9 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 					'addr':   CoinAddr(o['address']),
 					'confs':  o['confirmations']
 				})
-				tr_rpc.append(o)
-		self.unspent = self.MMGenTwOutputList(
-						self.MMGenTwUnspentOutput(
-				**dict(i for i in o.items() if i[0] in dir(self.MMGenTwUnspentOutput))
-						) for o in tr_rpc)
+				tr_rpc.append(self.MMGenTwUnspentOutput(**dict(i for i in o.items() if i[0] in attrs)))
+		if not n_rpc: die(0,self.wmsg['no_spendable_outputs'])
+		self.unspent = self.MMGenTwOutputList(tr_rpc)
 		for u in self.unspent:
 			if u.label == None: u.label = ''
 		if not self.unspent:
@@ -146,7 +155,18 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 			die(1,"'{}': invalid sort key.  Valid options: {}".format(key,' '.join(sort_funcs.keys())))
 		self.sort_key = key
 		assert type(reverse) == bool
-		self.unspent.sort(key=sort_funcs[key],reverse=reverse or self.reverse)
+		self.unspent = self.MMGenTwOutputList(
+			sorted(self.unspent,key=sort_funcs[key],reverse=reverse or self.reverse))
+
+	def set_order(self,key,reverse):
+		"switch to the ordering for 'key' and 'reverse', sorting only if it hasn't been used before"
+		if (key,reverse) in self.orders:
+			self.unspent = self.orders[(key,reverse)]
+			self.sort_key,self.reverse = key,reverse
+		else:
+			self.reverse = reverse
+			self.do_sort(key)
+			self.orders[(self.sort_key,self.reverse)] = self.unspent
 
 	def sort_info(self,include_group=True):
 		ret = ([],['Reverse'])[self.reverse]
@@ -158,36 +178,51 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 	def set_term_columns(self):
 		from mmgen.term import get_terminal_size
 		while True:
-			self.cols = get_terminal_size()[0]
+			self.cols,self.rows = get_terminal_size()
 			if self.cols >= g.min_screen_width: break
 			m1 = 'Screen too narrow to display the tracking wallet\n'
 			m2 = 'Please resize your screen to at least {} characters and hit ENTER '
 			my_raw_input((m1+m2).format(g.min_screen_width))
 
-	def format_for_display(self):
+	def get_data_widths(self):
+		"maximum field widths over all outputs, recomputed only when the data changes"
+		if not self.data_widths:
+			unsp = self.unspent
+			self.data_widths = {
+				'mmid':  max(len(('',i.twmmid)[i.twmmid.type=='mmgen']) for i in unsp) or 12, # DEADBEEF:S:1
+				'label': max(len(i.label) for i in unsp),
+				'addr':  max(len(i.addr) for i in unsp) }
+		return self.data_widths
+
+	def get_skip(self,n):
+		"the field of output 'n' that's a repeat of the previous output's, if grouping"
+		k = self.sort_key
+		if n and self.group and k in ('addr','txid','twmmid') and \
+				getattr(self.unspent[n-1],k) == getattr(self.unspent[n],k):
+			return (k,'addr')[k=='twmmid']
+		return ''
+
+	def format_for_display(self,paged=False):
+		"""
+		Rows are formatted on first display and cached with the current ordering of the
+		outputs.  If 'paged', only the rows that fit on the screen are displayed.
+		"""
 		unsp = self.unspent
 		self.set_term_columns()
+		dw = self.get_data_widths()
 
 		# allow for 7-digit confirmation nums
 		col1_w = max(3,len(str(len(unsp)))+1) # num + ')'
-		mmid_w = max(len(('',i.twmmid)[i.twmmid.type=='mmgen']) for i in unsp) or 12 # DEADBEEF:S:1
-		max_acct_w = max(len(i.label) for i in unsp) + mmid_w + 1
-		max_btcaddr_w = max(len(i.addr) for i in unsp)
+		mmid_w = dw['mmid']
+		max_acct_w = dw['label'] + mmid_w + 1
 		min_addr_w = self.cols - self.col_adj
-		addr_w = min(max_btcaddr_w + (0,1+max_acct_w)[self.show_mmid],min_addr_w)
+		addr_w = min(dw['addr'] + (0,1+max_acct_w)[self.show_mmid],min_addr_w)
 		acct_w = min(max_acct_w, max(24,addr_w-10))
 		btaddr_w = addr_w - acct_w - 1
 		label_w = acct_w - mmid_w - 1
 		tx_w = min(self.txid_w,self.cols-addr_w-28-col1_w) # min=7
 		txdots = ('','..')[tx_w < self.txid_w]
 
-		for i in unsp: i.skip = ''
-		if self.group and (self.sort_key in ('addr','txid','twmmid')):
-			for a,b in [(unsp[i],unsp[i+1]) for i in range(len(unsp)-1)]:
-				for k in ('addr','txid','twmmid'):
-					if self.sort_key == k and getattr(a,k) == getattr(b,k):
-						b.skip = (k,'addr')[k=='twmmid']
-
 		out  = [self.hdr_fmt.format(' '.join(self.sort_info()),g.dcoin,self.total.hl())]
 		if g.chain != 'mainnet': out += ['Chain: '+green(g.chain.upper())]
 		fs = {  'btc':   u' {n:%s} {t:%s} {v:2} {a} {A} {c:<}' % (col1_w,tx_w),
@@ -202,35 +237,68 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 							c=('Confs','Age(d)')[self.show_days]
 							).rstrip()]
 
-		for n,i in enumerate(unsp):
+		def format_row(n):
+			i,skip = unsp[n],self.get_skip(n)
 			addr_dots = '|' + '.'*(addr_w-1)
-			mmid_disp = MMGenID.fmtc('.'*mmid_w if i.skip=='addr'
+			mmid_disp = MMGenID.fmtc('.'*mmid_w if skip=='addr'
 				else i.twmmid if i.twmmid.type=='mmgen'
 					else 'Non-{}'.format(g.proj_name),width=mmid_w,color=True)
 			if self.show_mmid:
 				addr_out = u'{} {}'.format(
-					type(i.addr).fmtc(addr_dots,width=btaddr_w,color=True) if i.skip == 'addr' \
+					type(i.addr).fmtc(addr_dots,width=btaddr_w,color=True) if skip == 'addr' \
 							else i.addr.fmt(width=btaddr_w,color=True),
 					u'{} {}'.format(mmid_disp,i.label.fmt(width=label_w,color=True) \
 							if label_w > 0 else ''))
 			else:
 				addr_out = type(i.addr).fmtc(addr_dots,width=addr_w,color=True) \
-					if i.skip=='addr' else i.addr.fmt(width=addr_w,color=True)
-
-			out.append(fs.format(   n=str(n+1)+')',
-									t='' if not i.txid else \
-										' ' * (tx_w-4) + '|...' if i.skip == 'txid' \
-											else i.txid[:tx_w-len(txdots)]+txdots,
-									v=i.vout,
-									a=addr_out,
-									A=i.amt.fmt(color=True,prec=self.disp_prec),
-									A2=(i.amt2.fmt(color=True,prec=self.disp_prec) if i.amt2 is not None else ''),
-									c=i.days if self.show_days else i.confs
-									).rstrip())
+					if skip=='addr' else i.addr.fmt(width=addr_w,color=True)
+
+			return fs.format(   n=str(n+1)+')',
+								t='' if not i.txid else \
+									' ' * (tx_w-4) + '|...' if skip == 'txid' \
+										else i.txid[:tx_w-len(txdots)]+txdots,
+								v=i.vout,
+								a=addr_out,
+								A=i.amt.fmt(color=True,prec=self.disp_prec),
+								A2=(i.amt2.fmt(color=True,prec=self.disp_prec) if i.amt2 is not None else ''),
+								c=i.days if self.show_days else i.confs
+								).rstrip()
+
+		rows = unsp.fmt_rows.setdefault(
+			(self.sort_key,self.group,self.show_mmid,self.show_days,self.cols),[None]*len(unsp))
+		start,end = 0,len(unsp)
+		if paged:
+			# leave room for the prompt, a one-shot message and the page indicator
+			self.page_rows = max(5,self.rows - len(out) - len(self.prompt.strip().split('\n')) - 4)
+			start = self.page_start = min(self.page_start,len(unsp)-1)
+			end = min(start+self.page_rows,len(unsp))
+		for n in range(start,end):
+			if rows[n] == None: rows[n] = format_row(n)
+		out += rows[start:end]
+		if end - start < len(unsp):
+			out.append('Showing {}s {}-{} of {} ([n]ext page, [P]revious page)'.format(
+				self.item_desc,start+1,end,len(unsp)))
 
 		self.fmt_display = '\n'.join(out) + '\n'
 		return self.fmt_display
 
+	def update_label(self,twmmid,lbl):
+		"""
+		Set the label of all outputs at 'twmmid' in place, discarding only the affected
+		formatted rows, unless the maximum label width has changed
+		"""
+		for i in self.unspent:
+			if i.twmmid == twmmid: i.label = lbl
+		dw = self.get_data_widths()
+		label_w,dw['label'] = dw['label'],max(len(i.label) for i in self.unspent)
+		for l in self.orders.values():
+			if dw['label'] != label_w:
+				l.fmt_rows.clear()
+				continue
+			idxs = [n for n,i in enumerate(l) if i.twmmid == twmmid]
+			for rows in l.fmt_rows.values():
+				for n in idxs: rows[n] = None
+
 	def format_for_printing(self,color=False):
 
 		addr_w = max(len(i.addr) for i in self.unspent)
@@ -252,10 +320,11 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 
 		max_lbl_len = max([len(i.label) for i in self.unspent if i.label] or [2])
 		for n,i in enumerate(self.unspent):
-			addr = '|'+'.' * addr_w if i.skip == 'addr' and self.group else i.addr.fmt(color=color,width=addr_w)
+			skip = self.get_skip(n)
+			addr = '|'+'.' * addr_w if skip == 'addr' else i.addr.fmt(color=color,width=addr_w)
 			out.append(fs.format(
 						n=str(n+1)+')',
-						t='{},{}'.format('|'+'.'*63 if i.skip == 'txid' and self.group else i.txid,i.vout),
+						t='{},{}'.format('|'+'.'*63 if skip == 'txid' else i.txid,i.vout),
 						a=addr,
 						m=MMGenID.fmtc(i.twmmid if i.twmmid.type=='mmgen'
 							else 'Non-{}'.format(g.proj_name),width=mmid_w,color=color),
@@ -314,7 +383,7 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 		no_output,oneshot_msg = False,None
 		while True:
 			msg_r('' if no_output else '\n\n' if opt.no_blank else CUR_HOME+ERASE_ALL)
-			reply = get_char('' if no_output else self.format_for_display()+'\n'+(oneshot_msg or '')+prompt,
+			reply = get_char('' if no_output else self.format_for_display(paged=True)+'\n'+(oneshot_msg or '')+prompt,
 								immed_chars=self.key_mappings)
 			no_output = False
 			oneshot_msg = '' if oneshot_msg else None # tristate, saves previous state
@@ -325,7 +394,8 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 
 			action = self.key_mappings[reply]
 			if action[:2] == 's_':
-				self.do_sort(action[2:])
+				self.set_order(action[2:],self.reverse)
+				self.page_start = 0
 				if action == 's_twmmid': self.show_mmid = True
 			elif action == 'd_days': self.show_days = not self.show_days
 			elif action == 'd_mmid': self.show_mmid = not self.show_mmid
@@ -333,15 +403,21 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 				if self.can_group:
 					self.group = not self.group
 			elif action == 'd_redraw': pass
-			elif action == 'd_reverse': self.unspent.reverse(); self.reverse = not self.reverse
+			elif action == 'd_reverse':
+				self.set_order(self.sort_key,not self.reverse)
+				self.page_start = 0
+			elif action == 'd_page_next':
+				if self.page_start + self.page_rows < len(self.unspent):
+					self.page_start += self.page_rows
+			elif action == 'd_page_prev':
+				self.page_start = max(0,self.page_start - self.page_rows)
 			elif action == 'a_quit': msg(''); return self.unspent
 			elif action == 'a_lbl_add':
 				idx,lbl = self.get_idx_from_user(get_label=True)
 				if idx:
 					e = self.unspent[idx-1]
 					if TrackingWallet(mode='w').add_label(e.twmmid,lbl,addr=e.addr):
-						self.get_unspent_data()
-						self.do_sort()
+						self.update_label(e.twmmid,lbl)
 						a = 'added to' if lbl else 'removed from'
 						oneshot_msg = yellow("Label {} {} #{}\n\n".format(a,self.item_desc,idx))
 					else:
@@ -352,7 +428,8 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 					e = self.unspent[idx-1]
 					if TrackingWallet(mode='w').remove_address(e.addr):
 						self.get_unspent_data()
-						self.do_sort()
+						self.data_widths,self.orders = None,{}
+						self.set_order(self.sort_key,self.reverse)
 						self.total = self.get_total_coin()
 						oneshot_msg = yellow("{} #{} removed\n\n".format(capfirst(self.item_desc),idx))
 					else:
@@ -368,7 +445,7 @@ watch-only wallet using '{}-addrimport' and then re-run this program.
 				else:
 					oneshot_msg = yellow("Data written to '{}'\n\n".format(of))
 			elif action in ('a_view','a_view_wide'):
-				do_pager(self.fmt_display if action == 'a_view' else self.format_for_printing(color=True))
+				do_pager(self.format_for_display() if action == 'a_view' else self.format_for_printing(color=True))
 				if g.platform == 'linux' and oneshot_msg == None:
 					msg_r(CUR_RIGHT(len(prompt.split('\n')[-1])-2))
 					no_output = True
@@ -404,8 +481,32 @@ class TwAddrList(MMGenDict):
 		self.total = g.proto.coin_amt('0')
 		rpc_init()
 
+		def get_acct_data():
+			# for compatibility with old mmids, must use raw RPC rather than native data for matching
+			# args: minconf,watchonly, MUST use keys() so we get list, not dict
+			if 'label_api' in g.rpch.caps:
+				acct_list = g.rpch.listlabels()
+				acct_addrs = [a.keys() for a in g.rpch.getaddressesbylabel([[k] for k in acct_list],batch=True)]
+			else:
+				acct_list = g.rpch.listaccounts(0,True).keys() # raw list, no 'L'
+				acct_addrs = g.rpch.getaddressesbyaccount([[a] for a in acct_list],batch=True) # use raw list here
+			return acct_list,acct_addrs
+
+		tc = TwCache.get()
+		if tc:
+			unspent = tc.listunspent(0)
+			if showempty or all_labels:
+				acct_list,acct_addrs = tc.label_data()
+		# the unspent outputs and account data are independent, so fetch them concurrently.
+		# Not streamed, so that the reply is read and parsed in the worker thread.
+		elif showempty or all_labels:
+			unspent,(acct_list,acct_addrs) = g.rpch.run_concurrent(
+				lambda f: f(), [(lambda: g.rpch.listunspent(0),),(get_acct_data,)])
+		else:
+			unspent = g.rpch.listunspent(0,stream=True)
+
 		lbl_id = ('account','label')['label_api' in g.rpch.caps]
-		for d in g.rpch.listunspent(0):
+		for d in unspent:
 			if not lbl_id in d: continue  # skip coinbase outputs with missing account
 			if d['confirmations'] < minconf: continue
 			label = TwLabel(d[lbl_id],on_fail='silent')
@@ -416,23 +517,15 @@ class TwAddrList(MMGenDict):
 						die(2,'duplicate {} address ({}) for this MMGen address! ({})'.format(
 								g.coin,d['address'],self[label.mmid]['addr']))
 				else:
-					self[label.mmid] = {'amt': g.proto.coin_amt('0'),
-										'lbl':  label,
-										'addr': CoinAddr(d['address'])}
-					self[label.mmid]['lbl'].mmid.confs = d['confirmations']
+					self[label.mmid] = {'amt':   g.proto.coin_amt('0'),
+										'lbl':   label,
+										'addr':  CoinAddr(d['address']),
+										'confs': d['confirmations']}
 				self[label.mmid]['amt'] += d['amount']
 				self.total += d['amount']
 
 		# We use listaccounts only for empty addresses, as it shows false positive balances
 		if showempty or all_labels:
-			# for compatibility with old mmids, must use raw RPC rather than native data for matching
-			# args: minconf,watchonly, MUST use keys() so we get list, not dict
-			if 'label_api' in g.rpch.caps:
-				acct_list = g.rpch.listlabels()
-				acct_addrs = [a.keys() for a in g.rpch.getaddressesbylabel([[k] for k in acct_list],batch=True)]
-			else:
-				acct_list = g.rpch.listaccounts(0,True).keys() # raw list, no 'L'
-				acct_addrs = g.rpch.getaddressesbyaccount([[a] for a in acct_list],batch=True) # use raw list here
 			acct_labels = MMGenList([TwLabel(a,on_fail='silent') for a in acct_list])
 			check_dup_mmid(acct_labels)
 			assert len(acct_list) == len(acct_addrs),(
@@ -444,7 +537,7 @@ class TwAddrList(MMGenDict):
 				if all_labels and not showempty and not label.comment: continue
 				if usr_addr_list and (label.mmid not in usr_addr_list): continue
 				if label.mmid not in self:
-					self[label.mmid] = { 'amt':g.proto.coin_amt('0'), 'lbl':label, 'addr':'' }
+					self[label.mmid] = { 'amt':g.proto.coin_amt('0'), 'lbl':label, 'addr':'', 'confs':None }
 					if showbtcaddrs:
 						self[label.mmid]['addr'] = CoinAddr(addr_arr[0])
 
@@ -476,7 +569,7 @@ class TwAddrList(MMGenDict):
 				return '{}_{:>012}_{}'.format(
 					j.obj.rsplit(':',1)[0],
 					# Hack, but OK for the foreseeable future:
-					(1000000000-j.confs if hasattr(j,'confs') and j.confs != None else 0),
+					(1000000000-self[j]['confs'] if self[j]['confs'] != None else 0),
 					j.sort_key)
 			else:
 				return j.sort_key
@@ -500,11 +593,184 @@ class TwAddrList(MMGenDict):
 				addr=(e['addr'].fmt(color=True,width=addr_width) if showbtcaddrs else None),
 				cmt=e['lbl'].comment.fmt(width=max_cmt_len,color=True,nullrepl='-'),
 				amt=e['amt'].fmt('4.{}'.format(max(max_fp_len,3)),color=True),
-				age=mmid.confs / (1,confs_per_day)[show_days] if hasattr(mmid,'confs') and mmid.confs != None else '-'
+				age=e['confs'] / (1,confs_per_day)[show_days] if e['confs'] != None else '-'
 				))
 
 		return '\n'.join(out + ['\nTOTAL: {} {}'.format(self.total.hl(color=True),g.dcoin)])
 
+class TwCache(MMGenObject):
+	"""
+	On-disk cache of the tracking wallet's unspent outputs and label->address map,
+	valid for the best block and set of unconfirmed wallet transactions it was saved
+	with.  On each use it's validated and brought up to date with 'listsinceblock',
+	fetching and decoding only new transactions.  Anything the incremental update
+	can't handle (reorgs, conflicts, coinbase outputs, label changes) triggers a full
+	refresh.
+	"""
+	desc = 'tracking wallet cache'
+	subdir = 'tw_cache'
+	version = 1
+	instance = None # validated and brought up to date once per run, dropped by invalidate()
+
+	@classmethod
+	def get(cls): # returns None if cache is disabled or unsupported by daemon
+		if not g.tw_cache or 'label_api' not in g.rpch.caps: return None
+		if not cls.instance:
+			tc = cls()
+			if not tc.refresh(): return None
+			cls.instance = tc
+		return cls.instance
+
+	@classmethod
+	def get_fn(cls):
+		return os.path.join(g.data_dir,cls.subdir,'{}-{}.json'.format(g.coin.lower(),g.chain))
+
+	@classmethod
+	def invalidate(cls):
+		cls.instance = None
+		try: os.unlink(cls.get_fn())
+		except: pass
+
+	def __init__(self):
+		self.fn = self.get_fn()
+		self.data = self.load()
+		self.modified = False
+
+	def load(self):
+		if not os.path.exists(self.fn): return None
+		try:
+			d = json.loads(get_data_from_file(self.fn,self.desc,silent=True))
+			assert d['version'] == self.version
+			for u in d['utxos'].values(): u['amount'] = Decimal(u['amount'])
+			return d
+		except:
+			msg(u"WARNING: {} '{}' is invalid, ignoring".format(self.desc,self.fn))
+			return None
+
+	def save(self):
+		if not self.modified: return
+		d = dict(self.data,utxos=dict((k,dict(u,amount=str(u['amount']))) for k,u in self.data['utxos'].items()))
+		check_or_create_dir(os.path.dirname(self.fn))
+		with open(self.fn+'.tmp','wb') as f:
+			json.dump(d,f)
+		os.rename(self.fn+'.tmp',self.fn)
+		vmsg(u"{} written to '{}'".format(capfirst(self.desc),self.fn))
+		self.modified = False
+
+	def refresh(self):
+		labels = sorted(g.rpch.listlabels())
+		info = g.rpch.getblockchaininfo()
+		d = self.data
+		if not (d and d['labels_list'] == labels and self.update(d,info['bestblockhash'],info['blocks'])):
+			vmsg('Refreshing {}'.format(self.desc))
+			self.data = self.full_refresh(labels)
+			if not self.data: return False
+		self.save()
+		return True
+
+	def full_refresh(self,labels):
+		for i in range(3): # retry if a block arrives while we're fetching data
+			tip = g.rpch.getblockchaininfo()
+			# a tx arriving after 'since' and before 'unspent' is harmlessly reapplied by update()
+			since = g.rpch.listsinceblock(tip['bestblockhash'],1,True)
+			unspent = g.rpch.listunspent(0,stream=True)
+			utxos = dict(('{}:{}'.format(o['txid'],o['vout']),{
+						'address': o['address'],
+						'scriptPubKey': o['scriptPubKey'],
+						'amount': o['amount'],
+						'height': tip['blocks'] - o['confirmations'] + 1 if o['confirmations'] else None,
+						'spendable': o['spendable'],
+						'solvable': o.get('solvable',False) }) for o in unspent)
+			if g.rpch.getblockchaininfo()['bestblockhash'] == tip['bestblockhash']: break
+		else:
+			return None
+
+		addrs = [a.keys() for a in g.rpch.getaddressesbylabel([[k] for k in labels],batch=True)]
+		self.modified = True
+		return {
+			'version': self.version,
+			'tip': tip['bestblockhash'],
+			'height': tip['blocks'],
+			'labels_list': labels,
+			'labels': dict(zip(labels,addrs)),
+			'mempool': sorted(set(e['txid'] for e in since['transactions']
+								if e['confirmations'] == 0 and not e.get('abandoned'))),
+			'utxos': utxos }
+
+	def update(self,d,tip,height):
+		from mmgen.rpc import rpc_error
+		since = g.rpch.listsinceblock(d['tip'],1,True,on_fail='silent')
+		if rpc_error(since) or since.get('removed') or since['lastblock'] != tip:
+			return False
+
+		applied,txs = set(d['mempool']),{}
+		for e in since['transactions']:
+			if e['confirmations'] < 0 or e.get('abandoned'): # conflicted or abandoned
+				if e['txid'] in applied: return False
+			elif e['category'] not in ('send','receive'): # coinbase, move etc.
+				return False
+			else:
+				txs.setdefault(e['txid'],[]).append(e)
+
+		if applied - set(txs): # an unconfirmed tx has left the mempool
+			return False
+
+		new = [t for t in txs if t not in applied]
+		utxos = d['utxos']
+		if new:
+			from mmgen.tx import DeserializedTX
+			for txid,r in zip(new,g.rpch.gettransaction([[t,True] for t in new],batch=True)):
+				dtx = DeserializedTX(r['hex'])
+				for i in dtx['txins']:
+					utxos.pop('{}:{}'.format(i['txid'],i['vout']),None)
+				for e in txs[txid]:
+					if e['category'] == 'receive':
+						utxos['{}:{}'.format(txid,e['vout'])] = {
+							'address': e['address'],
+							'scriptPubKey': dtx['txouts'][e['vout']]['scriptPubKey'],
+							'amount': e['amount'],
+							'height': None,
+							'spendable': not e.get('involvesWatchonly',False),
+							'solvable': not e.get('involvesWatchonly',False) }
+
+		heights = dict((t,height - es[0]['confirmations'] + 1 if es[0]['confirmations'] else None)
+							for t,es in txs.items())
+		for k,u in utxos.items():
+			t = k.split(':')[0]
+			if t in heights: u['height'] = heights[t]
+
+		mempool = sorted(t for t in heights if heights[t] == None)
+		if new or d['tip'] != tip or d['mempool'] != mempool:
+			d.update({ 'tip':tip, 'height':height, 'mempool':mempool })
+			self.modified = True
+		return True
+
+	def listunspent(self,minconf):
+		d = self.data
+		addr2label = dict((a,lbl) for lbl,addrs in d['labels'].items() for a in addrs)
+		for k,u in d['utxos'].items():
+			confs = d['height'] - u['height'] + 1 if u['height'] != None else 0
+			if confs < minconf: continue
+			txid,vout = k.split(':')
+			yield {
+				'txid': txid,
+				'vout': int(vout),
+				'address': u['address'],
+				'label': addr2label.get(u['address'],''),
+				'scriptPubKey': u['scriptPubKey'],
+				'amount': u['amount'],
+				'confirmations': confs,
+				'spendable': u['spendable'],
+				'solvable': u['solvable'] }
+
+	def label_data(self): # same as the output of listlabels + getaddressesbylabel
+		labels = self.data['labels_list']
+		return labels,[self.data['labels'][k] for k in labels]
+
+def tw_listunspent(minconf):
+	tc = TwCache.get()
+	return tc.listunspent(minconf) if tc else g.rpch.listunspent(minconf,stream=True)
+
 class TrackingWallet(MMGenObject):
 
 	def __new__(cls,*args,**kwargs):
@@ -520,10 +786,12 @@ class TrackingWallet(MMGenObject):
 
 	@write_mode
 	def import_address(self,addr,label,rescan):
+		TwCache.invalidate()
 		return g.rpch.importaddress(addr,label,rescan,timeout=(False,3600)[rescan])
 
 	@write_mode
 	def batch_import_address(self,arg_list):
+		TwCache.invalidate()
 		return g.rpch.importaddress(arg_list,batch=True)
 
 	@write_mode
@@ -534,6 +802,7 @@ class TrackingWallet(MMGenObject):
 
 	@write_mode
 	def set_label(self,coinaddr,lbl):
+		TwCache.invalidate()
 		if 'label_api' in g.rpch.caps:
 			return g.rpch.setlabel(coinaddr,lbl,on_fail='return')
 		else:
@@ -622,7 +891,7 @@ class TwGetBalance(MMGenObject):
 	def create_data(self):
 		# 0: unconfirmed, 1: below minconf, 2: confirmed, 3: spendable
 		lbl_id = ('account','label')['label_api' in g.rpch.caps]
-		for d in g.rpch.listunspent(0):
+		for d in tw_listunspent(0): # constant memory
 			try: lbl = TwLabel(d[lbl_id],on_fail='silent')
 			except: lbl = None
 			if lbl:
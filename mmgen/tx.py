@@ -21,7 +21,7 @@
 tx.py:  Transaction routines for the MMGen suite
 """
 
-import sys,os,json
+import sys,os,json,struct
 from stat import *
 from binascii import unhexlify
 from mmgen.common import *
@@ -96,14 +96,11 @@ def segwit_is_active(exit_on_error=False):
 	else:
 		return False
 
-def bytes2int(hex_bytes):
-	r = hexlify(unhexlify(hex_bytes)[::-1])
-	if r[0] in '89abcdef':
-		die(3,"{}: Negative values not permitted in transaction!".format(hex_bytes))
-	return int(r,16)
-
-def bytes2coin_amt(hex_bytes):
-	return g.proto.coin_amt(bytes2int(hex_bytes) * g.proto.coin_amt.min_coin_unit)
+def unpack_uint(fmt,buf,pos): # values with the high bit set are refused, as before
+	ret = struct.unpack_from(fmt,buf,pos)[0]
+	if ret >> (struct.calcsize(fmt) * 8 - 1):
+		die(3,'{}: Negative values not permitted in transaction!'.format(hexlify(buf[pos:pos+struct.calcsize(fmt)])))
+	return ret
 
 def scriptPubKey2addr(s):
 	if len(s) == 50 and s[:6] == '76a914' and s[-4:] == '88ac':
@@ -116,80 +113,130 @@ def scriptPubKey2addr(s):
 		raise NotImplementedError,'Unknown scriptPubKey ({})'.format(s)
 
 from collections import OrderedDict
-class DeserializedTX(OrderedDict,MMGenObject): # need to add MMGen types
+
+class _Lazy(object):
+	__slots__ = ('f',)
+	def __init__(self,f): self.f = f
+
+class LazyOrderedDict(OrderedDict):
+	"values given as _Lazy(func) are computed on first access"
+	def __getitem__(self,key):
+		val = OrderedDict.__getitem__(self,key)
+		if type(val) == _Lazy:
+			val = val.f()
+			OrderedDict.__setitem__(self,key,val)
+		return val
+
+	def get(self,key,default=None):
+		return self[key] if key in self else default
+
+class DeserializedTX(LazyOrderedDict,MMGenObject): # need to add MMGen types
+	"""
+	A single pass over the raw transaction records the offsets of its fields.  Inputs,
+	outputs, TxID and unsigned hex are decoded from these on first access.
+	"""
 	def __init__(self,txhex):
-		tx = list(unhexlify(txhex))
-		tx_copy = tx[:]
-		d = { 'raw_tx':'' }
+		tx = unhexlify(txhex)
+		pos = [0]
 
-		def hshift(l,n,reverse=False,skip=False):
-			ret = l[:n]
-			if not skip: d['raw_tx'] += ''.join(ret)
-			del l[:n]
-			return hexlify(''.join(ret[::-1] if reverse else ret))
+		def skip(n):
+			if pos[0] + n > len(tx):
+				raise ValueError,'Unexpected end of transaction data'
+			pos[0] += n
+			return pos[0] - n
 
 		# https://bitcoin.org/en/developer-reference#compactsize-unsigned-integers
 		# For example, the number 515 is encoded as 0xfd0302.
-		def readVInt(l,skip=False,sub_null=False):
-			s = int(hexlify(l[0]),16)
-			bytes_len = 1 if s < 0xfd else 2 if s == 0xfd else 4 if s == 0xfe else 8
-			if bytes_len != 1: del l[0]
-			ret = int(hexlify(''.join(l[:bytes_len][::-1])),16)
-			if sub_null: d['raw_tx'] += '\0'
-			elif not skip: d['raw_tx'] += ''.join(l[:bytes_len])
-			del l[:bytes_len]
-			return ret
-
-		d['version'] = bytes2int(hshift(tx,4))
-		has_witness = tx[0] == '\x00'
+		def read_vint():
+			s = ord(tx[skip(1)])
+			if s < 0xfd: return s
+			fs,n = { 0xfd:('<H',2), 0xfe:('<I',4), 0xff:('<Q',8) }[s]
+			return struct.unpack_from(fs,tx,skip(n))[0]
+
+		version = unpack_uint('<I',tx,skip(4))
+		has_witness = tx[4] == '\x00'
 		if has_witness:
-			u = hshift(tx,2,skip=True)[2:]
+			u = hexlify(tx[5])
 			if u != '01':
 				raise IllegalWitnessFlagValue,"'{}': Illegal value for flag in transaction!".format(u)
-			del tx_copy[-len(tx)-2:-len(tx)]
-
-		d['num_txins'] = readVInt(tx)
-		d['txins'] = MMGenList([OrderedDict((
-			('txid',      hshift(tx,32,reverse=True)),
-			('vout',      bytes2int(hshift(tx,4))),
-			('scriptSig', hshift(tx,readVInt(tx,sub_null=True),skip=True)),
-			('nSeq',      hshift(tx,4,reverse=True))
-		)) for i in range(d['num_txins'])])
-
-		d['num_txouts'] = readVInt(tx)
-		d['txouts'] = MMGenList([OrderedDict((
-			('amount',       bytes2coin_amt(hshift(tx,8))),
-			('scriptPubKey', hshift(tx,readVInt(tx)))
-		)) for i in range(d['num_txouts'])])
-
-		for o in d['txouts']:
-			o['address'] = scriptPubKey2addr(o['scriptPubKey'])[0]
-
-		d['witness_size'] = 0
+			skip(2)
+
+		io_start = pos[0]
+		num_txins = read_vint()
+		ins_start = pos[0]
+		txins = [] # (prevout offset, scriptSig offset, scriptSig length)
+		for i in range(num_txins):
+			p = skip(36)
+			sslen = read_vint()
+			txins.append((p,skip(sslen),sslen))
+			skip(4)
+
+		outs_start = pos[0]
+		num_txouts = read_vint()
+		txouts = [] # (amount offset, scriptPubKey offset, scriptPubKey length)
+		for i in range(num_txouts):
+			p = skip(8)
+			spklen = read_vint()
+			txouts.append((p,skip(spklen),spklen))
+		io_end = pos[0]
+
+		witnesses = [None] * num_txins
 		if has_witness:
 			# https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki
 			# A non-witness program (defined hereinafter) txin MUST be associated with an empty
 			# witness field, represented by a 0x00.
-			del tx_copy[-len(tx):-4]
-			wd,tx = tx[:-4],tx[-4:]
-			d['witness_size'] = len(wd) + 2 # add marker and flag
-			for i in range(len(d['txins'])):
-				if hexlify(wd[0]) == '00':
-					hshift(wd,1,skip=True)
-					continue
-				d['txins'][i]['witness'] = [
-					hshift(wd,readVInt(wd,skip=True),skip=True) for item in range(readVInt(wd,skip=True))
-				]
-			if wd:
+			for i in range(num_txins):
+				if pos[0] >= len(tx) - 4:
+					raise ValueError,'Unexpected end of witness data'
+				witnesses[i] = [(skip(n),n) for n in (read_vint() for item in range(read_vint()))] or None
+			if pos[0] != len(tx) - 4:
 				raise WitnessSizeMismatch,'More witness data than inputs with witnesses!'
 
-		d['lock_time'] = bytes2int(hshift(tx,4))
-		d['txid'] = hexlify(sha256(sha256(''.join(tx_copy)).digest()).digest()[::-1])
-		d['unsigned_hex'] = hexlify(d['raw_tx'])
-		del d['raw_tx']
+		lt_pos = skip(4)
+
+		def get_txid():
+			return hexlify(sha256(sha256(tx[:4]+tx[io_start:io_end]+tx[lt_pos:lt_pos+4]).digest()).digest()[::-1])
+
+		def get_unsigned_hex():
+			return hexlify(''.join(
+				[tx[:4],tx[io_start:ins_start]] +
+				[tx[p:p+36] + '\x00' + tx[s+n:s+n+4] for p,s,n in txins] +
+				[tx[outs_start:io_end],tx[lt_pos:lt_pos+4]] ))
+
+		def get_txins():
+			ret = MMGenList()
+			for (p,s,n),w in zip(txins,witnesses):
+				e = OrderedDict((
+					('txid',      hexlify(tx[p:p+32][::-1])),
+					('vout',      unpack_uint('<I',tx,p+32)),
+					('scriptSig', hexlify(tx[s:s+n])),
+					('nSeq',      '{:08x}'.format(struct.unpack_from('<I',tx,s+n)[0]))
+				))
+				if w: e['witness'] = [hexlify(tx[wp:wp+wn]) for wp,wn in w]
+				ret.append(e)
+			return ret
 
-		keys = 'txid','version','lock_time','witness_size','num_txins','txins','num_txouts','txouts','unsigned_hex'
-		return OrderedDict.__init__(self, ((k,d[k]) for k in keys))
+		def get_txouts():
+			coin_amt,unit = g.proto.coin_amt,g.proto.coin_amt.min_coin_unit
+			def get_txout(p,s,n):
+				spk = hexlify(tx[s:s+n])
+				return LazyOrderedDict((
+					('amount',       coin_amt(unpack_uint('<Q',tx,p) * unit)),
+					('scriptPubKey', spk),
+					('address',      _Lazy(lambda: scriptPubKey2addr(spk)[0]))
+				))
+			return MMGenList([get_txout(p,s,n) for p,s,n in txouts])
+
+		LazyOrderedDict.__init__(self,(
+			('txid',         _Lazy(get_txid)),
+			('version',      version),
+			('lock_time',    unpack_uint('<I',tx,lt_pos)),
+			('witness_size', (lt_pos - io_end + 2) if has_witness else 0), # add marker and flag
+			('num_txins',    num_txins),
+			('txins',        _Lazy(get_txins)),
+			('num_txouts',   num_txouts),
+			('txouts',       _Lazy(get_txouts)),
+			('unsigned_hex', _Lazy(get_unsigned_hex)) ))
 
 txio_attrs = {
 	'vout':  MMGenListItemAttr('vout',int,typeconv=False),
@@ -397,18 +444,18 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 	def has_segwit_inputs(self):
 		return any(i.mmid and i.mmid.mmtype in ('S','B') for i in self.inputs)
 
-	def compare_size_and_estimated_size(self):
+	def compare_size_and_estimated_size(self,deserial_tx=None):
 		est_vsize = self.estimate_size()
-		d = g.rpch.decoderawtransaction(self.hex)
-		vsize = d['vsize'] if 'vsize' in d else d['size']
-		vmsg('\nSize: {}, Vsize: {} (true) {} (estimated)'.format(d['size'],vsize,est_vsize))
-		m1 = 'Estimated transaction vsize is {:1.2f} times the true vsize\n'
+		vmin,vmax = self.estimate_size_range()
+		size = len(self.hex) / 2
+		wsize = (deserial_tx or DeserializedTX(self.hex))['witness_size']
+		vsize = (size * 4 - wsize * 3 + 3) / 4 # weight: non-witness bytes count 4 times, witness bytes once
+		vmsg('\nSize: {}, Vsize: {} (true) {} (estimated, range {}-{})'.format(size,vsize,est_vsize,vmin,vmax))
+		m1 = 'True transaction vsize ({}) exceeds the estimated vsize ({})\n'
 		m2 = 'Your transaction fee estimates will be inaccurate\n'
 		m3 = 'Please re-create and re-sign the transaction using the option --vsize-adj={:1.2f}'
-		# allow for 5% error
-		ratio = float(est_vsize) / vsize
-		if not (0.95 < ratio < 1.05):
-			raise BadTxSizeEstimate,(m1+m2+m3).format(ratio,1/ratio)
+		if vsize > est_vsize:
+			raise BadTxSizeEstimate,(m1+m2+m3).format(vsize,est_vsize,float(vsize)/est_vsize+0.01)
 
 	# https://bitcoin.stackexchange.com/questions/1195/how-to-calculate-transaction-size-before-sending
 	# 180: uncompressed, 148: compressed
@@ -416,38 +463,54 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		if not self.inputs or not self.outputs: return None
 		return len(self.inputs)*180 + len(self.outputs)*34 + 10
 
+	# DER signature plus sighash type byte: 6 + len(r) + len(s) + 1.  r is 33 bytes if its
+	# high bit is set, s at most 32 bytes in lower-S form.  The probability of either being
+	# shorter than 31 bytes is under 2**-15, so the lower bound is a practical one.
+	sig_size_range = (69,72)
+	pubkey_size = { 'uncompressed': 65, 'compressed': 33 }
+
+	@staticmethod
+	def vint_size(n): return 1 if n < 0xfd else 3 if n <= 0xffff else 5 if n <= 0xffffffff else 9
+
+	# txid vout [scriptSig size (vInt)] scriptSig nSeq
+	# P2PKH scriptSig: <push><sig> <push><pubkey>
+	# P2SH-P2WPKH scriptSig: <push><0 <push><pubkeyhash>>, P2WPKH scriptSig: empty
+	# witness field: <vInt(2)> <vInt><sig> <vInt><pubkey>, or 0x00 for non-witness inputs
+	# returns (base size, witness size) for the min and max signature sizes
+	def get_input_sizes(self,addr_fmt,mmtype): # mmtype is None for non-MMGen inputs
+		pk_u,pk_c = self.pubkey_size['uncompressed'],self.pubkey_size['compressed']
+		if addr_fmt == 'p2pkh':
+			# we have no way of knowing whether a non-MMGen addr is compressed or uncompressed
+			# until we see the key, so allow for both
+			pks = ((pk_u,pk_u) if mmtype == 'L' else (pk_c,pk_c)) if mmtype else (pk_c,pk_u)
+			return [(40 + self.vint_size(n) + n, None) for n in
+						(1 + sig + 1 + pk for sig,pk in zip(self.sig_size_range,pks))]
+		else:
+			ss_size = (0,23)[addr_fmt == 'p2sh']
+			return [(40 + 1 + ss_size, 1 + 1 + sig + 1 + pk_c) for sig in self.sig_size_range]
+
+	# max weight of an input spending 'addr', assuming all inputs are witness inputs
+	def get_max_input_weight(self,addr,mmid):
+		b,w = self.get_input_sizes(addr.addr_fmt,mmid.mmtype if mmid else None)[1]
+		return b * 4 + (w or 1)
+
+	# amt: 8, [pk_script size (vInt)] pk_script
+	# pk_script bytes: p2pkh: 25, p2sh: 23, bech32: 22
+	@staticmethod
+	def get_output_size(addr_fmt):
+		return 8 + 1 + {'p2pkh':25,'p2sh':23,'bech32':22}[addr_fmt]
+
 	# https://bitcoincore.org/en/segwit_wallet_dev/
 	# vsize: 3 times of the size with original serialization, plus the size with new
 	# serialization, divide the result by 4 and round up to the next integer.
-
-	# TODO: results differ slightly from actual transaction size
-	def estimate_size(self):
+	def estimate_size_range(self): # return [min,max] vsize of the signed transaction
 		if not self.inputs or not self.outputs: return None
 
-		sig_size = 72 # sig in DER format
-		pubkey_size_uncompressed = 65
-		pubkey_size_compressed = 33
-
-		def get_inputs_size():
-			# txid vout [scriptSig size (vInt)] scriptSig (<sig> <pubkey>) nSeq
-			isize_common = 32 + 4 + 1 + 4 # txid vout [scriptSig size] nSeq = 41
-			input_size = {
-				'L': isize_common + sig_size + pubkey_size_uncompressed, # = 180
-				'C': isize_common + sig_size + pubkey_size_compressed,   # = 148
-				'S': isize_common + 23,                                  # = 64
-				'B': isize_common + 0                                    # = 41
-			}
-			ret = sum(input_size[i.mmid.mmtype] for i in self.inputs if i.mmid)
-
-			# We have no way of knowing whether a non-MMGen addr is compressed or uncompressed until
-			# we see the key, so assume compressed for fee-estimation purposes.  If fee estimate is
-			# off by more than 5%, sign() aborts and user is instructed to use --vsize-adj option
-			return ret + sum(input_size['C'] for i in self.inputs if not i.mmid)
-
-		def get_outputs_size():
-			# output bytes = amt: 8, byte_count: 1+, pk_script
-			# pk_script bytes: p2pkh: 25, p2sh: 23, bech32: 22
-			return sum({'p2pkh':34,'p2sh':32,'bech32':31}[o.addr.addr_fmt] for o in self.outputs)
+		vint_size = self.vint_size
+
+		in_sizes = [self.get_input_sizes(i.addr.addr_fmt,i.mmid.mmtype if i.mmid else None) for i in self.inputs]
+		# [nVersion] [vInt][txouts] [nLockTime]
+		common = 4 + vint_size(len(self.outputs)) + sum(self.get_output_size(o.addr.addr_fmt) for o in self.outputs) + 4
 
 		# https://github.com/bitcoin/bips/blob/master/bip-0141.mediawiki
 		# The witness is a serialization of all witness data of the transaction. Each txin is
@@ -457,30 +520,26 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		# A non-witness program txin MUST be associated with an empty witness field, represented
 		# by a 0x00. If all txins are not witness program, a transaction's wtxid is equal to its txid.
-		def get_witness_size():
-			if not self.has_segwit_inputs(): return 0
-			wf_size = 1 + 1 + sig_size + 1 + pubkey_size_compressed # vInt vInt sig vInt pubkey = 108
-			return sum((1,wf_size)[bool(i.mmid) and i.mmid.mmtype in ('S','B')] for i in self.inputs)
-
-		isize = get_inputs_size()
-		osize = get_outputs_size()
-		wsize = get_witness_size()
-
-		# TODO: compute real varInt sizes instead of assuming 1 byte
-		# old serialization: [nVersion]              [vInt][txins][vInt][txouts]         [nLockTime]
-		old_size =           4                     + 1   + isize + 1  + osize          + 4
-		# marker = 0x00, flag = 0x01
-		# new serialization: [nVersion][marker][flag][vInt][txins][vInt][txouts][witness][nLockTime]
-		new_size =           4       + 1     + 1   + 1   + isize + 1  + osize + wsize  + 4 \
-				if wsize else old_size
+		has_witness = any(w for d in in_sizes for b,w in d)
+		ret = []
+		for n in (0,1):
+			isize = sum(d[n][0] for d in in_sizes)
+			# old serialization: [nVersion] [vInt][txins] [vInt][txouts] [nLockTime]
+			old_size = common + vint_size(len(self.inputs)) + isize
+			# marker = 0x00, flag = 0x01
+			wsize = 2 + sum(d[n][1] or 1 for d in in_sizes) if has_witness else 0
+			ret.append((old_size * 4 + wsize + 3) / 4)
+			dmsg('\nData from estimate_size_range() ({}):'.format(('min','max')[n]))
+			dmsg('  inputs size: {}, outputs size: {}, witness size: {}'.format(isize,common-8,wsize))
+			dmsg('  size: {}, vsize: {}, old_size: {}'.format(old_size+wsize,ret[-1],old_size))
 
-		ret = (old_size * 3 + new_size) / 4
-
-		dmsg('\nData from estimate_size():')
-		dmsg('  inputs size: {}, outputs size: {}, witness size: {}'.format(isize,osize,wsize))
-		dmsg('  size: {}, vsize: {}, old_size: {}'.format(new_size,ret,old_size))
+		return ret
 
-		return int(ret * float(opt.vsize_adj)) if hasattr(opt,'vsize_adj') and opt.vsize_adj else ret
+	# the maximum vsize, so that fees are computed for the largest the signed transaction can be
+	def estimate_size(self):
+		r = self.estimate_size_range()
+		if not r: return None
+		return int(r[1] * float(opt.vsize_adj)) if hasattr(opt,'vsize_adj') and opt.vsize_adj else r[1]
 
 	# coin-specific fee routines
 	def get_relay_fee(self):
@@ -517,7 +576,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		ret = g.proto.coin_amt(rel_fee) * opt.tx_fee_adj * tx_size / 1024
 		if opt.verbose:
 			msg('{} fee for {} confirmations: {} {}/kB'.format(fe_type.upper(),opt.tx_confs,rel_fee,g.coin))
-			msg('TX size (estimated): {}'.format(tx_size))
+			msg('TX vsize (estimated): {} (range {}-{})'.format(tx_size,*self.estimate_size_range()))
 		return ret
 
 	def convert_and_check_fee(self,tx_fee,desc='Missing description'):
@@ -645,36 +704,43 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 	def add_blockcount(self):
 		self.blockcount = self.get_blockcount()
 
+	# File format version 2: canonical JSON, checksummed with make_chksum_6().  Version 1
+	# (line-based, with inputs and outputs as Python literals) is still read, not written.
+	file_version = 2
+	json_prefix = '{"MMGenTransaction":{"metadata":'
+
+	@staticmethod
+	def json_dumps(d): # canonical form
+		return json.dumps(d,sort_keys=True,separators=(',',':'))
+
+	@classmethod
+	def json_body(cls,d): # metadata first, so that it can be decoded without the rest
+		return '{{{}}}'.format(','.join('"{}":{}'.format(k,cls.json_dumps(d[k]))
+					for k in ('metadata','inputs','outputs','serialized')))
+
 	def format(self):
 		self.inputs.check_coin_mismatch()
 		self.outputs.check_coin_mismatch()
 		def amt_to_str(d):
 			return dict([(k,str(d[k]) if k == 'amt' else d[k]) for k in d])
-		coin_id = '' if g.coin == 'BTC' else g.coin + ('' if g.coin == g.dcoin else ':'+g.dcoin)
-		lines = [
-			'{}{} {} {} {} {}{}'.format(
-				(coin_id+' ' if coin_id else ''),
-				self.chain.upper() if self.chain else 'Unknown',
-				self.txid,
-				self.send_amt,
-				self.timestamp,
-				self.blockcount,
-				('',' LT={}'.format(self.locktime))[bool(self.locktime)]
-			),
-			self.hex,
-			repr([amt_to_str(e.__dict__) for e in self.inputs]),
-			repr([amt_to_str(e.__dict__) for e in self.outputs])
-		]
-		if self.label:
-			lines.append(baseconv.b58encode(self.label.encode('utf8')))
-		if self.coin_txid:
-			if not self.label: lines.append('-') # keep old tx files backwards compatible
-			lines.append(self.coin_txid)
-		self.chksum = make_chksum_6(' '.join(lines))
-		self.fmt_data = '\n'.join([self.chksum] + lines)+'\n'
-
-		assert len(self.fmt_data) <= g.max_tx_file_size,(
-			'Transaction file size exceeds limit ({} bytes)'.format(g.max_tx_file_size))
+		body = self.json_body({
+			'metadata': {
+				'version':    self.file_version,
+				'coin':       g.coin,
+				'dcoin':      g.dcoin,
+				'chain':      self.chain,
+				'txid':       self.txid,
+				'send_amt':   str(self.send_amt),
+				'timestamp':  self.timestamp,
+				'blockcount': self.blockcount,
+				'locktime':   self.locktime,
+				'comment':    self.label or None,
+				'coin_txid':  self.coin_txid or None },
+			'inputs':     [amt_to_str(e.__dict__) for e in self.inputs],
+			'outputs':    [amt_to_str(e.__dict__) for e in self.outputs],
+			'serialized': self.hex })
+		self.chksum = make_chksum_6(body)
+		self.fmt_data = '{{"MMGenTransaction":{},"chksum":"{}"}}\n'.format(body,self.chksum)
 
 	def get_non_mmaddrs(self,desc):
 		return list(set(i.addr for i in getattr(self,desc) if not i.mmid))
@@ -694,49 +760,20 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		self.check_pubkey_scripts()
 
-		qmsg('Passing {} key{} to {}'.format(len(keys),suf(keys,'s'),g.proto.daemon_name))
-
-		if self.has_segwit_inputs():
-			from mmgen.addr import KeyGenerator,AddrGenerator
-			kg = KeyGenerator('std')
-			ag = AddrGenerator('segwit')
-			keydict = MMGenDict([(d.addr,d.sec) for d in keys])
-
-		sig_data = []
-		for d in self.inputs:
-			e = dict([(k,getattr(d,k)) for k in ('txid','vout','scriptPubKey','amt')])
-			e['amount'] = e['amt']
-			del e['amt']
-			if d.mmid and d.mmid.mmtype == 'S':
-				e['redeemScript'] = ag.to_segwit_redeem_script(kg.to_pubhex(keydict[d.addr]))
-			sig_data.append(e)
-
 		msg_r('Signing transaction{}...'.format(tx_num_str))
-		wifs = [d.sec.wif for d in keys]
 
 		try:
-			ret = g.rpch.signrawtransactionwithkey(self.hex,wifs,sig_data,g.proto.sighash_type) \
-				if 'sign_with_key' in g.rpch.caps else \
-					g.rpch.signrawtransaction(self.hex,sig_data,wifs,g.proto.sighash_type)
+			self.hex = self.sign_inputs(keys)
 		except Exception as e:
-			msg(yellow('This is not the BCH chain.\nRe-run the script without the --coin=bch option.'
-				if 'Invalid sighash param' in e.message else e.message))
-			return False
-
-		if not ret['complete']:
-			msg('failed\n{} returned the following errors:'.format(g.proto.daemon_name.capitalize()))
-			msg(repr(ret['errors']))
+			msg('failed\n'+yellow(e.message))
 			return False
 
 		try:
-			self.hex = ret['hex']
-			self.compare_size_and_estimated_size()
 			dt = DeserializedTX(self.hex)
+			self.compare_size_and_estimated_size(dt)
 			self.check_hex_tx_matches_mmgen_tx(dt)
 			self.coin_txid = CoinTxID(dt['txid'],on_fail='raise')
 			self.check_sigs(dt)
-			if not self.coin_txid == g.rpch.decoderawtransaction(self.hex)['txid']:
-				raise BadMMGenTxID,'txid mismatch (after signing)'
 			msg('OK')
 			return True
 		except Exception as e:
@@ -745,6 +782,25 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 			msg('\n'+yellow(m))
 			return False
 
+	# sign in-process, without the coin daemon; return signed hex
+	def sign_inputs(self,keys):
+		from mmgen.txsigner import TxSigner
+		from mmgen.addr import KeyGenerator
+		import struct
+		kg = KeyGenerator('std')
+		keydict = dict([(d.addr,d.sec) for d in keys])
+		ts = TxSigner(self.hex,g.proto.sighash_type)
+		if len(ts.prevouts) != len(self.inputs):
+			raise TxHexMismatch,'Number of inputs in hex transaction data does not match MMGen transaction!'
+		for n,i in enumerate(self.inputs):
+			if ts.prevouts[n] != unhexlify(i.txid)[::-1] + struct.pack('<I',i.vout):
+				raise TxHexMismatch,'Input #{} of hex transaction data does not match MMGen transaction!'.format(n+1)
+			if i.addr not in keydict:
+				raise ValueError,'No key for input #{} (address {})'.format(n+1,i.addr)
+			sec = keydict[i.addr]
+			ts.sign_input(n,unhexlify(sec),unhexlify(kg.to_pubhex(sec)),unhexlify(i.scriptPubKey),i.amt.toSatoshi())
+		return ts.serialize()
+
 	def mark_raw(self):
 		self.desc = 'transaction'
 		self.ext = self.raw_ext
@@ -880,7 +936,9 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 				if not opt.quiet:
 					msg('Replacing transactions:')
 					rt = ret[1]['walletconflicts']
-					for t,s in [(tx,'size' in g.rpch.getmempoolentry(tx,on_fail='silent')) for tx in rt]:
+					fs = [g.rpch.defer('getmempoolentry',tx,on_fail='silent') for tx in rt]
+					g.rpch.flush()
+					for t,s in [(tx,'size' in f.result()) for tx,f in zip(rt,fs)]:
 						msg('  {}{}'.format(t,('',' in mempool')[s]))
 				die(0,'')
 
@@ -1057,7 +1115,8 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 	def format_view_verbose_footer(self):
 		ts = len(self.hex)/2 if self.hex else 'unknown'
-		out = 'Transaction size: Vsize {} (estimated), Total {}'.format(self.estimate_size(),ts)
+		out = 'Transaction size: Vsize {} (estimated, range {}-{}), Total {}'.format(
+					self.estimate_size(),*(self.estimate_size_range() + [ts]))
 		if self.marked_signed():
 			ws = DeserializedTX(self.hex)['witness_size']
 			out += ', Base {}, Witness {}'.format(ts-ws,ws)
@@ -1117,14 +1176,16 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 	def parse_tx_file(self,infile,metadata_only=False,silent_open=False):
 
 		def eval_io_data(raw_data,desc):
-			from ast import literal_eval
-			try:
-				d = literal_eval(raw_data)
-			except:
-				if desc == 'inputs' and not silent_open:
-					ymsg('Warning: transaction data appears to be in old format')
-				import re
-				d = literal_eval(re.sub(r"[A-Za-z]+?\(('.+?')\)",r'\1',raw_data))
+			if isinstance(raw_data,basestring): # version 1
+				from ast import literal_eval
+				try:
+					raw_data = literal_eval(raw_data)
+				except:
+					if desc == 'inputs' and not silent_open:
+						ymsg('Warning: transaction data appears to be in old format')
+					import re
+					raw_data = literal_eval(re.sub(r"[A-Za-z]+?\(('.+?')\)",r'\1',raw_data))
+			d = raw_data
 			assert type(d) == list,'{} data not a list!'.format(desc)
 			if not (desc == 'outputs' and g.proto.base_coin == 'ETH'): # ETH txs can have no outputs
 				assert len(d),'no {}!'.format(desc)
@@ -1139,49 +1200,85 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		try:
 			desc = 'data'
-			assert len(tx_data) <= g.max_tx_file_size,(
-				'Transaction file size exceeds limit ({} bytes)'.format(g.max_tx_file_size))
-			tx_data = tx_data.decode('ascii').splitlines()
-			assert len(tx_data) >= 5,'number of lines less than 5'
-			assert len(tx_data[0]) == 6,'invalid length of first line'
-			self.chksum = HexStr(tx_data.pop(0),on_fail='raise')
-			assert self.chksum == make_chksum_6(' '.join(tx_data)),'file data does not match checksum'
-
-			if len(tx_data) == 6:
-				assert len(tx_data[-1]) == 64,'invalid coin TxID length'
-				desc = '{} TxID'.format(g.proto.name.capitalize())
-				self.coin_txid = CoinTxID(tx_data.pop(-1),on_fail='raise')
-
-			if len(tx_data) == 5:
-				# rough check: allow for 4-byte utf8 characters + base58 (4 * 11 / 8 = 6 (rounded up))
-				assert len(tx_data[-1]) < MMGenTXLabel.max_len*6,'invalid comment length'
-				c = tx_data.pop(-1)
-				if c != '-':
-					desc = 'encoded comment (not base58)'
-					comment = baseconv.b58decode(c).decode('utf8')
-					assert comment != False,'invalid comment'
+			if tx_data[:1] == '{': # version 2
+				desc = 'JSON data'
+				# files as written are in canonical form, so the body can be checksummed as is
+				b,chksum = tx_data.rstrip()[20:-19],tx_data.rstrip()[-8:-2]
+				canonical = tx_data.startswith(self.json_prefix) and make_chksum_6(b) == chksum
+				if canonical and metadata_only: # decode the metadata and stop
+					self.chksum = HexStr(chksum,on_fail='raise')
+					md = json.JSONDecoder().raw_decode(tx_data,len(self.json_prefix))[0]
+				else:
+					d = json.loads(tx_data)
+					self.chksum = HexStr(d['chksum'],on_fail='raise')
+					d = d['MMGenTransaction']
+					if not canonical: b = self.json_body(d)
+					assert self.chksum == make_chksum_6(b),'file data does not match checksum'
+					md = d['metadata']
+					self.hex = str(d['serialized'])
+					inputs_data,outputs_data = d['inputs'],d['outputs']
+				desc = 'file format version'
+				assert md['version'] == self.file_version,'{}: unsupported version'.format(md['version'])
+
+				desc = 'coin type in metadata'
+				self.coin = str(md['coin'])
+				if md['dcoin'] != self.coin:
+					self.dcoin = str(md['dcoin'])
+				self.chain = md['chain'] and str(md['chain'])
+				if md['locktime'] != None:
+					desc = 'locktime'
+					self.locktime = int(md['locktime'])
+				if md['comment']:
 					desc = 'comment'
-					self.label = MMGenTXLabel(comment,on_fail='raise')
-
-			desc = 'number of lines' # four required lines
-			metadata,self.hex,inputs_data,outputs_data = tx_data
-			assert len(metadata) < 100,'invalid metadata length' # rough check
-			metadata = metadata.split()
-
-			if metadata[-1].find('LT=') == 0:
-				desc = 'locktime'
-				self.locktime = int(metadata.pop()[3:])
-
-			self.coin = metadata.pop(0) if len(metadata) == 6 else 'BTC'
-			if ':' in self.coin:
-				self.coin,self.dcoin = self.coin.split(':')
-
-			if len(metadata) == 5:
-				t = metadata.pop(0)
-				self.chain = (t.lower(),None)[t=='Unknown']
-
-			desc = 'metadata (4 items minimum required)'
-			txid,send_amt,self.timestamp,blockcount = metadata
+					self.label = MMGenTXLabel(md['comment'],on_fail='raise')
+				if md['coin_txid']:
+					desc = '{} TxID'.format(g.proto.name.capitalize())
+					self.coin_txid = CoinTxID(str(md['coin_txid']),on_fail='raise')
+
+				txid,send_amt,self.timestamp,blockcount = (
+					str(md['txid']),str(md['send_amt']),str(md['timestamp']),md['blockcount'])
+			else: # version 1
+				tx_data = tx_data.decode('ascii').splitlines()
+				assert len(tx_data) >= 5,'number of lines less than 5'
+				assert len(tx_data[0]) == 6,'invalid length of first line'
+				self.chksum = HexStr(tx_data.pop(0),on_fail='raise')
+				assert self.chksum == make_chksum_6(' '.join(tx_data)),'file data does not match checksum'
+
+				if len(tx_data) == 6:
+					assert len(tx_data[-1]) == 64,'invalid coin TxID length'
+					desc = '{} TxID'.format(g.proto.name.capitalize())
+					self.coin_txid = CoinTxID(tx_data.pop(-1),on_fail='raise')
+
+				if len(tx_data) == 5:
+					# rough check: allow for 4-byte utf8 characters + base58 (4 * 11 / 8 = 6 (rounded up))
+					assert len(tx_data[-1]) < MMGenTXLabel.max_len*6,'invalid comment length'
+					c = tx_data.pop(-1)
+					if c != '-':
+						desc = 'encoded comment (not base58)'
+						comment = baseconv.b58decode(c).decode('utf8')
+						assert comment != False,'invalid comment'
+						desc = 'comment'
+						self.label = MMGenTXLabel(comment,on_fail='raise')
+
+				desc = 'number of lines' # four required lines
+				metadata,self.hex,inputs_data,outputs_data = tx_data
+				assert len(metadata) < 100,'invalid metadata length' # rough check
+				metadata = metadata.split()
+
+				if metadata[-1].find('LT=') == 0:
+					desc = 'locktime'
+					self.locktime = int(metadata.pop()[3:])
+
+				self.coin = metadata.pop(0) if len(metadata) == 6 else 'BTC'
+				if ':' in self.coin:
+					self.coin,self.dcoin = self.coin.split(':')
+
+				if len(metadata) == 5:
+					t = metadata.pop(0)
+					self.chain = (t.lower(),None)[t=='Unknown']
+
+				desc = 'metadata (4 items minimum required)'
+				txid,send_amt,self.timestamp,blockcount = metadata
 
 			desc = 'txid in metadata'
 			self.txid = MMGenTxID(txid,on_fail='raise')
@@ -1315,10 +1412,64 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 		return set(sel_nums) # silently discard duplicates
 
+	# fee rate for automatic input selection, in the coin's smallest unit per vbyte,
+	# or None if the fee is absolute
+	def get_select_fee_rate(self):
+		if opt.tx_fee:
+			if g.proto.coin_amt(opt.tx_fee,on_fail='silent'): return None
+			return float(Decimal(self.process_fee_spec(opt.tx_fee,1)) / g.proto.coin_amt.min_coin_unit)
+		rel_fee,fe_type = self.get_rel_fee_from_network()
+		if rel_fee < 0:
+			die(2,self.fee_fail_fs.format(c=opt.tx_confs,t=fe_type) + '.  Specify the fee with --tx-fee')
+		return float(Decimal(rel_fee) / g.proto.coin_amt.min_coin_unit) * float(opt.tx_fee_adj) / 1024
+
+	def select_unspent_auto(self,unspent):
+		from mmgen.coinsel import select_coins
+		from math import ceil
+		if not self.send_amt:
+			die(1,'--select requires at least one output with an amount')
+
+		feerate = self.get_select_fee_rate()
+		adj = float(opt.vsize_adj) if hasattr(opt,'vsize_adj') and opt.vsize_adj else 1
+		# fee for 'w' weight units, rounded up.  Weights are computed for max signature
+		# sizes and all inputs are assumed to be witness inputs, so fees are never short
+		cost = lambda w: int(ceil((feerate or 0) * w * adj / 4))
+
+		chg_idx = self.get_chg_output_idx()
+		outs = [o for o in self.outputs if not o.is_chg]
+		# [nVersion] [vInt][txins] [vInt][txouts] [nLockTime], marker and flag, plus one vbyte of slack
+		fixed = (4 + self.vint_size(len(unspent)) + self.vint_size(len(self.outputs)) + 4 + 1) * 4 + 2
+		fixed += sum(self.get_output_size(o.addr.addr_fmt) for o in outs) * 4
+		target = self.send_amt.to_unit('min_coin_unit') + cost(fixed)
+		if feerate == None:
+			target += g.proto.coin_amt(opt.tx_fee).to_unit('min_coin_unit')
+
+		if chg_idx == None:
+			target_chg,cost_of_change = target,0
+		else:
+			chg = self.outputs[chg_idx]
+			chg_out = self.get_output_size(chg.addr.addr_fmt) * 4
+			target_chg = target + cost(chg_out)
+			cost_of_change = cost(chg_out) + cost(self.get_max_input_weight(chg.addr,chg.mmid))
+
+		ev = [u.amt.to_unit('min_coin_unit') - cost(self.get_max_input_weight(u.addr,
+				u.twmmid.obj if u.twmmid.type == 'mmgen' else None)) for u in unspent]
+
+		ret,self.changeless = select_coins(opt.select,ev,target,target_chg,cost_of_change,
+				confs=[u.confs for u in unspent],addrs=[u.addr for u in unspent])
+		if ret == None:
+			die(2,'Insufficient funds for automatic input selection (method: {})'.format(opt.select))
+		if chg_idx == None: # no change output, so any excess goes to the fee
+			self.changeless = True
+		elif self.changeless:
+			msg('Found input selection requiring no change output')
+		return sorted(i+1 for i in ret)
+
 	def get_inputs_from_user(self,tw):
 
 		while True:
-			us_f = ('select_unspent','select_unspent_cmdline')[bool(opt.inputs)]
+			us_f = ('select_unspent','select_unspent_cmdline','select_unspent_auto')[
+						2 if opt.select else bool(opt.inputs)]
 			sel_nums = getattr(self,us_f)(tw.unspent)
 
 			msg('Selected output{}: {}'.format(suf(sel_nums,'s'),' '.join(map(str,sel_nums))))
@@ -1337,7 +1488,11 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 
 			self.copy_inputs_from_tw(sel_unspent)  # makes self.inputs
 
-			self.fee = self.get_fee_from_user()
+			if opt.select and self.changeless: # the excess goes to the fee
+				self.fee = self.get_usr_fee_interactive(
+					str(inputs_sum - self.send_amt),desc='Changeless transaction')
+			else:
+				self.fee = self.get_fee_from_user()
 
 			change_amt = self.get_change_amt()
 
@@ -1368,7 +1523,7 @@ Selected non-{pnm} inputs: {{}}""".strip().format(pnm=g.proj_name,pnl=g.proj_nam
 		from mmgen.tw import TwUnspentOutputs
 		tw = TwUnspentOutputs(minconf=opt.minconf)
 
-		if not opt.inputs:
+		if not (opt.inputs or opt.select):
 			tw.view_and_sort(self)
 
 		tw.display_total()
@@ -1551,3 +1706,69 @@ class MMGenSplitTX(MMGenTX):
 
 		if not opt.yes:
 			self.view_with_prompt('View decoded transaction?')
+
+class MMGenConsolidateTX(MMGenSplitTX):
+
+	desc = 'consolidation transaction'
+
+	def plan(self,mmid,unspent,max_vsize=None,max_txs=None):
+		"""
+		Group 'unspent' into transactions of no more than 'max_vsize' vbytes, each with a
+		single output to 'mmid'.  Returns the list of transactions, and the indexes of
+		the outputs left unspent
+		"""
+		from mmgen.coinsel import plan_consolidation
+		from math import ceil
+
+		feerate = self.get_select_fee_rate()
+		if feerate == None:
+			die(1,'Transaction fee must be specified as a fee rate, not an absolute amount')
+		cost = lambda w: int(ceil(feerate * w / 4))
+
+		self.get_outputs_from_cmdline(mmid)
+		out = self.outputs[0]
+
+		# no transaction may exceed the max fee
+		max_vsize = min(max_vsize or g.proto.max_std_vsize,
+						int(g.proto.max_tx_fee.to_unit('min_coin_unit') / feerate))
+		# [nVersion] [vInt][txins] [vInt][txouts] [nLockTime], marker and flag, plus one vbyte of slack
+		fixed = (4 + 3 + 1 + 4 + 1 + self.get_output_size(out.addr.addr_fmt)) * 4 + 2
+		weights = [self.get_max_input_weight(u.addr,u.twmmid.obj if u.twmmid.type == 'mmgen' else None)
+						for u in unspent]
+		if max_vsize * 4 < fixed + max(weights or [0]):
+			die(1,'Maximum transaction vsize of {} is too small at this fee rate'.format(max_vsize))
+
+		# the output must be worth spending, and not dust
+		min_out = max(g.proto.dust_limit,cost(self.get_max_input_weight(out.addr,out.mmid)))
+		ev = [u.amt.to_unit('min_coin_unit') - cost(w) for u,w in zip(unspent,weights)]
+		batches = plan_consolidation(ev,weights,max_vsize * 4 - fixed,cost(fixed) + min_out)[:max_txs]
+
+		txs = []
+		for b in batches:
+			tx = type(self)()
+			tx.outputs = self.MMGenTxOutputList([self.MMGenTxOutput(**out.__dict__)])
+			tx.create_consolidation([unspent[i] for i in b],feerate)
+			txs.append(tx)
+
+		spent = set(i for b in batches for i in b)
+		return txs,[i for i in range(len(unspent)) if i not in spent]
+
+	def create_consolidation(self,unspent,feerate):
+		from math import ceil
+		self.copy_inputs_from_tw(unspent)
+		if opt.rbf: self.inputs[0].sequence = g.max_int - 2
+
+		unit = g.proto.coin_amt.min_coin_unit
+		self.fee = g.proto.coin_amt(unit * int(ceil(feerate * self.estimate_size())))
+		self.send_amt = g.proto.coin_amt(self.sum_inputs() - self.fee)
+		self.update_output_amt(0,self.send_amt) # so fee == sum_inputs() - sum_outputs()
+
+		if opt.comment_file: self.add_comment(opt.comment_file)
+		self.create_raw()       # creates self.hex, self.txid
+
+		self.add_timestamp()
+		self.add_blockcount()
+		self.chain = g.chain
+
+		assert self.fee == self.sum_inputs() - self.sum_outputs()
+		self.check_fee()
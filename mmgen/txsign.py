@@ -40,7 +40,7 @@ ERROR: a key file must be supplied for the following non-{pnm} address{{}}:\n
 
 saved_seeds = {}
 
-def get_seed_for_seed_id(sid,infiles,saved_seeds):
+def get_seed_for_seed_id(sid,infiles,saved_seeds,on_fail='die'):
 
 	if sid in saved_seeds:
 		return saved_seeds[sid]
@@ -52,21 +52,26 @@ def get_seed_for_seed_id(sid,infiles,saved_seeds):
 			qmsg('Need seed data for Seed ID {}'.format(sid))
 			ss = SeedSource()
 			msg('User input produced Seed ID {}'.format(ss.seed.sid))
+		elif on_fail == 'return':
+			return None
 		else:
 			die(2,'ERROR: No seed source found for Seed ID: {}'.format(sid))
 
 		saved_seeds[ss.seed.sid] = ss.seed
 		if ss.seed.sid == sid: return ss.seed
 
-def generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds):
+# With skip_missing, Seed IDs with no seed source are skipped rather than fatal
+def generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds,skip_missing=False):
 	mmids = [e.mmid for e in need_keys]
 	sids = set(i.sid for i in mmids)
 	vmsg('Need seed{}: {}'.format(suf(sids,'s'),' '.join(sids)))
 	d = MMGenList()
 	from mmgen.addr import KeyAddrList
 	for sid in sids:
-		# Returns only if seed is found
-		seed = get_seed_for_seed_id(sid,infiles,saved_seeds)
+		seed = get_seed_for_seed_id(sid,infiles,saved_seeds,on_fail=('die','return')[skip_missing])
+		if not seed:
+			msg('No seed source found for Seed ID {}: skipping'.format(sid))
+			continue
 		for t in MMGenAddrType.mmtypes:
 			idx_list = [i.idx for i in mmids if i.sid == sid and i.mmtype == t]
 			if idx_list:
@@ -74,30 +79,55 @@ def generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds):
 				d.append(KeyAddrList(seed=seed,addr_idxs=addr_idxs,do_chksum=False,mmtype=MMGenAddrType(t)))
 	return d
 
-def add_keys(tx,src,infiles=None,saved_seeds=None,keyaddr_list=None):
+def generate_kals_for_txs(txs,infiles,saved_seeds,keyaddr_list=None):
+	"""
+	Derive the keys for the MMGen inputs and outputs of all transactions in 'txs'
+	at once, skipping those found in 'keyaddr_list'.  Keys used by more than one
+	transaction, and the seed chains leading to them, are thus generated only once.
+	The returned key-address lists are passed to txsign() for each transaction.
+	A missing seed is reported by txsign() for the transactions that need it.
+	"""
+	def in_kal(mmid):
+		return keyaddr_list and keyaddr_list.al_id == mmid.al_id and keyaddr_list.entry(mmid.idx)
+	need_keys = [e for tx in txs for e in tx.inputs + tx.outputs if e.mmid and not in_kal(e.mmid)]
+	if not need_keys: return MMGenList()
+	n = len(set(e.mmid for e in need_keys))
+	qmsg('Generating keys for {} {} address{} in {} transaction{}'.format(n,pnm,suf(n,'es'),len(txs),suf(txs,'s')))
+	return generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds,skip_missing=True)
+
+def add_keys(tx,src,infiles=None,saved_seeds=None,keyaddr_list=None,kals=None):
 	need_keys = [e for e in getattr(tx,src) if e.mmid and not e.have_wif]
 	if not need_keys: return []
 	desc,m1 = ('key-address file','From key-address file:') if keyaddr_list else \
 					('seed(s)','Generated from seed:')
 	qmsg('Checking {} -> {} address mappings for {} (from {})'.format(pnm,g.coin,src,desc))
-	d = MMGenList([keyaddr_list]) if keyaddr_list else \
+	d = MMGenList([keyaddr_list]) if keyaddr_list else kals if kals != None else \
 		generate_kals_for_mmgen_addrs(need_keys,infiles,saved_seeds)
 	new_keys = []
+	kals = dict((kal.al_id,kal) for kal in d)
 	for e in need_keys:
-		for kal in d:
-			for f in kal.data:
+		kal = kals.get(e.mmid.al_id)
+		f = kal and kal.entry(e.mmid.idx)
+		if f:
+			if f.addr == e.addr:
+				e.have_wif = True
+				if src == 'inputs':
+					new_keys.append(f)
+			else:
 				mmid = '{}:{}'.format(kal.al_id,f.idx)
-				if mmid == e.mmid:
-					if f.addr == e.addr:
-						e.have_wif = True
-						if src == 'inputs':
-							new_keys.append(f)
-					else:
-						die(3,wmsg['mapping_error'].format(m1,mmid,f.addr,'tx file:',e.mmid,e.addr))
+				die(3,wmsg['mapping_error'].format(m1,mmid,f.addr,'tx file:',e.mmid,e.addr))
+		elif not keyaddr_list: # seed was skipped by generate_kals_for_txs()
+			die(2,'ERROR: No seed source found for Seed ID: {}'.format(e.mmid.sid))
 	if new_keys:
 		vmsg('Added {} wif key{} from {}'.format(len(new_keys),suf(new_keys,'s'),desc))
 	return new_keys
 
+def check_unused_sids(txs):
+	extra_sids = set(saved_seeds)
+	for tx in txs: extra_sids -= tx.get_input_sids() | tx.get_output_sids()
+	if extra_sids:
+		msg('Unused Seed ID{}: {}'.format(suf(extra_sids,'s'),' '.join(extra_sids)))
+
 def _pop_and_return(args,cmplist): # strips found args
 	return list(reversed([args.pop(args.index(a)) for a in reversed(args) if get_extension(a) in cmplist]))
 
@@ -131,7 +161,8 @@ def get_keylist(opt):
 		return kal
 	return None
 
-def txsign(tx,seed_files,kl,kal,tx_num_str=''):
+# 'kals': key-address lists from generate_kals_for_txs(), if signing a batch of transactions
+def txsign(tx,seed_files,kl,kal,tx_num_str='',kals=None):
 
 	keys = MMGenList() # list of AddrListEntry objects
 	non_mm_addrs = tx.get_non_mmaddrs('inputs')
@@ -149,15 +180,14 @@ def txsign(tx,seed_files,kl,kal,tx_num_str=''):
 		keys += add_keys(tx,'inputs',keyaddr_list=kal)
 		add_keys(tx,'outputs',keyaddr_list=kal)
 
-	keys += add_keys(tx,'inputs',seed_files,saved_seeds)
-	add_keys(tx,'outputs',seed_files,saved_seeds)
+	keys += add_keys(tx,'inputs',seed_files,saved_seeds,kals=kals)
+	add_keys(tx,'outputs',seed_files,saved_seeds,kals=kals)
 
 	# this attr must not be written to file
 	tx.delete_attrs('inputs','have_wif')
 	tx.delete_attrs('outputs','have_wif')
 
-	extra_sids = set(saved_seeds) - tx.get_input_sids() - tx.get_output_sids()
-	if extra_sids:
-		msg('Unused Seed ID{}: {}'.format(suf(extra_sids,'s'),' '.join(extra_sids)))
+	if kals == None:
+		check_unused_sids([tx])
 
 	return tx.sign(tx_num_str,keys) # returns True or False
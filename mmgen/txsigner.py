@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+txsigner.py: Native signing of Bitcoin-type transactions, without a coin daemon
+"""
+
+# Supported inputs: P2PKH, P2SH-P2WPKH and P2WPKH.  Sighashes are computed per
+# the original algorithm for legacy inputs, per BIP143 for Segwit inputs, and per
+# BIP143 with SIGHASH_FORKID for all inputs on the Bitcoin Cash chain:
+#   https://github.com/bitcoin/bips/blob/master/bip-0143.mediawiki
+#   https://github.com/Bitcoin-ABC/bitcoin-abc/blob/master/doc/abc/replay-protected-sighash.md
+
+import struct,hashlib
+from binascii import hexlify,unhexlify
+from mmgen.obj import MMGenObject
+
+SIGHASH_ALL    = 0x01
+SIGHASH_FORKID = 0x40
+sighash_types  = { 'ALL': SIGHASH_ALL, 'ALL|FORKID': SIGHASH_ALL|SIGHASH_FORKID }
+
+def dsha256(s): return hashlib.sha256(hashlib.sha256(s).digest()).digest()
+def hash160(s): return hashlib.new('ripemd160',hashlib.sha256(s).digest()).digest()
+
+def ser_vint(n):
+	if n < 0xfd:          return chr(n)
+	elif n <= 0xffff:     return '\xfd' + struct.pack('<H',n)
+	elif n <= 0xffffffff: return '\xfe' + struct.pack('<I',n)
+	else:                 return '\xff' + struct.pack('<Q',n)
+
+def ser_push(data):
+	assert len(data) < 0x4c,'{}: data too long for direct push'.format(len(data))
+	return chr(len(data)) + data
+
+def p2pkh_script(pkh): return '\x76\xa9\x14' + pkh + '\x88\xac'
+
+def _get_sign_func():
+	try:
+		from mmgen.secp256k1 import sign
+		assert len(sign('\x01'*32,('deadbeef'*8).decode('hex'))) > 8
+		return sign
+	except:
+		import ecdsa
+		from ecdsa.util import sigencode_der
+		# lower-S form, as required by the BIP62 relay policy
+		def sigencode(r,s,order): return sigencode_der(r,min(s,order-s),order)
+		def sign(msghash,privkey):
+			sk = ecdsa.SigningKey.from_string(privkey,curve=ecdsa.SECP256k1)
+			return sk.sign_digest_deterministic(msghash,hashfunc=hashlib.sha256,sigencode=sigencode)
+		return sign
+
+_sign = None
+def ecdsa_sign(msghash,privkey): # returns DER-encoded signature, RFC6979 nonce
+	global _sign
+	if not _sign: _sign = _get_sign_func()
+	return _sign(msghash,privkey)
+
+def _get_verify_func():
+	try:
+		from mmgen.secp256k1 import verify
+		return verify
+	except:
+		import ecdsa
+		from ecdsa.util import sigdecode_der
+		def verify(msghash,sig,pubkey):
+			try:
+				vk = ecdsa.VerifyingKey.from_string(pubkey,curve=ecdsa.SECP256k1)
+				r,s = sigdecode_der(sig,vk.curve.order)
+				# reject high-S signatures, as libsecp256k1 does
+				return s <= vk.curve.order // 2 and vk.verify_digest(sig,msghash,sigdecode=sigdecode_der)
+			except Exception:
+				return False
+		return verify
+
+_verify = None
+def ecdsa_verify(msghash,sig,pubkey): # sig: DER-encoded signature, pubkey: serialized pubkey
+	global _verify
+	if not _verify: _verify = _get_verify_func()
+	return bool(_verify(msghash,sig,pubkey))
+
+class TxSigner(MMGenObject):
+	"""
+	Signs the inputs of an unsigned serialized transaction one at a time.  The BIP143
+	hashes of prevouts, sequence numbers and outputs are computed once, on first use.
+	"""
+	def __init__(self,txhex,sighash_type='ALL'):
+		tx,pos = unhexlify(txhex),[0]
+
+		def read(n):
+			ret = tx[pos[0]:pos[0]+n]
+			assert len(ret) == n,'Unexpected end of transaction data'
+			pos[0] += n
+			return ret
+
+		def read_vint():
+			s = ord(read(1))
+			if s < 0xfd: return s
+			fs,n = { 0xfd:('<H',2), 0xfe:('<I',4), 0xff:('<Q',8) }[s]
+			return struct.unpack(fs,read(n))[0]
+
+		self.version = read(4)
+		if tx[pos[0]] == '\x00':
+			raise ValueError,'Transaction has witness data: not an unsigned transaction'
+		self.prevouts,self.seqs = [],[]
+		for i in range(read_vint()):
+			self.prevouts.append(read(36))
+			if read_vint():
+				raise ValueError,'Input #{} has scriptSig: not an unsigned transaction'.format(i+1)
+			self.seqs.append(read(4))
+		n_outputs = read_vint()
+		start = pos[0]
+		for i in range(n_outputs):
+			read(8)
+			read(read_vint())
+		self.outputs = tx[start:pos[0]] # serialized outputs, without count
+		self.n_outputs = n_outputs
+		self.locktime = read(4)
+		if pos[0] != len(tx):
+			raise ValueError,'Extra data at end of transaction'
+
+		self.hashtype = sighash_types[sighash_type]
+		self.forkid = bool(self.hashtype & SIGHASH_FORKID)
+		self.script_sigs = [''] * len(self.prevouts)
+		self.witnesses = [None] * len(self.prevouts)
+		self.bip143_hashes = None
+
+	def ser_inputs(self,script_sigs):
+		return ser_vint(len(self.prevouts)) + ''.join(op + ser_vint(len(ss)) + ss + sq
+				for op,ss,sq in zip(self.prevouts,script_sigs,self.seqs))
+
+	def ser_outputs(self):
+		return ser_vint(self.n_outputs) + self.outputs
+
+	def sighash_legacy(self,n,script_code):
+		ss = [''] * len(self.prevouts)
+		ss[n] = script_code
+		return dsha256(
+			self.version + self.ser_inputs(ss) + self.ser_outputs() + self.locktime +
+			struct.pack('<I',self.hashtype) )
+
+	def sighash_bip143(self,n,script_code,amt):
+		if not self.bip143_hashes:
+			self.bip143_hashes = (
+				dsha256(''.join(self.prevouts)),
+				dsha256(''.join(self.seqs)),
+				dsha256(self.outputs) )
+		hp,hs,ho = self.bip143_hashes
+		return dsha256(
+			self.version + hp + hs + self.prevouts[n] + ser_vint(len(script_code)) + script_code +
+			struct.pack('<Q',amt) + self.seqs[n] + ho + self.locktime + struct.pack('<I',self.hashtype) )
+
+	# spk: scriptPubKey of input being spent, amt: input amount in satoshis
+	def sign_input(self,n,privkey,pubkey,spk,amt):
+		pkh = hash160(pubkey)
+		if spk == p2pkh_script(pkh):
+			script_code = spk
+			segwit = False
+		elif spk == '\x00\x14' + pkh:                    # P2WPKH
+			script_code = p2pkh_script(pkh)
+			segwit = True
+		elif spk == '\xa9\x14' + hash160('\x00\x14' + pkh) + '\x87': # P2SH-P2WPKH
+			script_code = p2pkh_script(pkh)
+			segwit = True
+			self.script_sigs[n] = ser_push('\x00\x14' + pkh)
+		else:
+			raise ValueError,'Key does not match scriptPubKey {} of input #{}'.format(hexlify(spk),n+1)
+
+		if segwit and len(pubkey) != 33:
+			raise ValueError,'Uncompressed key for Segwit input #{}'.format(n+1)
+
+		if segwit or self.forkid:
+			msghash = self.sighash_bip143(n,script_code,amt)
+		else:
+			msghash = self.sighash_legacy(n,script_code)
+
+		sig = ecdsa_sign(msghash,privkey)
+		if not ecdsa_verify(msghash,sig,pubkey):
+			raise ValueError,'Signature verification failed for input #{}'.format(n+1)
+		sig += chr(self.hashtype & 0xff)
+
+		if segwit:
+			self.witnesses[n] = (sig,pubkey)
+		else:
+			self.script_sigs[n] = ser_push(sig) + ser_push(pubkey)
+
+	def serialize(self):
+		ins,outs = self.ser_inputs(self.script_sigs),self.ser_outputs()
+		if any(self.witnesses):
+			wd = ''.join(ser_vint(len(w)) + ''.join(ser_vint(len(i))+i for i in w) if w else '\x00'
+							for w in self.witnesses)
+			return hexlify(self.version + '\x00\x01' + ins + outs + wd + self.locktime)
+		else:
+			return hexlify(self.version + ins + outs + self.locktime)
@@ -253,23 +253,44 @@ def is_ascii(s,enc='ascii'):
 
 def is_utf8(s): return is_ascii(s,enc='utf8')
 
+class baseconv_digits(dict):
+	"mnemonic wordlists are imported and checksummed on first access"
+
+	def __missing__(self,wl_id):
+		if wl_id in baseconv.wl_modules:
+			return baseconv.load_wordlist(wl_id)
+		raise KeyError,wl_id
+
+	def __contains__(self,wl_id):
+		return wl_id in baseconv.wl_modules or dict.__contains__(self,wl_id)
+
+	def keys(self):
+		return list(set(dict.keys(self)) | set(baseconv.wl_modules))
+
+	def __iter__(self):
+		return iter(self.keys())
+
 class baseconv(object):
 
 	mn_base = 1626 # tirosh list is 1633 words long!
-	digits = {
-		'electrum': tuple(__import__('mmgen.mn_electrum',fromlist=['words']).words.split()),
-		'tirosh': tuple(__import__('mmgen.mn_tirosh',fromlist=['words']).words.split()[:mn_base]),
+	wl_modules = {
+		'electrum': 'mmgen.mn_electrum',
+		'tirosh':   'mmgen.mn_tirosh',
+	}
+	digits = baseconv_digits({
 		'b58': tuple('123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'),
 		'b32': tuple('ABCDEFGHIJKLMNOPQRSTUVWXYZ234567'),
 		'b16': tuple('0123456789abcdef'),
 		'b10': tuple('0123456789'),
 		'b8':  tuple('01234567'),
-	}
+	})
 	wl_chksums = {
 		'electrum': '5ca31424',
 		'tirosh':   '48f05e1f', # tirosh truncated to mn_base (1626)
 		# 'tirosh1633': '1a5faeff'
 	}
+	wl_checked = set()
+	conv_data = {}
 	b58pad_lens =     [(16,22), (24,33), (32,44)]
 	b58pad_lens_rev = [(v,k) for k,v in b58pad_lens]
 
@@ -299,9 +320,26 @@ class baseconv(object):
 	def get_wordlist_chksum(cls,wl_id):
 		return sha256(' '.join(cls.digits[wl_id])).hexdigest()[:8]
 
+	@classmethod
+	def load_wordlist(cls,wl_id):
+		wl = tuple(__import__(cls.wl_modules[wl_id],fromlist=['words']).words.split()[:cls.mn_base])
+		dict.__setitem__(cls.digits,wl_id,wl)
+		try: cls.check_wordlist_chksum(wl_id)
+		except:
+			dict.__delitem__(cls.digits,wl_id)
+			raise
+		return wl
+
+	@classmethod
+	def check_wordlist_chksum(cls,wl_id): # result is memoised
+		if wl_id not in cls.wl_checked:
+			assert cls.get_wordlist_chksum(wl_id) == cls.wl_chksums[wl_id],(
+				"Checksum mismatch for wordlist '{}'".format(wl_id))
+			cls.wl_checked.add(wl_id)
+
 	@classmethod
 	def check_wordlists(cls):
-		for k,v in cls.wl_chksums.items(): assert cls.get_wordlist_chksum(k) == v
+		for k in cls.wl_chksums: cls.check_wordlist_chksum(k)
 
 	@classmethod
 	def check_wordlist(cls,wl_id):
@@ -317,19 +355,40 @@ class baseconv(object):
 		Msg('List is sorted') if tuple(sorted(wl)) == wl else die(3,'ERROR: List is not sorted!')
 
 
+	@classmethod
+	def get_conv_data(cls,wl_id):
+		"""
+		Return cached (word->index dict, base, chunk size) for wordlist 'wl_id'.
+		Digits are converted 'chunk size' at a time, the largest number that
+		keeps each chunk within a machine int
+		"""
+		if wl_id not in cls.conv_data:
+			wl = cls.digits[wl_id]
+			base,csize = len(wl),1
+			while base**(csize+1) <= sys.maxint: csize += 1
+			cls.conv_data[wl_id] = (dict((w,i) for i,w in enumerate(wl)),base,csize)
+		return cls.conv_data[wl_id]
+
 	@classmethod
 	def tohex(cls,words_arg,wl_id,pad=None):
 
 		words = words_arg if type(words_arg) in (list,tuple) else tuple(words_arg.strip())
 
-		wl = cls.digits[wl_id]
-		base = len(wl)
+		idx,base,csize = cls.get_conv_data(wl_id)
 
-		if not set(words) <= set(wl):
+		try: digits = [idx[w] for w in words]
+		except (KeyError,TypeError):
 			die(2,'{} is not in {} (base{}) format'.format(repr(words_arg),wl_id,base))
 
-		deconv =  [wl.index(words[::-1][i])*(base**i) for i in range(len(words))]
-		ret = ('{:0{w}x}'.format(sum(deconv),w=pad or 0))
+		# pad to a whole number of chunks, then accumulate one chunk at a time
+		digits = [0] * (-len(digits) % csize) + digits
+		num,cbase = 0,base**csize
+		for i in range(0,len(digits),csize):
+			c = 0
+			for d in digits[i:i+csize]: c = c*base + d
+			num = num*cbase + c
+
+		ret = ('{:0{w}x}'.format(num,w=pad or 0))
 		return ('','0')[len(ret) % 2] + ret
 
 	@classmethod
@@ -340,16 +399,17 @@ class baseconv(object):
 			die(2,"'{}': not a hexadecimal number".format(hexnum))
 
 		wl = cls.digits[wl_id]
-		base = len(wl)
-		num,ret = int(hexnum,16),[]
+		idx,base,csize = cls.get_conv_data(wl_id)
+		num,ret,cbase = int(hexnum,16),[],base**csize
 		while num:
-			ret.append(num % base)
-			num /= base
+			num,c = divmod(num,cbase)
+			for i in range(csize):
+				c,d = divmod(c,base)
+				ret.append(d)
+		while ret and ret[-1] == 0: ret.pop() # strip leading zeroes of the top chunk
 		o = [wl[n] for n in [0] * ((pad or 0)-len(ret)) + ret[::-1]]
 		return ''.join(o) if tostr else o
 
-baseconv.check_wordlists()
-
 def match_ext(addr,ext):
 	return addr.split('.')[-1] == ext
 
@@ -551,6 +611,12 @@ def write_data_to_file( outfile,data,desc='data',
 	if not binary and type(data) == unicode:
 		data = data.encode('utf8')
 
+	def write_data(f): # 'data' may also be an iterator over chunks of data, written as generated
+		if isinstance(data,basestring):
+			return f.write(data)
+		for d in data:
+			f.write(d.encode('utf8') if not binary and type(d) == unicode else d)
+
 	def do_stdout():
 		qmsg('Output to STDOUT requested')
 		if sys.stdout.isatty():
@@ -578,7 +644,7 @@ def write_data_to_file( outfile,data,desc='data',
 			import msvcrt
 			msvcrt.setmode(sys.stdout.fileno(),os.O_BINARY)
 
-		sys.stdout.write(data)
+		write_data(sys.stdout)
 
 	def do_file(outfile,ask_write_prompt):
 		if opt.outdir and not ignore_opt_outdir and not os.path.isabs(outfile):
@@ -611,7 +677,7 @@ def write_data_to_file( outfile,data,desc='data',
 
 		f = open_file_or_exit(outfile,('w','wb')[bool(binary)])
 		try:
-			f.write(data)
+			write_data(f)
 		except:
 			die(2,u"Failed to write {} to file '{}'".format(desc,outfile))
 		f.close
@@ -667,6 +733,48 @@ def get_lines_from_file(fn,desc='',trim_comments=False,silent=False):
 	dmsg(u"Got {} lines from file '{}'".format(len(ret),fn))
 	return ret
 
+def mmgen_decrypt_file_maybe_iter(fn,desc='',silent=False,chunk_size=65536):
+	"""
+	Like mmgen_decrypt_file_maybe(), but return an iterator over the file's data,
+	which is read (and decrypted, if necessary) in chunks
+	"""
+	def read_chunks():
+		f = open_file_or_exit(fn,'rb',silent=silent)
+		for d in iter(lambda: f.read(chunk_size),''): yield d
+		f.close()
+	if not opt.quiet and not silent and desc:
+		qmsg(u"Getting {} from file '{}'".format(desc,fn))
+	have_enc_ext = get_extension(fn) == g.mmenc_ext
+	if not have_enc_ext:
+		from codecs import getincrementaldecoder
+		d = next(read_chunks(),'')
+		try: getincrementaldecoder('utf8')().decode(d)
+		except: pass
+		else: return read_chunks()
+	m = ('Attempting to decrypt','Decrypting')[have_enc_ext]
+	msg(u"{} {} '{}'".format(m,desc,fn))
+	from mmgen.crypto import mmgen_decrypt_stream_retry
+	return mmgen_decrypt_stream_retry(read_chunks,desc)
+
+def get_lines_from_file_iter(fn,desc='',trim_comments=False,silent=False):
+	"like get_lines_from_file(), but read the file in chunks and yield its lines one at a time"
+	def get_lines():
+		buf = ''
+		for d in mmgen_decrypt_file_maybe_iter(fn,desc,silent=silent):
+			lines = (buf + d).split('\n')
+			buf = lines.pop()
+			for l in lines: yield l
+		if buf: yield buf
+	n = 0
+	for l in get_lines():
+		l = l.decode('utf8').rstrip(u'\r') # DOS-safe
+		if trim_comments:
+			l = strip_comments(l)
+			if l == '': continue
+		n += 1
+		yield l
+	dmsg(u"Got {} lines from file '{}'".format(n,fn))
+
 def get_data_from_user(desc='data',silent=False): # user input MUST be UTF-8
 	p = ('',u'Enter {}: '.format(desc))[g.stdin_tty]
 	data = my_raw_input(p,echo=opt.echo_passphrase)
@@ -87,6 +87,11 @@ module1 = Extension(
 	include_dirs = ['/usr/local/include',r'c:\msys\local\include'],
 	)
 
+module2 = Extension(
+	name         = 'mmgen.addrenc',
+	sources      = ['extmod/addrencmod.c'],
+	)
+
 
 from mmgen.globalvars import g
 setup(
@@ -100,7 +105,7 @@ setup(
 		platforms    = 'Linux, MS Windows, Raspberry Pi/Raspbian, Orange Pi/Armbian',
 		keywords     = g.keywords,
 		cmdclass     = { 'build_ext': my_build_ext, 'install_data': my_install_data },
-		ext_modules  = [module1],
+		ext_modules  = [module1,module2],
 		data_files = [('share/mmgen', [
 				'data_files/mmgen.cfg',     # source files must have 0644 mode
 				'data_files/mn_wordlist.c',
@@ -112,6 +117,7 @@ setup(
 			'mmgen.altcoin',
 			'mmgen.bech32',
 			'mmgen.color',
+			'mmgen.coinsel',
 			'mmgen.common',
 			'mmgen.crypto',
 			'mmgen.ed25519',
@@ -133,6 +139,7 @@ setup(
 			'mmgen.tool',
 			'mmgen.tw',
 			'mmgen.tx',
+			'mmgen.txsigner',
 			'mmgen.util',
 
 			'mmgen.altcoins.__init__',
@@ -147,6 +154,7 @@ setup(
 			'mmgen.main_addrgen',
 			'mmgen.main_addrimport',
 			'mmgen.main_autosign',
+			'mmgen.main_consolidate',
 			'mmgen.main_passgen',
 			'mmgen.main_regtest',
 			'mmgen.main_split',
@@ -173,6 +181,7 @@ setup(
 			'cmds/mmgen-walletconv',
 			'cmds/mmgen-walletgen',
 			'cmds/mmgen-split',
+			'cmds/mmgen-consolidate',
 			'cmds/mmgen-txcreate',
 			'cmds/mmgen-txbump',
 			'cmds/mmgen-txsign',
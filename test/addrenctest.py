@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/addrenctest.py: test the compiled batch address encoder against the Python code
+"""
+
+import sys,os
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Test the compiled batch address encoder against the Python code',
+	'usage':'[options] [keys]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+Addresses are generated from 'keys' (default: 20) random public keys, both
+compressed and uncompressed, for each supported address format of every Bitcoin-
+derived coin, mainnet and testnet, including the generation-only altcoins.  The
+results of mmgen.addrenc.pubs2addrs() must be identical to those of the Python
+code used in its absence.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+import random,ecdsa
+from mmgen.protocol import CoinProtocol,init_genonly_altcoins
+
+try:
+	import mmgen.addrenc
+except ImportError:
+	die(2,'The addrenc extension module is not built')
+
+nkeys = int(cmd_args[0]) if cmd_args else 20
+random.seed(1)
+
+def make_pubkeys(n):
+	ret = { 'compressed':[], 'uncompressed':[] }
+	for i in range(n):
+		vk = ecdsa.SigningKey.from_secret_exponent(
+				random.randint(1,ecdsa.SECP256k1.order-1),ecdsa.SECP256k1).get_verifying_key()
+		xy = vk.to_string()
+		ret['uncompressed'].append('\x04' + xy)
+		ret['compressed'].append(chr(2 + (ord(xy[-1]) & 1)) + xy[:32])
+	return ret
+
+def py_addrs(proto,pubkeys,addr_fmt):
+	sys.modules['mmgen.addrenc'] = None # force the fallback
+	try:     return proto.pubkeys2addrs(pubkeys,addr_fmt)
+	finally: sys.modules['mmgen.addrenc'] = mmgen.addrenc
+
+def check(proto,pubkeys,addr_fmt,desc):
+	ret = proto.pubkeys2addrs(pubkeys,addr_fmt)
+	chk = py_addrs(proto,pubkeys,addr_fmt)
+	if ret != chk or len(ret) != len(pubkeys):
+		for n,(a,b) in enumerate(zip(ret,chk)):
+			if a != b: die(2,'{}: key #{}: addrenc: {}, Python: {}'.format(desc,n,a,b))
+		die(2,'{}: {} addresses returned, {} expected'.format(desc,len(ret),len(chk)))
+	vmsg('{}: {}'.format(desc,ret[0]))
+
+init_genonly_altcoins(None,trust_level=0)
+pubkeys = make_pubkeys(nkeys)
+skip = ('eth','etc','xmr')
+n = 0
+
+for coin in sorted(CoinProtocol.coins):
+	if coin in skip: continue
+	for proto in CoinProtocol.coins[coin][:2]:
+		if not proto: continue
+		net = ('mainnet','testnet')[proto.__name__.endswith('TestnetProtocol')]
+		fmts = [('p2pkh','compressed'),('p2pkh','uncompressed')]
+		if 'S' in proto.mmtypes: fmts.append(('segwit','compressed'))
+		if 'B' in proto.mmtypes: fmts.append(('bech32','compressed'))
+		for addr_fmt,key_type in fmts:
+			desc = '{} {} {} ({})'.format(coin.upper(),net,addr_fmt,key_type)
+			check(proto,pubkeys[key_type],addr_fmt,desc)
+			check(proto,pubkeys[key_type][:1],addr_fmt,desc+' N=1')
+			n += 1
+
+msg('{} coin/network/format combinations: {}'.format(n,green('OK')))
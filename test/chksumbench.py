@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/chksumbench.py: compare the cost of the address list checksum and ID string
+computations with that of the old whole-list method
+"""
+
+import sys,os,time,resource
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+os.environ['MMGEN_TEST_SUITE'] = '1'
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Benchmark the address list checksum and ID string computations',
+	'usage':'[options]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-n, --num-entries=n Use an address list of 'n' entries (default: 1000000)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+The address list is built from dummy addresses, which are not validated.
+Each computation runs in a child process, whose peak memory usage above that
+of the parent is reported.  For the new method, the cost of feeding entries
+to the accumulator is shown separately, as it's incurred while the entries
+are being generated or parsed rather than in an extra pass over the list.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+from mmgen.addr import *
+from hashlib import sha256
+
+n = int(opt.num_entries or 1000000)
+if n < 1: die(1,'--num-entries must be a positive integer')
+
+def old_chksum(al):
+	ea = al.al_id.mmtype.extra_attrs
+	lines = [' '.join(
+				al.chksum_rec_f(e) +
+				tuple(getattr(e,a) for a in ea if getattr(e,a))
+			) for e in al.data]
+	return make_chksum_N(' '.join(lines),nchars=16,sep=True)
+
+def old_id_str(al):
+	idxs = [e.idx for e in al.data]
+	prev = idxs[0]
+	ret = prev,
+	for i in idxs[1:]:
+		if i == prev + 1:
+			if i == idxs[-1]: ret += '-', i
+		else:
+			if prev != ret[-1]: ret += '-', prev
+			ret += ',', i
+		prev = i
+	return ''.join(map(unicode,ret))
+
+def feed(al):
+	acc = AddrListAccumulator(al)
+	for e in al.data: acc.add(e)
+	al.acc = acc
+	return acc.chksum(),acc.idx_str()
+
+def run(desc,func,al):
+	maxrss = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	r,w = os.pipe()
+	pid = os.fork()
+	if pid == 0:
+		os.close(r)
+		m,start = maxrss(),time.time()
+		ret = func(al)
+		os.write(w,repr((time.time()-start,maxrss()-m,ret)))
+		os._exit(0)
+	os.close(w)
+	t,mem,ret = eval(os.fdopen(r).read())
+	os.waitpid(pid,0)
+	msg(u'  {:22} {:7.3f}s  {:8.1f} MB  {}'.format(desc,t,mem/1024.0,ret))
+	return ret
+
+qmsg_r('Building address list of {} entries...'.format(n))
+al_id = AddrListID(SeedID(sid='FFFFFFFF'),MMGenAddrType('L'))
+data = AddrListColumns(AddrListEntry)
+for i in xrange(1,n+1):
+	data.add_row(idx=AddrIdx(i if i < n / 2 else i+1),addr='1'+sha256(str(i)).hexdigest()[:33])
+al = AddrList(al_id=al_id,adata=data)
+qmsg('done')
+
+msg('Computed when the list is created, from the complete list (old method):')
+old = run('checksum',old_chksum,al),run('ID string',old_id_str,al)
+
+msg('Accumulated from each entry as the list is generated or parsed:')
+new = run('checksum + ID string',feed,al)
+feed(al)
+msg('Computed when the list is created, from the accumulated data:')
+new_init = run('checksum',AddrListChksum,al),run('ID string',AddrListIDStr,al)
+
+if not old == new == (new_init[0],new_init[1].split('[')[1][:-1]):
+	die(2,'Checksum or ID string mismatch!')
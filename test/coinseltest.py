@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/coinseltest.py: test the automatic input selection methods
+"""
+
+import sys,os
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Test the automatic input selection methods',
+	'usage':'[options] [rounds]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+The branch and bound search is checked against a brute-force search of all
+subsets of 'rounds' (default: 500) random sets of up to 12 outputs.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+import random
+from itertools import combinations
+from mmgen.coinsel import *
+
+rounds = int(cmd_args[0]) if cmd_args else 500
+random.seed(1)
+
+def test(desc,cond):
+	msg_r('{:<38}'.format(desc+':'))
+	if not cond: die(2,'Test failed')
+	msg(green('OK'))
+
+def brute_force(ev,target,cost_of_change):
+	"Return the least excess over 'target' of any subset within range, or None"
+	best = None
+	for n in range(1,len(ev)+1):
+		for c in combinations(ev,n):
+			s = sum(c)
+			if target <= s <= target + cost_of_change and (best == None or s - target < best):
+				best = s - target
+	return best
+
+def test_bnb():
+	found = 0
+	for i in range(rounds):
+		n = random.randint(1,12)
+		# small value ranges produce many duplicate values, exercising the duplicate skip
+		vmax = random.choice((10,1000,10**6))
+		ev = [random.randint(1,vmax) for j in range(n)]
+		target = random.randint(1,sum(ev) + vmax // 10)
+		coc = random.randint(0,vmax // 10)
+		ret = select_bnb(ev,target,coc)
+		bf = brute_force(ev,target,coc)
+		if (ret == None) != (bf == None):
+			die(2,'select_bnb{}: {}, brute force: {}'.format((ev,target,coc),ret,bf))
+		if ret != None:
+			found += 1
+			if len(set(ret)) != len(ret) or sum(ev[j] for j in ret) - target != bf:
+				die(2,'select_bnb{}: {} (excess {}), brute force excess: {}'.format(
+					(ev,target,coc),ret,sum(ev[j] for j in ret) - target,bf))
+	vmsg('{} of {} sets had a changeless solution'.format(found,rounds))
+	test('select_bnb() vs. brute force',found)
+	test('select_bnb() exact match',sorted(select_bnb([5,3,8,2],10,0)) == [2,3]) # 8+2 is found before 5+3+2
+	test('select_bnb() insufficient funds',select_bnb([5,3],9,100) == None)
+	test('select_bnb() max_tries',select_bnb(range(1,30),sum(range(1,30))-1,0,max_tries=10) == None)
+
+def test_select_coins():
+	ev = [50,-10,300,120,0,1000]
+	# bnb: 300+120 lies within [400,430]
+	ret,cl = select_coins('bnb',ev,400,450,30)
+	test('bnb (changeless)',cl and sorted(ret) == [2,3])
+	# no changeless set: fall back to the smallest single output covering target_chg
+	ret,cl = select_coins('bnb',ev,500,550,0)
+	test('bnb (fallback: single output)',not cl and ret == [5])
+	ret,cl = select_coins('bnb',ev,1200,1250,0)
+	test('bnb (fallback: largest first)',not cl and ret == [5,2])
+	ret,cl = select_coins('bnb',ev,2000,2050,0)
+	test('bnb (insufficient funds)',ret == None)
+	ret,cl = select_coins('largest',ev,400,450,30)
+	test('largest',not cl and ret == [5])
+	ret,cl = select_coins('oldest',ev,400,450,30,confs=[9,9,1,5,9,0])
+	test('oldest',not cl and ret == [0,3,2])
+	test('unspendable outputs never selected',
+		select_coins('largest',ev,1470,1470,0)[0] == [5,2,3,0] and
+		select_coins('largest',ev,1471,1471,0)[0] == None)
+
+def test_privacy():
+	ev    = [100,-5,40,300,60,500]
+	addrs = ['A','A','B','C','C','D']
+	# smallest address covering the target, all of its outputs, whatever their value
+	ret,cl = select_coins('privacy',ev,90,90,0,addrs=addrs)
+	test('privacy (one address)',not cl and ret == [0,1])
+	ret,cl = select_coins('privacy',ev,360,360,0,addrs=addrs)
+	test('privacy (covering address)',ret == [3,4])
+	ret,cl = select_coins('privacy',ev,900,900,0,addrs=addrs)
+	test('privacy (largest addresses first)',ret == [5,3,4,0,1])
+	test('privacy (insufficient funds)',select_coins('privacy',ev,1000,1000,0,addrs=addrs)[0] == None)
+
+def test_consolidation():
+	ev      = [10,-1,30,20,40,50]
+	weights = [3,3,3,3,3,3]
+	ret = plan_consolidation(ev,weights,6,0)
+	test('consolidation batches',ret == [[0,3],[2,4],[5]])
+	test('consolidation (small batch dropped)',plan_consolidation(ev,weights,6,51) == [[2,4]])
+	test('consolidation (single batch)',plan_consolidation(ev,weights,100,0) == [[0,3,2,4,5]])
+
+test_bnb()
+test_select_coins()
+test_privacy()
+test_consolidation()
@@ -26,7 +26,7 @@ os.chdir(os.path.join(pn,os.pardir))
 sys.path.__setitem__(0,os.path.abspath(os.curdir))
 os.environ['MMGEN_TEST_SUITE'] = '1'
 
-from binascii import hexlify
+from binascii import hexlify,unhexlify
 
 # Import these _after_ local path's been added to sys.path
 from mmgen.common import *
@@ -47,6 +47,8 @@ opts_data = lambda: {
 	'notes': """
     Tests:
        A/B:     {prog} a:b [rounds]  (compare output of two key generators)
+                (if a or b is '2', the secp256k1 library's batch pubkey
+                generation is also checked against its per-key generation)
        Speed:   {prog} a [rounds]    (test speed of one key generator)
        Compare: {prog} a <dump file> (compare output of a key generator against wallet dump)
           where a and b are one of:
@@ -197,6 +199,33 @@ def compare_test():
 	qmsg_r('\rRound {}/{} '.format(i+1,rounds))
 	qmsg(green(('\n','')[bool(opt.verbose)] + 'OK'))
 
+def batch_test():
+	"Compare output of the secp256k1 library's batch and per-key pubkey generation"
+	from mmgen.secp256k1 import priv2pub,priv2pub_batch
+	qmsg(green('Comparing batch and per-key pubkey generation of secp256k1 library'))
+	order = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+	n2b = lambda n: unhexlify('{:064x}'.format(n))
+	keys = [os.urandom(32) for i in range(rounds)] + [n2b(1),n2b(order-1)]
+	def check(desc,cond):
+		vmsg_r('  {:<42}'.format(desc+':'))
+		if not cond: die(3,red('\n{}: batch and per-key output differ'.format(desc)))
+		vmsg('OK')
+	def raises(exc,*args):
+		try: priv2pub_batch(*args)
+		except exc: return True
+		return False
+	for compressed in (1,0):
+		ct = ('uncompressed','compressed')[compressed]
+		check('{} keys ({})'.format(len(keys),ct),
+			priv2pub_batch(''.join(keys),compressed) == ''.join(priv2pub(k,compressed) for k in keys))
+		check('1 key ({})'.format(ct),priv2pub_batch(keys[0],compressed) == priv2pub(keys[0],compressed))
+		check('0 keys ({})'.format(ct),priv2pub_batch('',compressed) == '')
+		for desc,k in (('zero',n2b(0)),('curve order',n2b(order)),('> curve order','\xff'*32)):
+			check('invalid key: {} ({})'.format(desc,ct),
+				raises(RuntimeError,k,compressed) and raises(RuntimeError,keys[0]+k,compressed))
+	check('data length not multiple of 32',raises(ValueError,''.join(keys)[:-1],1))
+	qmsg(green('OK'))
+
 def speed_test():
 	m = "Testing speed of address generator '{}' for coin {}"
 	qmsg(green(m.format(kg_a.desc,g.coin)))
@@ -299,6 +328,8 @@ if a and b:
 			kg_b = KeyGenerator(addr_type,b)
 			b_desc = kg_b.desc
 		compare_test()
+		if 2 in (a,b) and addr_type.pubkey_type == 'std':
+			batch_test()
 elif a and not fh:
 	speed_test()
 elif a and dump:
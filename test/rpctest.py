@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/rpctest.py: test the RPC connection pool against a local fake JSON-RPC server
+"""
+
+import sys,os
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Test the RPC connection pool against a local fake JSON-RPC server',
+	'usage':'[options]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+The server answers over HTTP/1.1 keep-alive connections and can be told to close
+or reset a connection after reading the next request on it, as a daemon does
+when an idle connection times out while a request is in flight.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+import socket,struct,threading,json
+from mmgen.rpc import CoinDaemonRPCConnection
+
+class FakeServer(object):
+
+	def __init__(self):
+		self.ls = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
+		self.ls.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
+		self.ls.bind(('127.0.0.1',0))
+		self.ls.listen(5)
+		self.port = self.ls.getsockname()[1]
+		self.conns = []     # accepted connections, in order
+		self.drop = None    # None, 'close' or 'reset': what to do with the next request
+		self.lock = threading.Lock()
+		t = threading.Thread(target=self.accept)
+		t.daemon = True
+		t.start()
+
+	def accept(self):
+		while True:
+			s,addr = self.ls.accept()
+			with self.lock: self.conns.append(s)
+			t = threading.Thread(target=self.serve,args=(s,))
+			t.daemon = True
+			t.start()
+
+	def read_request(self,f):
+		clen = None
+		while True:
+			l = f.readline()
+			if not l: return None
+			if l in ('\r\n','\n'): break
+			if l.lower().startswith('content-length:'): clen = int(l.split(':')[1])
+		return json.loads(f.read(clen))
+
+	def serve(self,s):
+		f = s.makefile('rb')
+		while True:
+			req = self.read_request(f)
+			if req == None: break
+			with self.lock: drop,self.drop = self.drop,None
+			if drop:
+				if drop == 'reset': # RST in place of FIN
+					s.setsockopt(socket.SOL_SOCKET,socket.SO_LINGER,struct.pack('ii',1,0))
+				break
+			body = json.dumps({'result':[req['method'],req['params']],'error':None,'id':req['id']})
+			s.sendall('HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n' +
+						'Content-Length: {}\r\n\r\n{}'.format(len(body),body))
+		f.close()
+		s.close()
+
+def test(desc,cond):
+	msg_r('{:<38}'.format(desc+':'))
+	if not cond: die(2,'Test failed')
+	msg(green('OK'))
+
+srv = FakeServer()
+c = CoinDaemonRPCConnection('127.0.0.1',srv.port,'user','passwd')
+
+test('call',c.request('getblockcount') == ['getblockcount',[]])
+test('pooled connection reused',c.request('echo',1) == ['echo',[1]] and len(srv.conns) == 1)
+
+for drop in ('close','reset'):
+	n = len(srv.conns)
+	srv.drop = drop
+	test('pooled conn. {}: call succeeds'.format(drop),c.request('echo',drop) == ['echo',[drop]])
+	test('pooled conn. {}: reconnected'.format(drop),len(srv.conns) == n + 1)
+	test('new connection pooled',c.request('echo',2) == ['echo',[2]] and len(srv.conns) == n + 1)
+
+# a reset on a new connection is reported, not retried
+c.close()
+n = len(srv.conns)
+srv.drop = 'reset'
+ret = c.request('echo',3,on_fail='return')
+test('new connection reset: not retried',ret[0] == 'rpcfail' and len(srv.conns) == n + 1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/startuptime.py: measure the startup cost of the MMGen commands in cmds/
+"""
+
+import sys,os,subprocess
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+os.environ['MMGEN_TEST_SUITE'] = '1'
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Measure the startup cost (imports and option processing) of MMGen commands',
+	'usage':'[options] [command ...]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-r, --repeat=     n Run each command 'n' times and report the best and mean
+                    times (default: 5)
+-s, --system        Test scripts and modules installed on system rather than
+                    those in the repo root
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+Each command is run with '--help', which exits after all program modules
+have been imported and the command line parsed, i.e. just before the main
+program body runs.  Times are wall-clock, and the cost of starting a bare
+Python interpreter is shown separately and subtracted.
+
+If no command is given, all commands in 'cmds/' are measured.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+if not opt.system:
+	os.environ['PYTHONPATH'] = repo_root
+
+repeat = int(opt.repeat or 5)
+if repeat < 1: die(1,'--repeat must be a positive integer')
+
+cmds = sorted(f for f in os.listdir('cmds') if f.startswith('mmgen-'))
+for c in cmd_args:
+	if 'mmgen-'+c not in cmds and c not in cmds:
+		die(1,"'{}': unrecognized command".format(c))
+if cmd_args:
+	cmds = [c if c in cmds else 'mmgen-'+c for c in cmd_args]
+
+def time_cmd(args):
+	ret = []
+	for i in range(repeat):
+		start = time.time()
+		p = subprocess.Popen(args,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+		p.communicate()
+		ret.append(time.time() - start)
+		if p.returncode != 0:
+			die(2,'{!r}: command returned exit status {}'.format(' '.join(args),p.returncode))
+	return min(ret),sum(ret) / len(ret)
+
+base_best,base_mean = time_cmd([sys.executable,'-c','pass'])
+msg('{:20} best {:6.3f}s  mean {:6.3f}s'.format('(python interpreter)',base_best,base_mean))
+
+for c in cmds:
+	args = [sys.executable,os.path.join('cmds',c),'--help']
+	vmsg(green('Executing: {}'.format(' '.join(args))))
+	best,mean = time_cmd(args)
+	msg('{:20} best {:6.3f}s  mean {:6.3f}s  (+{:.3f}s)'.format(c,best,mean,best-base_best))
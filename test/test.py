@@ -742,6 +742,10 @@ cmd_group['main'] = OrderedDict([
 	['txsign_keyaddr',(1,'transaction signing with key-address file', [[['akeys.mmenc','rawtx'],1]])],
 
 	['txcreate_ni',   (1,'transaction creation (non-interactive)',     [[['addrs'],1]])],
+	['txcreate_select_bnb',     (1,'transaction creation (automatic input selection: bnb)',     [[['addrs'],1]])],
+	['txcreate_select_largest', (1,'transaction creation (automatic input selection: largest)', [[['addrs'],1]])],
+	['txcreate_select_oldest',  (1,'transaction creation (automatic input selection: oldest)',  [[['addrs'],1]])],
+	['txcreate_select_privacy', (1,'transaction creation (automatic input selection: privacy)', [[['addrs'],1]])],
 
 	['walletgen2',(2,'wallet generation (2), 128-bit seed',     [[['del_dw_run'],15]])],
 	['addrgen2',  (2,'address generation (2)',    [[['mmdat'],2]])],
@@ -766,12 +770,12 @@ cmd_group['main'] = OrderedDict([
 
 	['walletgen5',(20,'wallet generation (5)',                   [[['del_dw_run'],15]],20)],
 	['addrgen5',  (20,'address generation (5)',                  [[['mmdat'],20]])],
-	['txcreate5', (20,'transaction creation with bad vsize (5)', [[['addrs'],20]])],
+	['txcreate5', (20,'transaction creation (5)',                [[['addrs'],20]])],
 	['txsign5',   (20,'transaction signing with bad vsize',      [[['mmdat','rawtx'],20]])],
 	['walletgen6',(21,'wallet generation (6)',                   [[['del_dw_run'],15]],21)],
 	['addrgen6',  (21,'address generation (6)',                  [[['mmdat'],21]])],
-	['txcreate6', (21,'transaction creation with corrected vsize (6)', [[['addrs'],21]])],
-	['txsign6',   (21,'transaction signing with corrected vsize',      [[['mmdat','rawtx'],21]])],
+	['txcreate6', (21,'transaction creation (6)',                [[['addrs'],21]])],
+	['txsign6',   (21,'transaction signing with uncompressed non-MMGen input', [[['mmdat','rawtx'],21]])],
 ])
 
 cmd_group['tool'] = OrderedDict([
@@ -897,6 +901,8 @@ cmd_group['regtest'] = (
 	('regtest_bob_bal6',           "Bob's balance"),
 	('regtest_bob_alice_bal',      "Bob and Alice's balances"),
 	('regtest_alice_bal2',         "Alice's balance"),
+	('regtest_bob_consolidate',    "consolidating Bob's unspent outputs"),
+	('regtest_bob_consolidate_sign',"signing Bob's consolidation transactions in one batch"),
 	('regtest_stop',               'stopping regtest daemon'),
 )
 
@@ -1953,7 +1959,8 @@ class MMGenTestSuite(object):
 						view='n',
 						addrs_per_wallet=addrs_per_wallet,
 						non_mmgen_input_compressed=True,
-						cmdline_inputs=False):
+						cmdline_inputs=False,
+						select=None):
 
 		if opt.verbose or opt.exact_output:
 			sys.stderr.write(green('Generating fake tracking wallet info\n'))
@@ -1970,6 +1977,8 @@ class MMGenTestSuite(object):
 				TwLabel(dfake[2][lbl_id]).mmid,dfake[3]['address'],
 				TwLabel(dfake[4][lbl_id]).mmid,dfake[5]['address']
 				),'--outdir='+trash_dir] + cmd_args[1:]
+		if select:
+			cmd_args = ['--select='+select,'--outdir='+trash_dir] + cmd_args[1:]
 		end_silence()
 
 		if opt.verbose or opt.exact_output: sys.stderr.write('\n')
@@ -1979,7 +1988,8 @@ class MMGenTestSuite(object):
 			([],['--rbf'])[g.proto.cap('rbf')] +
 			['-f',tx_fee,'-B'] + add_args + cmd_args + txdo_args)
 
-		if cmdline_inputs:
+		if cmdline_inputs or select:
+			if select: t.expect('Selected output')
 			t.written_to_file('Transaction')
 			t.ok()
 			return
@@ -2023,6 +2033,14 @@ class MMGenTestSuite(object):
 	def txcreate_ni(self,name,addrfile):
 		self.txcreate_common(name,sources=['1'],cmdline_inputs=True,add_args=['--yes'])
 
+	def txcreate_select(self,name,addrfile,method):
+		self.txcreate_common(name,sources=['1'],select=method,add_args=['--yes'])
+
+	def txcreate_select_bnb(self,name,addrfile):     self.txcreate_select(name,addrfile,'bnb')
+	def txcreate_select_largest(self,name,addrfile): self.txcreate_select(name,addrfile,'largest')
+	def txcreate_select_oldest(self,name,addrfile):  self.txcreate_select(name,addrfile,'oldest')
+	def txcreate_select_privacy(self,name,addrfile): self.txcreate_select(name,addrfile,'privacy')
+
 	def txbump(self,name,txfile,prepend_args=[],seed_args=[]):
 		if not g.proto.cap('rbf'):
 			msg('Skipping RBF'); return True
@@ -2340,14 +2358,14 @@ class MMGenTestSuite(object):
 	def txcreate5(self,name,addrfile):
 		self.txcreate_common(name,sources=['20'],non_mmgen_input='20',non_mmgen_input_compressed=False)
 
-	def txsign5(self,name,txf,wf,bad_vsize=True,add_args=[]):
+	def txsign5(self,name,txf,wf,bad_vsize=True,add_args=['--vsize-adj=0.9']):
 		non_mm_fn = os.path.join(cfg['tmpdir'],non_mmgen_fn)
 		t = MMGenExpect(name,'mmgen-txsign', add_args + ['-d',cfg['tmpdir'],'-k',non_mm_fn,txf,wf])
 		t.license()
 		t.view_tx('n')
 		t.passphrase('MMGen wallet',cfgs['20']['wpasswd'])
 		if bad_vsize:
-			t.expect('Estimated transaction vsize')
+			t.expect('True transaction vsize')
 			t.expect('1 transaction could not be signed')
 			exit_val = 2
 		else:
@@ -2365,10 +2383,10 @@ class MMGenTestSuite(object):
 
 	def txcreate6(self,name,addrfile):
 		self.txcreate_common(
-			name,sources=['21'],non_mmgen_input='21',non_mmgen_input_compressed=False,add_args=['--vsize-adj=1.08'])
+			name,sources=['21'],non_mmgen_input='21',non_mmgen_input_compressed=False)
 
 	def txsign6(self,name,txf,wf):
-		return self.txsign5(name,txf,wf,bad_vsize=False,add_args=['--vsize-adj=1.08'])
+		return self.txsign5(name,txf,wf,bad_vsize=False,add_args=[])
 
 
 	def tool_encrypt(self,name,infile=''):
@@ -3203,6 +3221,39 @@ class MMGenTestSuite(object):
 		t.expect(r'\[q\]uit view, .*?:.','q',regex=True)
 		t.ok()
 
+	def regtest_consolidate_dir(self):
+		return os.path.join(cfg['tmpdir'],u'consolidate')
+
+	def regtest_bob_consolidate(self,name):
+		d = self.regtest_consolidate_dir()
+		try: shutil.rmtree(d)
+		except: pass
+		os.mkdir(d)
+		# a small max vsize, so that more than one transaction is created
+		t = MMGenExpect(name,'mmgen-consolidate',
+			['--bob','--yes','--outdir='+d,'--tx-fee=20s','--max-vsize=500',self.regtest_user_sid('bob')+':C:5'])
+		t.expect(r'(\d+) transactions? spending',regex=True)
+		ntxs = int(t.p.match.group(1))
+		for i in range(ntxs):
+			t.written_to_file('Consolidation transaction')
+		t.read()
+		if len(os.listdir(d)) != ntxs:
+			rdie(2,'{} transaction files written, {} expected'.format(len(os.listdir(d)),ntxs))
+		t.ok()
+
+	def regtest_bob_consolidate_sign(self,name):
+		d = self.regtest_consolidate_dir()
+		txfiles = sorted(os.path.join(d,f) for f in os.listdir(d) if f.endswith('.rawtx'))
+		wf = get_file_with_ext('mmdat',self.regtest_user_dir('bob'))
+		t = MMGenExpect(name,'mmgen-txsign',['--bob','--yes','-d',d] + txfiles + [wf])
+		t.passphrase('MMGen wallet',rt_pw)
+		for n in range(1,len(txfiles)+1):
+			t.written_to_file('Signed transaction' + (' #{}'.format(n),'')[len(txfiles) == 1])
+		t.read()
+		if len([f for f in os.listdir(d) if f.endswith('.sigtx')]) != len(txfiles):
+			rdie(2,'Not all consolidation transactions were signed')
+		t.ok()
+
 	def regtest_stop(self,name):
 		if opt.no_daemon_stop:
 			MMGenExpect(name,'',msg_only=True)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/twcachetest.py: tracking wallet cache update and invalidation tests
+"""
+
+import sys,os,struct,shutil,tempfile
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+os.environ['MMGEN_TEST_SUITE'] = '1'
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Test the updating and invalidation of the tracking wallet cache',
+	'usage':'[options]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+The tests run against a simulated coin daemon, which keeps a chain of blocks,
+a mempool and the wallet's address labels, and answers the RPC calls made by
+the cache.  After each change, the cache's unspent outputs and label data are
+checked against those reported by the daemon, and the test checks whether a
+full refresh was performed.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+from hashlib import sha256
+from decimal import Decimal
+from binascii import hexlify,unhexlify
+from mmgen.tw import TwCache,TrackingWallet,TwAddrList
+from mmgen.obj import MMGenID,TwLabel
+
+def dsha256(s): return sha256(sha256(s).digest()).digest()
+
+class FakeDaemon(object):
+
+	caps = ('label_api',)
+
+	def __init__(self):
+		self.chain = [self.new_block_hash()]
+		self.txs = []    # dicts with keys 'txid','hex','ins','outs','block'
+		self.labels = {} # addr -> label
+		self.calls = []
+
+	def new_block_hash(self):
+		self.nblocks = getattr(self,'nblocks',0) + 1
+		return sha256('block {}'.format(self.nblocks)).hexdigest()
+
+	def add_tx(self,ins,outs): # ins: (txid,vout) pairs; outs: (addr,amt) pairs
+		ser_outs = [(addr,amt,'76a914{}88ac'.format(sha256(addr).hexdigest()[:40])) for addr,amt in outs]
+		raw = ( struct.pack('<I',1) +
+				chr(len(ins)) + ''.join(unhexlify(t)[::-1] + struct.pack('<I',v) + '\x00' + '\xff'*4 for t,v in ins) +
+				chr(len(outs)) + ''.join(struct.pack('<Q',int(amt*10**8)) + '\x19' + unhexlify(spk)
+											for addr,amt,spk in ser_outs) +
+				'\x00'*4 )
+		tx = {  'txid': hexlify(dsha256(raw)[::-1]), 'hex': hexlify(raw),
+				'ins': ins, 'outs': ser_outs, 'block': None }
+		self.txs.append(tx)
+		return tx['txid']
+
+	def mine(self):
+		h = self.new_block_hash()
+		self.chain.append(h)
+		for tx in self.txs:
+			if tx['block'] == None: tx['block'] = h
+
+	def reorg(self): # replace the tip block, returning its transactions to the mempool
+		old = self.chain.pop()
+		for tx in self.txs:
+			if tx['block'] == old: tx['block'] = None
+		self.chain.append(self.new_block_hash())
+
+	def drop(self,txid): # an unconfirmed transaction leaves the mempool
+		self.txs = [tx for tx in self.txs if tx['txid'] != txid]
+
+	def height(self,tx):
+		return self.chain.index(tx['block']) if tx['block'] else None
+
+	def confs(self,tx):
+		h = self.height(tx)
+		return len(self.chain) - h if h != None else 0
+
+	def spent(self):
+		return set(i for tx in self.txs for i in tx['ins'])
+
+	def wallet_outs(self,tx):
+		return [(n,o) for n,o in enumerate(tx['outs']) if o[0] in self.labels]
+
+	# RPC calls:
+
+	def listlabels(self):
+		self.calls.append('listlabels')
+		return sorted(set(self.labels.values()))
+
+	def getaddressesbylabel(self,args,batch=False):
+		self.calls.append('getaddressesbylabel')
+		return [dict((a,{'purpose':'receive'}) for a,l in self.labels.items() if l == arg[0]) for arg in args]
+
+	def getblockchaininfo(self):
+		self.calls.append('getblockchaininfo')
+		return { 'bestblockhash': self.chain[-1], 'blocks': len(self.chain) - 1 }
+
+	def listunspent(self,minconf,stream=False):
+		self.calls.append('listunspent')
+		spent = self.spent()
+		ret = [{'txid': tx['txid'],
+				'vout': n,
+				'address': o[0],
+				'label': self.labels[o[0]],
+				'scriptPubKey': o[2],
+				'amount': o[1],
+				'confirmations': self.confs(tx),
+				'spendable': False,
+				'solvable': False } for tx in self.txs for n,o in self.wallet_outs(tx)
+					if (tx['txid'],n) not in spent and self.confs(tx) >= minconf]
+		return iter(ret) if stream else ret
+
+	def listsinceblock(self,blockhash,target_confs,watchonly,on_fail='raise'):
+		self.calls.append('listsinceblock')
+		ret = { 'transactions': [], 'removed': [], 'lastblock': self.chain[-1] }
+		if blockhash not in self.chain:
+			ret['removed'] = [{'txid':'00'*32}]
+			return ret
+		since = self.chain.index(blockhash)
+		wallet_outpoints = set((tx['txid'],n) for tx in self.txs for n,o in self.wallet_outs(tx))
+		for tx in self.txs:
+			h = self.height(tx)
+			if h != None and h <= since: continue
+			e = { 'txid': tx['txid'], 'confirmations': self.confs(tx), 'involvesWatchonly': True }
+			if [i for i in tx['ins'] if i in wallet_outpoints]:
+				ret['transactions'].append(dict(e,category='send',vout=0,amount=-tx['outs'][0][1]))
+			for n,o in self.wallet_outs(tx):
+				ret['transactions'].append(dict(e,category='receive',vout=n,address=o[0],amount=o[1]))
+		return ret
+
+	def gettransaction(self,args,batch=False):
+		self.calls.append('gettransaction')
+		txs = dict((tx['txid'],tx) for tx in self.txs)
+		return [{'hex': txs[a[0]]['hex']} for a in args]
+
+	def importaddress(self,addr,label,rescan,timeout=None):
+		self.labels[addr] = label
+
+	def setlabel(self,addr,label,on_fail='raise'):
+		self.labels[addr] = label
+
+d = g.rpch = FakeDaemon()
+g.tw_cache = True
+g.chain = 'regtest'
+g.data_dir = tempfile.mkdtemp()
+
+def check(desc,full,new_run=True):
+	msg_r('{:<38}'.format(desc+':'))
+	if new_run: TwCache.instance = None
+	d.calls = []
+	tc = TwCache.get()
+	calls = list(d.calls)
+	key = lambda e: (e['txid'],e['vout'])
+	if sorted(tc.listunspent(0),key=key) != sorted(d.listunspent(0),key=key):
+		die(2,'Unspent outputs differ from those reported by daemon')
+	if tc.label_data() != (d.listlabels(),[a.keys() for a in d.getaddressesbylabel([[l] for l in d.listlabels()])]):
+		die(2,'Label data differs from that reported by daemon')
+	if full != ('listunspent' in calls):
+		die(2,'Full refresh {}expected'.format(('not ','')[full]))
+	if not new_run and calls:
+		die(2,'Memoized cache queried the daemon: {}'.format(calls))
+	msg(green('OK'))
+
+try:
+	fund = sha256('funding').hexdigest()
+	for i in range(4): d.labels['addr{}'.format(i)] = 'FFFFFFFF:L:{}'.format(i+1)
+	t1 = d.add_tx([(fund,0)],[('addr0',Decimal('1.5')),('addr1',Decimal('2.5')),('other',Decimal('1'))])
+	d.mine()
+	d.add_tx([(fund,1)],[('addr2',Decimal('0.3'))])
+	check('initial',full=True)
+	check('same run (memoized)',full=False,new_run=False)
+	check('no change',full=False)
+	t3 = d.add_tx([(fund,2)],[('addr3',Decimal('4'))])
+	check('new unconfirmed tx',full=False)
+	d.mine()
+	check('transactions confirmed',full=False)
+	d.add_tx([(t1,0)],[('other',Decimal('1')),('addr0',Decimal('0.4999'))])
+	check('spend with change',full=False)
+	d.mine(); d.mine()
+	check('two new blocks',full=False)
+	t5 = d.add_tx([(t3,0)],[('addr1',Decimal('3.9'))])
+	check('unconfirmed spend',full=False)
+	d.drop(t5)
+	check('tx left mempool',full=True)
+	d.add_tx([(fund,3)],[('addr2',Decimal('0.7'))])
+	d.mine()
+	check('new block',full=False)
+	d.reorg()
+	check('reorg',full=True)
+	TrackingWallet(mode='w').import_address('addr4','FFFFFFFF:L:5',False)
+	d.add_tx([(fund,4)],[('addr4',Decimal('0.1'))])
+	check('address imported',full=True)
+	TrackingWallet(mode='w').set_label('addr4','FFFFFFFF:L:5 new label')
+	check('label set',full=True)
+
+	# per-listing data must be kept out of the shared TwLabel and MMGenID instances
+	msg_r('{:<38}'.format('independent address listings:'))
+	mmids = [MMGenID('FFFFFFFF:L:{}'.format(i)) for i in (11,12)]
+	for n,mmid in enumerate(mmids):
+		addr = g.proto.pubhash2addr(sha256(mmid).hexdigest()[:40],False)
+		d.labels[addr] = mmid
+		d.add_tx([(fund,10+n)],[(addr,Decimal('0.5'))])
+	d.mine()
+	d.add_tx([(fund,12)],[(addr,Decimal('0.1'))]) # an unconfirmed output to the second address
+	TwCache.instance = None
+	al1 = TwAddrList(mmids,0,True,True,False)
+	c1,f1 = [al1[m]['confs'] for m in mmids],al1.format(True,'age',True,False)
+	al2 = TwAddrList(mmids,1,True,True,False)
+	if [al1[m]['confs'] for m in mmids] != c1 or al1.format(True,'age',True,False) != f1:
+		die(2,'Address listing changed by another listing')
+	if [al2[m]['confs'] for m in mmids] != [1,1]:
+		die(2,'Incorrect confirmations in address listing')
+	try: TwLabel(mmids[0]).mmid.confs = 1
+	except AttributeError: pass
+	else: die(2,'Attribute set on shared instance')
+	msg(green('OK'))
+finally:
+	shutil.rmtree(g.data_dir)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/txfiletest.py: test the reading and writing of transaction files
+"""
+
+import sys,os,json,shutil,tempfile
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Test the reading and writing of transaction files',
+	'usage':'[options]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+The reference transaction files for the coin and network selected with the
+global options --coin, --token and --testnet, which are in file format version
+1, are converted to the current version and read back.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+import mmgen.tx
+from mmgen.tx import MMGenTX
+
+ref_files = { # subdir, mainnet file, testnet file
+	'btc':   ('','0B8D5A[15.31789,14,tl=1320969600].rawtx',
+				'0C7115[15.86255,14,tl=1320969600].testnet.rawtx'),
+	'bch':   ('','460D4D-BCH[10.19764,tl=1320969600].rawtx',
+				'359FD5-BCH[6.68868,tl=1320969600].testnet.rawtx'),
+	'ltc':   ('litecoin','AF3CDF-LTC[620.76194,1453,tl=1320969600].rawtx',
+				'A5A1E0-LTC[1454.64322,1453,tl=1320969600].testnet.rawtx'),
+	'eth':   ('ethereum','88FEFD-ETH[23.45495,40000].rawtx',
+				'B472BD-ETH[23.45495,40000].testnet.rawtx'),
+	'erc20': ('ethereum','5881D2-MM1[1.23456,50000].rawtx',
+				'6BDB25-MM1[1.23456,50000].testnet.rawtx'),
+	'etc':   ('ethereum_classic','ED3848-ETC[1.2345,40000].rawtx',None),
+}
+
+md_attrs = ('txid','timestamp','blockcount','chain','coin','dcoin','locktime','label','coin_txid')
+
+def test(desc,cond):
+	msg_r('{:<38}'.format(desc+':'))
+	if not cond: die(2,'Test failed')
+	msg(green('OK'))
+
+def io_data(tx):
+	return [[e.__dict__ for e in getattr(tx,k)] for k in ('inputs','outputs')]
+
+def same_tx(a,b,metadata_only=False):
+	return ( [getattr(a,k) for k in md_attrs] == [getattr(b,k) for k in md_attrs] and
+			str(a.send_amt) == str(b.send_amt) and
+			(metadata_only or (a.hex == b.hex and io_data(a) == io_data(b))) )
+
+def write(fn,data):
+	with open(fn,'w') as f: f.write(data)
+
+def load_fails(fn):
+	stderr_save,sys.stderr = sys.stderr,open(os.devnull,'w')
+	try: MMGenTX(fn,silent_open=True)
+	except SystemExit: return True
+	finally: sys.stderr = stderr_save
+	return False
+
+def test_file(fn,tmpdir):
+	tx1 = MMGenTX(fn,silent_open=True)
+	tx1.format()
+	test('v1 file converted',tx1.fmt_data[:len(MMGenTX.json_prefix)] == MMGenTX.json_prefix)
+	v2fn = os.path.join(tmpdir,os.path.basename(fn))
+	write(v2fn,tx1.fmt_data)
+
+	tx2 = MMGenTX(v2fn,silent_open=True)
+	test('v2 file read back',same_tx(tx1,tx2))
+	tx2.format()
+	test('v2 file rewritten unchanged',tx2.fmt_data == tx1.fmt_data)
+
+	# a metadata-only read must stop after the metadata
+	loads_save = mmgen.tx.json.loads
+	def loads(*args,**kwargs): raise AssertionError('json.loads() called')
+	mmgen.tx.json.loads = loads
+	try:     txm = MMGenTX(v2fn,metadata_only=True,silent_open=True)
+	finally: mmgen.tx.json.loads = loads_save
+	test('v2 metadata-only read',same_tx(tx1,txm,metadata_only=True) and not txm.inputs)
+
+	# a reformatted file is checksummed in canonical form
+	write(v2fn,json.dumps(json.loads(tx1.fmt_data),indent=4,sort_keys=True))
+	test('v2 reformatted file read',same_tx(tx1,MMGenTX(v2fn,silent_open=True)))
+	test('v2 reformatted file (metadata only)',
+		same_tx(tx1,MMGenTX(v2fn,metadata_only=True,silent_open=True),metadata_only=True))
+
+	# changes to any part of the file are caught by the checksum
+	for k,desc in (('"blockcount":','metadata'),('"amt":"','inputs'),('"serialized":"','tx data')):
+		pos = tx1.fmt_data.index(k) + len(k)
+		c = tx1.fmt_data[pos]
+		write(v2fn,tx1.fmt_data[:pos] + ('1','2')[c=='1'] + tx1.fmt_data[pos+1:])
+		test('v2 file with bad {} rejected'.format(desc),load_fails(v2fn))
+
+coin = 'erc20' if g.token else g.coin.lower()
+if coin not in ref_files:
+	die(1,'No reference transaction files for coin {}'.format(g.coin))
+subdir,fn = ref_files[coin][0],ref_files[coin][1+g.testnet]
+if not fn:
+	die(1,'No reference transaction file for {} {}'.format(g.coin,('mainnet','testnet')[g.testnet]))
+
+tmpdir = tempfile.mkdtemp()
+try:
+	msg(cyan(fn))
+	test_file(os.path.join('test','ref',subdir,fn),tmpdir)
+finally:
+	shutil.rmtree(tmpdir)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+#
+# mmgen = Multi-Mode GENerator, command-line Bitcoin cold storage solution
+# Copyright (C)2013-2018 The MMGen Project <mmgen@tuta.io>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+test/txsignertest.py: test the native transaction signer against reference vectors
+"""
+
+import sys,os,struct
+repo_root = os.path.normpath(os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]),os.pardir)))
+os.chdir(repo_root)
+sys.path.__setitem__(0,repo_root)
+
+# Import this _after_ local path's been added to sys.path
+from mmgen.common import *
+
+opts_data = lambda: {
+	'desc': 'Test the native transaction signer against reference vectors',
+	'usage':'[options]',
+	'options': """
+-h, --help          Print this help message
+--, --longhelp      Print help message for long options (common options)
+-v, --verbose       Produce more verbose output
+""",
+	'notes': """
+
+The Segwit vectors are the native P2WPKH and P2SH-P2WPKH examples from BIP143.
+The legacy sighash is checked against the signature of the P2PK input of the
+BIP143 native P2WPKH example, which was made with the original algorithm.  The
+Bitcoin Cash sighash is checked against a sighash computed directly from the
+replay-protected sighash spec.  All tests are run once with libsecp256k1 and
+once with the python-ecdsa fallback.
+"""
+}
+
+cmd_args = opts.init(opts_data)
+
+from binascii import hexlify,unhexlify
+import mmgen.txsigner as ts
+from mmgen.txsigner import TxSigner,dsha256,hash160,p2pkh_script
+
+def h2b(s): return unhexlify(''.join(s.split()))
+
+vectors = {
+	'p2wpkh': {
+		'unsigned': """
+			0100000002fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4e4ad969f0000000000eeffffff
+			ef51e1b804cc89d182d279655c3aa89e815b1b309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb206
+			000000001976a9148280b37df378db99f66f85c95a783a76ac7a6d5988ac9093510d000000001976a9143bde42db
+			ee7e4dbe6a21b2d50ce2f0167faa815988ac11000000""",
+		# input 0 is P2PK and is signed with the original algorithm
+		'p2pk_spk':  '2103c9f4836b9a4f77fc0d81f7bcb01b7f1b35916864b9476c241ce9fc198bd25432ac',
+		'p2pk_sec':  'bbc27228ddcb9209d7fd6f36b02f7dfa6252af40bb2f1cbc7a557da8027ff866',
+		'p2pk_sig':  """
+			30450221008b9d1dc26ba6a9cb62127b02742fa9d754cd3bebf337f7a55d114c8e5cdd30be022040529b194ba3f9
+			281a99f2b1c0a19c0489bc22ede944ccf4ecbab4cc618ef3ed""",
+		'n': 1,
+		'spk':     '00141d0f172a0ecb48aee1be1f2687d2963ae33f71a1',
+		'amt':     600000000,
+		'sec':     '619c335025c7f4012e556c2a58b2506e30b8511b53ade95ea316fd8c3286feb9',
+		'pub':     '025476c2e83188368da1ff3e292e7acafcdb3566bb0ad253f62fc70f07aeee6357',
+		'sighash': 'c37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670',
+		'sig':     """
+			304402203609e17b84f6a7d30c80bfa610b5b4542f32a8a0d5447a12fb1366d7f01cc44a0220573a954c45183315
+			61406f90300e8f3358f51928d43c212a8caed02de67eebee""",
+	},
+	'p2sh-p2wpkh': {
+		'unsigned': """
+			0100000001db6b1b20aa0fd7b23880be2ecbd4a98130974cf4748fb66092ac4d3ceb1a54770100000000feffffff
+			02b8b4eb0b000000001976a914a457b684d7f0d539a46a45bbc043f35b59d0d96388ac0008af2f000000001976a9
+			14fd270b1ee6abcaea97fea7ad0402e8bd8ad6d77c88ac92040000""",
+		'n': 0,
+		'spk':     'a9144733f37cf4db86fbc2efed2500b4f4e49f31202387',
+		'amt':     1000000000,
+		'sec':     'eb696a065ef48a2192da5b28b694f87544b30fae8327c4510137a922f32c6dcf',
+		'pub':     '03ad1d8e89212f0b92c74d23bb710c00662ad1470198ac48c43f7d6f93a2a26873',
+		'sighash': '64f3b0f4dd2bb3aa1ce8566d220cc74dda9df97d8490cc81d89d735c92e59fb6',
+		'sig':     """
+			3044022047ac8e878352d3ebbde1c94ce3a10d057c24175747116f8288e5d794d12d482f0220217f36a485cae903
+			c713331d877c1f64677e3622ad4010726870540656fe9dcb""",
+		'signed':  """
+			01000000000101db6b1b20aa0fd7b23880be2ecbd4a98130974cf4748fb66092ac4d3ceb1a5477010000001716
+			001479091972186c449eb1ded22b78e40d009bdf0089feffffff02b8b4eb0b000000001976a914a457b684d7f0
+			d539a46a45bbc043f35b59d0d96388ac0008af2f000000001976a914fd270b1ee6abcaea97fea7ad0402e8bd8a
+			d6d77c88ac02473044022047ac8e878352d3ebbde1c94ce3a10d057c24175747116f8288e5d794d12d482f0220
+			217f36a485cae903c713331d877c1f64677e3622ad4010726870540656fe9dcb012103ad1d8e89212f0b92c74d
+			23bb710c00662ad1470198ac48c43f7d6f93a2a2687392040000""",
+	},
+}
+
+def test(desc,cond):
+	msg_r('{:<38}'.format(desc+':'))
+	if not cond: die(2,'Test failed')
+	msg(green('OK'))
+
+def test_segwit(name):
+	v = vectors[name]
+	t = TxSigner(hexlify(h2b(v['unsigned'])))
+	sec,pub,sig,spk = h2b(v['sec']),h2b(v['pub']),h2b(v['sig']),h2b(v['spk'])
+	script_code = p2pkh_script(hash160(pub))
+	msghash = t.sighash_bip143(v['n'],script_code,v['amt'])
+	test(name+' sighash',msghash == h2b(v['sighash']))
+	test(name+' reference sig verifies',ts.ecdsa_verify(msghash,sig,pub))
+	test(name+' RFC6979 sig matches',ts.ecdsa_sign(msghash,sec) == sig)
+	t.sign_input(v['n'],sec,pub,spk,v['amt'])
+	test(name+' witness',t.witnesses[v['n']] == (sig+'\x01',pub))
+	if 'signed' in v:
+		test(name+' signed tx',t.serialize() == hexlify(h2b(v['signed'])))
+
+def test_legacy():
+	v = vectors['p2wpkh']
+	t = TxSigner(hexlify(h2b(v['unsigned'])))
+	sec = h2b(v['p2pk_sec'])
+	pub = h2b(v['p2pk_spk'])[1:34]
+	msghash = t.sighash_legacy(0,h2b(v['p2pk_spk']))
+	test('legacy sighash (P2PK reference sig)',ts.ecdsa_verify(msghash,h2b(v['p2pk_sig']),pub))
+	# the same key, spent as P2PKH: the script code is the scriptPubKey itself
+	spk = p2pkh_script(hash160(pub))
+	t.sign_input(0,sec,pub,spk,0)
+	ss = t.script_sigs[0]
+	sig = ss[1:ord(ss[0])]
+	test('P2PKH scriptSig',ss[ord(ss[0])] == '\x01' and ss[ord(ss[0])+1:] == '\x21'+pub)
+	test('P2PKH sig verifies',ts.ecdsa_verify(t.sighash_legacy(0,spk),sig,pub))
+	test('P2PKH sig differs from P2PK sig',sig != h2b(v['p2pk_sig']))
+
+def test_forkid():
+	v = vectors['p2wpkh']
+	txhex = hexlify(h2b(v['unsigned']))
+	t = TxSigner(txhex,'ALL|FORKID')
+	sec = h2b(v['p2pk_sec'])
+	pub = h2b(v['p2pk_spk'])[1:34]
+	spk = p2pkh_script(hash160(pub))
+	amt = 625000000
+	# sighash computed directly from the spec:
+	tx = h2b(v['unsigned'])
+	ins = [tx[5+41*i:41+41*i] for i in (0,1)]  # two inputs with empty scriptSigs
+	seqs = [tx[42+41*i:46+41*i] for i in (0,1)]
+	preimage = (tx[:4] + dsha256(''.join(ins)) + dsha256(''.join(seqs)) + ins[0] +
+				chr(len(spk)) + spk + struct.pack('<Q',amt) + seqs[0] +
+				dsha256(tx[88:-4]) + tx[-4:] + struct.pack('<I',0x41))
+	msghash = dsha256(preimage)
+	test('BCH forkid sighash',t.sighash_bip143(0,spk,amt) == msghash)
+	t.sign_input(0,sec,pub,spk,amt)
+	ss = t.script_sigs[0]
+	sig = ss[1:ord(ss[0])]
+	test('BCH forkid hashtype byte',ss[ord(ss[0])] == '\x41')
+	test('BCH forkid sig verifies',ts.ecdsa_verify(msghash,sig,pub))
+	test('BCH forkid sig differs from legacy',ts.ecdsa_sign(t.sighash_legacy(0,spk),sec) != sig)
+
+def test_bad():
+	v = vectors['p2wpkh']
+	msghash,sig,pub = h2b(v['sighash']),h2b(v['sig']),h2b(v['pub'])
+	bad_sig = sig[:-1] + chr(ord(sig[-1]) ^ 1)
+	test('tampered sig rejected',not ts.ecdsa_verify(msghash,bad_sig,pub))
+	test('wrong pubkey rejected',not ts.ecdsa_verify(msghash,sig,h2b(v['p2pk_spk'])[1:34]))
+	test('wrong sighash rejected',not ts.ecdsa_verify(dsha256(msghash),sig,pub))
+	test('malformed sig rejected',not ts.ecdsa_verify(msghash,sig[:-3],pub))
+	# a signing function that returns a bad signature must be caught by sign_input()
+	t = TxSigner(hexlify(h2b(v['unsigned'])))
+	save = ts._sign
+	ts._sign = lambda m,k: bad_sig
+	try:
+		t.sign_input(v['n'],h2b(v['sec']),pub,h2b(v['spk']),v['amt'])
+		ret = False
+	except ValueError as e:
+		ret = 'verification failed' in e.message
+	ts._sign = save
+	test('bad sig caught by sign_input()',ret)
+	test('input left unsigned',t.witnesses[v['n']] == None)
+
+def run_tests():
+	test_segwit('p2wpkh')
+	test_segwit('p2sh-p2wpkh')
+	test_legacy()
+	test_forkid()
+	test_bad()
+
+for backend in ('libsecp256k1','python-ecdsa'):
+	if backend == 'python-ecdsa':
+		sys.modules['mmgen.secp256k1'] = None # force the fallback
+	ts._sign = ts._verify = None
+	ts.ecdsa_sign('\x01'*32,'\x01'*32) # initialize
+	ts.ecdsa_verify('\x01'*32,'',('02'+'01'*32).decode('hex'))
+	msg(cyan('Testing with {}:'.format(backend)))
+	run_tests()